@@ -1,11 +1,70 @@
 from pydantic_settings import BaseSettings
 from functools import lru_cache
+from typing import Optional
 
 class Settings(BaseSettings):
     OPENAI_API_KEY: str
-    MODEL_NAME: str = "gpt-4-1106-preview"
+    MODEL_NAME: str = "gpt-3.5-turbo"
     ENVIRONMENT: str = "development"
     LOG_LEVEL: str = "INFO"
+    # Fracción de mensajes cuyo contenido se registra, y longitud máxima del extracto
+    LOG_PAYLOAD_SAMPLE_RATE: float = 0.05
+    LOG_PAYLOAD_MAX_CHARS: int = 200
+
+    # Llamadas al modelo de lenguaje
+    LLM_TIMEOUT_SECONDS: float = 30.0
+    LLM_MAX_CONCURRENCY: int = 16
+    LLM_MAX_TOKENS_INITIAL: int = 350
+    LLM_MAX_TOKENS_FINAL: int = 250
+    LLM_MAX_RETRIES: int = 2
+    LLM_RETRY_BASE_DELAY_SECONDS: float = 0.5
+    LLM_RETRY_MAX_DELAY_SECONDS: float = 4.0
+    LLM_RATE_LIMIT_PER_SECOND: float = 10.0  # 0 desactiva el limitador
+    LLM_RATE_LIMIT_BURST: int = 20
+    LLM_CIRCUIT_FAILURE_THRESHOLD: int = 5
+    LLM_CIRCUIT_RESET_SECONDS: float = 30.0
+    LLM_HTTP_MAX_CONNECTIONS: int = 32
+    LLM_HTTP_MAX_KEEPALIVE: int = 16
+    LLM_COALESCE_IDENTICAL_PROMPTS: bool = True
+
+    # Filas del dataset que se incluyen como referencia en los prompts
+    GROUNDING_TOP_K: int = 3
+    GROUNDING_TOKEN_BUDGET: int = 300
+
+    # Caché de recomendaciones iniciales
+    RECOMMENDATION_CACHE_MAX_SIZE: int = 1024
+    RECOMMENDATION_CACHE_TTL_SECONDS: float = 86400
+    RECOMMENDATION_CACHE_DB_PATH: Optional[str] = None
+    RECOMMENDATION_CACHE_PURGE_INTERVAL_SECONDS: float = 300
+    RECOMMENDATION_CACHE_MATCH_PROFESSION: bool = True
+
+    # Genera un borrador de las recomendaciones finales al recibir la experiencia
+    FINAL_RECOMMENDATIONS_PREFETCH: bool = False
+
+    # Precarga de datasets y del cliente del modelo al arrancar (/ready responde 503 hasta que termina)
+    STARTUP_PRELOAD: bool = True
+    STARTUP_PRELOAD_TIMEOUT_SECONDS: float = 60.0
+
+    # Almacén de sesiones ("memory" o "sqlite" para compartirlo entre workers)
+    SESSION_BACKEND: str = "memory"
+    SESSION_DB_PATH: str = "app/data/sessions.sqlite3"
+    SESSION_MAX_COUNT: int = 10000
+    SESSION_IDLE_TTL_SECONDS: float = 3600
+    SESSION_SWEEP_INTERVAL_SECONDS: float = 60
+    # Mensajes distintos que pueden esperar turno en una sesión mientras se procesa otro
+    SESSION_MAX_PENDING_MESSAGES: int = 4
+
+    # Generación de CV por lotes (/cv/batch)
+    BATCH_MAX_CONCURRENCY: int = 8
+    BATCH_MAX_ITEMS: int = 500
+
+    # Exportación del CV a PDF
+    PDF_MAX_WORKERS: int = 2
+    PDF_MAX_CONCURRENCY: int = 2
+    PDF_CACHE_SIZE: int = 128
+
+    # Artefacto de recomendaciones precalculadas (python -m app.services.precomputed_recommendations)
+    PRECOMPUTED_RECOMMENDATIONS_PATH: str = "app/data/precomputed/recomendaciones_iniciales.json"
     
     class Config:
         env_file = ".env"
@@ -1,18 +1,53 @@
+import time
+_import_started = time.perf_counter()
+
+import asyncio
+import random
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, Request, HTTPException
 from fastapi.templating import Jinja2Templates
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from pathlib import Path
 from typing import Dict
 from loguru import logger
+import json
 
+from app.config import get_settings
+from app.services.batch_service import BatchCVService
 from app.services.chat_service import ChatService
-from app.models.chat import ChatSession, Message
+from app.services.metrics import RENDER_SECONDS, registry as metrics_registry
+from app.services.pdf_service import PDFExportService
+from app.services.session_locks import SessionBusyError
+
+# Tiempos del arranque, expuestos en /ready
+startup_report: Dict = {"ready": False, "import_seconds": None, "preload_seconds": None, "preload": {}}
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # La precarga corre en segundo plano: el servidor acepta conexiones de
+    # inmediato y /ready responde 503 hasta que termina
+    session_store.start_sweeper()
+    chat_service.recommendation_cache.start_purger()
+    preload = asyncio.create_task(preload_services()) if settings.STARTUP_PRELOAD else None
+    if preload is None:
+        startup_report["ready"] = True
+    try:
+        yield
+    finally:
+        if preload is not None:
+            preload.cancel()
+        await session_store.stop_sweeper()
+        await chat_service.recommendation_cache.stop_purger()
+        pdf_service.shutdown()
+        await chat_service.llm.aclose()
 
 app = FastAPI(
     title="CV ATS-Friendly Generator",
     description="API para generar hojas de vida optimizadas para sistemas ATS",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # Montar archivos estáticos
@@ -33,8 +68,85 @@ app.add_middleware(
 # Instancia global del servicio de chat
 chat_service = ChatService()
 
-# Diccionario para almacenar las sesiones activas
-active_sessions = {}
+# Sesiones activas (con su estado de conversación), acotadas y con expiración
+session_store = chat_service.session_store
+
+# Exportación a PDF en un pool de procesos
+settings = get_settings()
+pdf_service = PDFExportService(
+    max_workers=settings.PDF_MAX_WORKERS,
+    max_concurrency=settings.PDF_MAX_CONCURRENCY,
+    cache_size=settings.PDF_CACHE_SIZE
+)
+
+# Generación de CV por lotes, con concurrencia acotada
+batch_service = BatchCVService(chat_service, max_concurrency=settings.BATCH_MAX_CONCURRENCY)
+
+# Métricas leídas de los servicios al exportar /metrics
+metrics_registry.add_collector(chat_service.collect_metrics)
+metrics_registry.add_collector(lambda: [
+    ("cv_pdf_events_total", "counter", "Eventos de la exportación a PDF", [
+        ({"event": event}, value) for event, value in pdf_service.metrics().items()
+        if event in ("cache_hits", "cache_misses", "renders", "failures")
+    ]),
+])
+
+async def _session_store_metrics():
+    """Sesiones activas, memoria y desalojos del almacén de sesiones, leídos fuera del event loop."""
+    store = await session_store.ametrics()
+    return [
+        ("cv_active_sessions", "gauge", "Sesiones activas", [({}, store["live_sessions"])]),
+        ("cv_session_store_removed_total", "counter", "Sesiones descartadas del almacén", [
+            ({"reason": "evicted"}, store["evictions"]),
+            ({"reason": "expired"}, store["expirations"]),
+        ]),
+        ("cv_session_store_bytes", "gauge", "Memoria estimada de las sesiones guardadas",
+         [({}, store["bytes_estimate"])]),
+        ("cv_session_store_max_sessions", "gauge", "Capacidad máxima del almacén de sesiones",
+         [({}, store["max_sessions"])]),
+    ]
+
+metrics_registry.add_collector(_session_store_metrics)
+
+def log_payload(label: str, session_id: str, text: str) -> None:
+    """Registra una muestra truncada del contenido para que el log no crezca con el tamaño de las respuestas."""
+    if random.random() >= settings.LOG_PAYLOAD_SAMPLE_RATE:
+        return
+    limit = settings.LOG_PAYLOAD_MAX_CHARS
+    preview = text if len(text) <= limit else f"{text[:limit]}…"
+    logger.info(f"{label} [{session_id}] ({len(text)} caracteres): {preview!r}")
+
+async def _run_preload_step(name: str, task) -> None:
+    started = time.perf_counter()
+    try:
+        result, status = await asyncio.to_thread(task), "ok"
+    except Exception as e:
+        logger.error(f"Error en la precarga de {name}: {str(e)}")
+        result, status = None, "error"
+    startup_report["preload"][name] = {
+        "status": status, "seconds": round(time.perf_counter() - started, 3), "result": result
+    }
+
+async def preload_services():
+    """Carga en paralelo los datasets y el cliente del modelo, fuera del event loop.
+
+    Si un paso falla o se agota el tiempo, la app se declara lista igualmente:
+    cada servicio vuelve a intentar su carga en el primer uso.
+    """
+    started = time.perf_counter()
+    tasks = chat_service.preload_tasks()
+    try:
+        await asyncio.wait_for(
+            asyncio.gather(*(_run_preload_step(name, task) for name, task in tasks.items())),
+            timeout=settings.STARTUP_PRELOAD_TIMEOUT_SECONDS
+        )
+    except asyncio.TimeoutError:
+        logger.warning(f"La precarga superó {settings.STARTUP_PRELOAD_TIMEOUT_SECONDS}s")
+        for name in tasks:
+            startup_report["preload"].setdefault(name, {"status": "timeout", "seconds": None, "result": None})
+    startup_report["preload_seconds"] = round(time.perf_counter() - started, 3)
+    startup_report["ready"] = True
+    logger.info(f"Precarga completada en {startup_report['preload_seconds']}s")
 
 @app.get("/")
 async def root(request: Request):
@@ -48,9 +160,8 @@ async def chat_page(request: Request):
 async def start_chat():
     """Inicia una nueva sesión de chat"""
     try:
-        session = ChatSession()
-        session_id = session.session_id
-        active_sessions[session_id] = session
+        entry = await session_store.aopen_session()
+        session_id = entry.session.session_id
         logger.info(f"Nueva sesión iniciada: {session_id}")
         return {
             "response": "¡Hola! Soy tu asistente para crear un CV optimizado para ATS. Por favor escribe tu nombre para comenzar.",
@@ -67,15 +178,19 @@ async def chat_message(message: dict):
             raise ValueError("Mensaje o session_id inválido")
             
         session_id = message["session_id"]
-        logger.info(f"Recibido mensaje para sesión {session_id}: {message['message']}")
+        log_payload("Mensaje recibido", session_id, message["message"])
         
-        session = active_sessions.get(session_id)
-        if not session:
+        entry = await session_store.aget(session_id)
+        if not entry:
             raise ValueError(f"Sesión no encontrada: {session_id}")
+        session = entry.session
         
-        # Procesar el mensaje y obtener la respuesta
-        response = chat_service.process_message(session, message["message"])
-        logger.info(f"Respuesta generada: {response}")
+        # Procesar el mensaje y obtener la respuesta (de uno en uno por sesión)
+        try:
+            response = await chat_service.process_message(session, message["message"])
+        except SessionBusyError as e:
+            raise HTTPException(status_code=409, detail=str(e))
+        log_payload("Respuesta generada", session_id, response or "")
         
         if not response:
             raise ValueError("Respuesta vacía del servicio de chat")
@@ -84,6 +199,8 @@ async def chat_message(message: dict):
             "response": response,
             "session_id": session_id
         }
+    except HTTPException:
+        raise
     except ValueError as e:
         logger.error(f"Error de validación: {str(e)}")
         return {"error": str(e)}
@@ -91,6 +208,150 @@ async def chat_message(message: dict):
         logger.error(f"Error en el chat: {str(e)}")
         return {"error": "Error interno del servidor"}
 
+@app.post("/chat/message/stream")
+async def chat_message_stream(message: dict):
+    """Procesa un mensaje y transmite la respuesta como Server-Sent Events.
+
+    Cada evento `data` lleva un fragmento `{"delta": ...}`; el evento `done`
+    marca el final. `/chat/message` se mantiene para clientes sin streaming.
+    """
+    try:
+        if not message or "message" not in message or "session_id" not in message:
+            raise ValueError("Mensaje o session_id inválido")
+
+        session_id = message["session_id"]
+        log_payload("Mensaje recibido (stream)", session_id, message["message"])
+
+        entry = await session_store.aget(session_id)
+        if not entry:
+            raise ValueError(f"Sesión no encontrada: {session_id}")
+        session = entry.session
+    except ValueError as e:
+        logger.error(f"Error de validación: {str(e)}")
+        return {"error": str(e)}
+
+    # Rechaza el doble envío antes de abrir el stream; si aun así coincide, se avisa con un evento
+    if chat_service.session_locks.is_pending(session_id, message["message"].lower().strip()):
+        raise HTTPException(status_code=409, detail="Ya se está procesando este mensaje")
+
+    async def event_stream():
+        try:
+            async for chunk in chat_service.stream_message(session, message["message"]):
+                yield f"data: {json.dumps({'delta': chunk}, ensure_ascii=False)}\n\n"
+        except SessionBusyError as e:
+            yield f"event: error\ndata: {json.dumps({'error': str(e), 'status': 409}, ensure_ascii=False)}\n\n"
+        except Exception as e:
+            logger.error(f"Error en el chat (stream): {str(e)}")
+            yield f"event: error\ndata: {json.dumps({'error': 'Error interno del servidor'})}\n\n"
+        yield f"event: done\ndata: {json.dumps({'session_id': session_id})}\n\n"
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    """True si alguna etiqueta de If-None-Match coincide (comparación débil, como exige RFC 9110)."""
+    tags = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in tags or any(tag.removeprefix("W/") == etag for tag in tags)
+
+@app.get("/chat/{session_id}/cv")
+async def get_cv(session_id: str, request: Request, format: str = "html", known: str = ""):
+    """Devuelve el CV de la sesión con revalidación por ETag.
+
+    Con `format=sections` responde JSON con las secciones y sus etags; las que
+    el cliente ya tiene (`known`, etags separados por comas) se listan sin HTML.
+    """
+    entry = await session_store.aget(session_id)
+    if not entry:
+        raise HTTPException(status_code=404, detail=f"Sesión no encontrada: {session_id}")
+    if not entry.state.is_complete():
+        raise HTTPException(status_code=409, detail="Aún falta información para generar el CV")
+    if format not in ("html", "sections"):
+        raise HTTPException(status_code=400, detail="Formato no válido, usa 'html' o 'sections'")
+
+    renderer = chat_service.cv_renderer
+    # El etag se calcula con los datos del CV, sin renderizarlo
+    etag = renderer.etag(entry.state)
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and _etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+
+    try:
+        with RENDER_SECONDS.time(format=format):
+            if format == "html":
+                return Response(content=renderer.render(entry.state), media_type="text/html", headers=headers)
+            known_etags = {tag.strip() for tag in known.split(",") if tag.strip()}
+            sections = [
+                section.to_dict(include_html=section.etag not in known_etags)
+                for section in renderer.sections(entry.state)
+            ]
+    except Exception as e:
+        logger.error(f"Error generando el CV: {str(e)}")
+        raise HTTPException(status_code=500, detail="Error al generar el CV")
+
+    return JSONResponse(
+        content={"etag": etag, "stylesheet_url": renderer.stylesheet_url, "sections": sections},
+        headers=headers
+    )
+
+@app.get("/chat/{session_id}/cv.pdf")
+async def export_cv_pdf(session_id: str):
+    """Exporta el CV de la sesión a PDF"""
+    entry = await session_store.aget(session_id)
+    if not entry:
+        raise HTTPException(status_code=404, detail=f"Sesión no encontrada: {session_id}")
+    if not entry.state.is_complete():
+        raise HTTPException(status_code=409, detail="Aún falta información para generar el CV")
+
+    try:
+        with RENDER_SECONDS.time(format="pdf"):
+            html = chat_service.cv_renderer.render_standalone(entry.state)
+            pdf = await pdf_service.render(html)
+    except Exception as e:
+        logger.error(f"Error exportando PDF: {str(e)}")
+        raise HTTPException(status_code=500, detail="Error al generar el PDF")
+
+    return Response(
+        content=pdf,
+        media_type="application/pdf",
+        headers={"Content-Disposition": 'attachment; filename="cv.pdf"'}
+    )
+
+@app.post("/cv/batch")
+async def generate_cv_batch(payload: dict):
+    """Genera los CV de varios candidatos y transmite los resultados como NDJSON.
+
+    Recibe `{"candidates": [...]}` con los campos de `CandidateProfile`. Cada
+    línea es el resultado de un candidato (`status` "ok" o "error", con su
+    `index` e `id`) en el orden en que terminan; la última trae el `summary`.
+    """
+    candidates = payload.get("candidates") if isinstance(payload, dict) else None
+    if not isinstance(candidates, list) or not candidates:
+        raise HTTPException(status_code=400, detail="Se requiere una lista 'candidates' no vacía")
+    if len(candidates) > settings.BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=413, detail=f"Máximo {settings.BATCH_MAX_ITEMS} candidatos por lote")
+
+    async def result_lines():
+        async for result in batch_service.run(candidates):
+            yield json.dumps(result, ensure_ascii=False) + "\n"
+
+    return StreamingResponse(result_lines(), media_type="application/x-ndjson")
+
+@app.get("/metrics")
+async def metrics():
+    """Métricas en el formato de texto de Prometheus"""
+    return Response(content=await metrics_registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+@app.get("/ready")
+async def ready():
+    """Disponibilidad: 200 cuando la precarga terminó, 503 mientras tanto"""
+    return JSONResponse(content=startup_report, status_code=200 if startup_report["ready"] else 503)
+
+startup_report["import_seconds"] = round(time.perf_counter() - _import_started, 3)
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
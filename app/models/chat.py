@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import List
 from uuid import uuid4
 
@@ -7,6 +7,7 @@ class Message(BaseModel):
     content: str
 
 class ChatSession(BaseModel):
-    session_id: str = str(uuid4())
+    # Un ID nuevo por instancia (un valor por defecto fijo se compartiría entre todas)
+    session_id: str = Field(default_factory=lambda: str(uuid4()))
     messages: List[Message] = []
     cv_data: dict = {}
@@ -1,5 +1,7 @@
+import json
+import zlib
 from enum import Enum
-from typing import List, Dict, Optional
+from typing import Any, List, Dict, Optional, Tuple
 
 class ConversationStage(Enum):
     START = "start"
@@ -16,7 +18,19 @@ class ConversationType(Enum):
     SPECIFIC = "specific"  # Para vacante específica
     GENERAL = "general"    # Para CV general
 
+# Formato binario de `ConversationState.to_bytes`: un byte de cabecera y un
+# arreglo JSON posicional, comprimido con zlib cuando supera el umbral
+_FORMAT_JSON = b"J"
+_FORMAT_ZLIB = b"Z"
+_COMPRESS_THRESHOLD = 512
+
 class ConversationState:
+    __slots__ = (
+        "stage", "cv_type", "personal_info", "vacancy_info", "profession",
+        "education", "experience", "skills", "initial_recommendations", "final_recommendations",
+        "version", "cv_html_cache", "cv_sections",
+    )
+
     def __init__(self):
         self.stage: ConversationStage = ConversationStage.START
         self.cv_type: Optional[ConversationType] = None
@@ -28,6 +42,15 @@ class ConversationState:
         self.skills: List[str] = []
         self.initial_recommendations: Optional[str] = None
         self.final_recommendations: Optional[str] = None
+        # Se incrementa con cada cambio; identifica el HTML memorizado en `cv_html_cache`
+        self.version: int = 0
+        self.cv_html_cache: Optional[Tuple[int, str]] = None
+        # Secciones del CV ya renderizadas, por nombre; cada una guarda su etag (ver CVRenderer)
+        self.cv_sections: Dict[str, Any] = {}
+
+    def touch(self) -> None:
+        """Marca el estado como modificado."""
+        self.version += 1
 
     def is_complete(self) -> bool:
         """Verifica si se ha recopilado toda la información necesaria."""
@@ -44,3 +67,53 @@ class ConversationState:
             required_fields.append(self.profession)
             
         return all(field for field in required_fields)
+
+    def to_bytes(self) -> bytes:
+        """Serialización compacta: arreglo JSON posicional, comprimido si es grande."""
+        payload = json.dumps(
+            [
+                self.stage.value,
+                self.cv_type.value if self.cv_type else None,
+                self.personal_info,
+                self.vacancy_info,
+                self.profession,
+                self.education,
+                self.experience,
+                self.skills,
+                self.initial_recommendations,
+                self.final_recommendations,
+                self.version,
+            ],
+            ensure_ascii=False,
+            separators=(",", ":"),
+        ).encode("utf-8")
+        if len(payload) > _COMPRESS_THRESHOLD:
+            return _FORMAT_ZLIB + zlib.compress(payload)
+        return _FORMAT_JSON + payload
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "ConversationState":
+        """Reconstruye el estado a partir de `to_bytes`."""
+        header, payload = data[:1], data[1:]
+        if header == _FORMAT_ZLIB:
+            payload = zlib.decompress(payload)
+        elif header != _FORMAT_JSON:
+            raise ValueError("Formato de estado de conversación desconocido")
+
+        fields = json.loads(payload)
+        (stage, cv_type, personal_info, vacancy_info, profession, education,
+         experience, skills, initial_recommendations, final_recommendations) = fields[:10]
+
+        state = cls()
+        state.stage = ConversationStage(stage)
+        state.cv_type = ConversationType(cv_type) if cv_type else None
+        state.personal_info = personal_info or {}
+        state.vacancy_info = vacancy_info
+        state.profession = profession
+        state.education = education or []
+        state.experience = experience or []
+        state.skills = skills or []
+        state.initial_recommendations = initial_recommendations
+        state.final_recommendations = final_recommendations
+        state.version = fields[10] if len(fields) > 10 else 0
+        return state
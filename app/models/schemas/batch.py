@@ -0,0 +1,52 @@
+from pydantic import BaseModel, Field, model_validator
+from typing import List, Optional
+
+from app.models.conversation_state import ConversationStage, ConversationState, ConversationType
+
+class CandidateProfile(BaseModel):
+    """Datos de un candidato equivalentes a una conversación completa."""
+    id: Optional[str] = None  # Referencia del cliente, se devuelve con el resultado
+    contact: str = Field(min_length=1)
+    vacancy: Optional[str] = None  # CV para una vacante específica
+    profession: Optional[str] = None  # CV general para una profesión
+    education: List[str] = Field(min_length=1)
+    experience: List[str] = Field(min_length=1)
+    skills: List[str] = Field(min_length=1)
+
+    @model_validator(mode="after")
+    def check_target(self):
+        if not (self.vacancy or self.profession):
+            raise ValueError("Se requiere 'vacancy' o 'profession'")
+        return self
+
+    def role(self) -> str:
+        return self.vacancy or self.profession
+
+    def to_state(self) -> ConversationState:
+        """Estado de conversación ya completo, como si el candidato hubiera respondido en el chat."""
+        state = ConversationState()
+        state.personal_info["contact"] = self.contact.strip()
+        if self.vacancy:
+            state.cv_type = ConversationType.SPECIFIC
+            state.vacancy_info = self.vacancy.strip()
+        else:
+            state.cv_type = ConversationType.GENERAL
+            state.profession = self.profession.strip()
+        state.education = [item.strip() for item in self.education]
+        state.experience = [item.strip() for item in self.experience]
+        state.skills = [item.strip() for item in self.skills]
+        state.stage = ConversationStage.COMPLETE
+        state.touch()
+        return state
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "id": "cohorte-7-014",
+                "contact": "Ana Pérez ana.perez@correo.com",
+                "profession": "Analista de datos",
+                "education": ["Estadística, Universidad Nacional"],
+                "experience": ["Automaticé reportes en Python y reduje el tiempo de cierre un 40%"],
+                "skills": ["SQL, Python, Power BI, comunicación"]
+            }
+        }
@@ -0,0 +1,217 @@
+import json
+import re
+import threading
+from pathlib import Path
+from typing import Dict, FrozenSet, List, Optional, Tuple
+from loguru import logger
+
+from app.utils.text import fold_text, tokenize
+
+CACHE_FORMAT_VERSION = 1
+# Longitud mínima de raíz verbal para reconocer formas conjugadas ("lideré" -> "lider")
+MIN_STEM_LENGTH = 4
+
+# Expresiones débiles frecuentes en la experiencia laboral, la categoría de
+# verbos (clave normalizada contenida en el nombre de la categoría) y los verbos
+# de esa categoría que mejor reemplazan la expresión, en orden de preferencia.
+# Verbos como "mejoré" o "apoyé" no son débiles: ya están en el catálogo.
+WEAK_PHRASES: Tuple[Tuple[str, str, Tuple[str, ...]], ...] = (
+    (r"(?:fui |era |estuve |estaba )?(?:responsable|encargad[oa]) del?", "liderazgo",
+     ("Dirigir", "Coordinar", "Supervisar", "Gestionar")),
+    (r"(?:estuve|estaba) a cargo del?", "liderazgo", ("Dirigir", "Coordinar", "Supervisar", "Gestionar")),
+    (r"me (?:encargue|encargaba|ocupe|ocupaba) del?", "liderazgo", ("Gestionar", "Coordinar", "Supervisar")),
+    (r"(?:trabaje|trabajaba) (?:en|con|como)", "roles anteriores", ("Desarrollar", "Ejecutar", "Operar")),
+    (r"(?:hice|hacia|realice|realizaba)", "roles anteriores", ("Elaborar", "Ejecutar", "Desarrollar")),
+    (r"(?:arregle|arreglaba)", "mejorar procesos", ("Reparar", "Reestructurar", "Simplificar")),
+    (r"(?:hable|hablaba|dije|decia) (?:con|a)", "comunicativas", ("Comunicar", "Presentar", "Explicar")),
+    (r"(?:mire|miraba|vi|veia) (?:los|las|el|la)", "analiticas", ("Analizar", "Examinar", "Verificar")),
+)
+
+
+class ActionVerbCatalog:
+    """Verbos de acción de verbos_en_accion.xlsx en memoria.
+
+    El Excel se parsea una sola vez y se guarda en una caché JSON junto a su
+    mtime, así que los arranques siguientes no pasan por openpyxl. En memoria
+    se mantiene un frozenset por categoría y un índice por raíz verbal que
+    reconoce las formas conjugadas en el texto del usuario.
+    """
+
+    def __init__(self, xlsx_path: Path, cache_path: Optional[Path] = None):
+        self.xlsx_path = Path(xlsx_path)
+        self.cache_path = Path(cache_path) if cache_path else None
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._categories: Dict[str, Tuple[str, ...]] = {}
+        self._category_sets: Dict[str, FrozenSet[str]] = {}
+        self._stems: Dict[str, str] = {}
+        self._weak_patterns = [
+            (re.compile(rf"\b{pattern}\b"), category, preferred) for pattern, category, preferred in WEAK_PHRASES
+        ]
+
+    def _source_state(self) -> Optional[List[int]]:
+        try:
+            stat = self.xlsx_path.stat()
+            return [stat.st_mtime_ns, stat.st_size]
+        except FileNotFoundError:
+            return None
+
+    def _ensure_loaded(self) -> None:
+        if self._loaded:
+            return
+        with self._lock:
+            if self._loaded:
+                return
+            categories = self._load()
+            self._categories = categories
+            self._category_sets = {name: frozenset(verbs) for name, verbs in categories.items()}
+            self._stems = {}
+            for verbs in categories.values():
+                for verb in verbs:
+                    folded = fold_text(verb)
+                    stem = folded[:-2] if folded.endswith(("ar", "er", "ir")) else folded
+                    if len(stem) >= MIN_STEM_LENGTH:
+                        self._stems.setdefault(stem, verb)
+            self._loaded = True
+            logger.info(f"Verbos de acción cargados: {sum(len(v) for v in categories.values())} en {len(categories)} categorías")
+
+    def _load(self) -> Dict[str, Tuple[str, ...]]:
+        source_state = self._source_state()
+        if source_state is None:
+            logger.warning(f"Action verbs file not found: {self.xlsx_path}")
+            return {}
+
+        cached = self._read_cache(source_state)
+        if cached is not None:
+            return cached
+
+        try:
+            categories = self._parse_excel()
+        except Exception as e:
+            logger.error(f"Error loading action verbs: {e}")
+            return {}
+        self._write_cache(source_state, categories)
+        return categories
+
+    def _parse_excel(self) -> Dict[str, Tuple[str, ...]]:
+        """Lee el Excel: una columna por categoría, con el nombre en mayúsculas y los verbos debajo."""
+        import pandas as pd
+
+        frame = pd.read_excel(self.xlsx_path, header=None, dtype=str).fillna("")
+        rows = [[" ".join(str(cell).split()) for cell in row] for row in frame.itertuples(index=False)]
+
+        header_index = next(
+            (i for i, row in enumerate(rows) if sum(1 for cell in row if cell and cell.isupper()) > 1),
+            None,
+        )
+        if header_index is None:
+            raise ValueError("No se encontró la fila de categorías")
+
+        categories: Dict[str, Tuple[str, ...]] = {}
+        for column, name in enumerate(rows[header_index]):
+            if not name:
+                continue
+            verbs = [row[column] for row in rows[header_index + 1:] if column < len(row) and row[column]]
+            categories[name.capitalize()] = tuple(dict.fromkeys(verbs))
+        return categories
+
+    def _read_cache(self, source_state: List[int]) -> Optional[Dict[str, Tuple[str, ...]]]:
+        if self.cache_path is None or not self.cache_path.exists():
+            return None
+        try:
+            data = json.loads(self.cache_path.read_text(encoding="utf-8"))
+        except (OSError, json.JSONDecodeError):
+            return None
+        if data.get("format_version") != CACHE_FORMAT_VERSION or data.get("source") != source_state:
+            return None
+        return {name: tuple(verbs) for name, verbs in data["categories"].items()}
+
+    def _write_cache(self, source_state: List[int], categories: Dict[str, Tuple[str, ...]]) -> None:
+        if self.cache_path is None:
+            return
+        try:
+            self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.cache_path.with_name(self.cache_path.name + ".tmp")
+            tmp_path.write_text(json.dumps({
+                "format_version": CACHE_FORMAT_VERSION,
+                "source": source_state,
+                "categories": {name: list(verbs) for name, verbs in categories.items()},
+            }, ensure_ascii=False), encoding="utf-8")
+            tmp_path.replace(self.cache_path)
+        except OSError as e:
+            logger.warning(f"No se pudo escribir la caché de verbos: {e}")
+
+    def preload(self) -> int:
+        """Fuerza la carga y devuelve el número de verbos."""
+        self._ensure_loaded()
+        return sum(len(verbs) for verbs in self._categories.values())
+
+    def categories(self) -> List[str]:
+        self._ensure_loaded()
+        return list(self._categories)
+
+    def verbs(self, category: Optional[str] = None) -> List[str]:
+        """Verbos únicos, opcionalmente solo de las categorías que contienen `category`."""
+        self._ensure_loaded()
+        if category:
+            key = fold_text(category)
+            groups = [verbs for name, verbs in self._categories.items() if key in fold_text(name)]
+        else:
+            groups = list(self._categories.values())
+        return list(dict.fromkeys(verb for verbs in groups for verb in verbs))
+
+    def is_action_verb(self, verb: str, category: Optional[str] = None) -> bool:
+        self._ensure_loaded()
+        if category:
+            return any(verb in verbs for name, verbs in self._category_sets.items()
+                       if fold_text(category) in fold_text(name))
+        return any(verb in verbs for verbs in self._category_sets.values())
+
+    def find_action_verbs(self, text: str) -> List[str]:
+        """Verbos de acción del catálogo usados en el texto, en cualquier conjugación."""
+        self._ensure_loaded()
+        found = []
+        for token in tokenize(text):
+            # Prueba de la raíz más larga a la más corta
+            for end in range(len(token), MIN_STEM_LENGTH - 1, -1):
+                verb = self._stems.get(token[:end])
+                if verb is not None:
+                    found.append(verb)
+                    break
+        return list(dict.fromkeys(found))
+
+    def suggest(self, text: str, limit: int = 3) -> List[Dict]:
+        """Detecta expresiones débiles en el texto y propone verbos de acción más fuertes.
+
+        Devuelve una lista de {"phrase": expresión encontrada, "verbs": sugerencias}.
+        """
+        self._ensure_loaded()
+        folded = fold_text(text)
+        # Si al normalizar no cambia la longitud se muestra la expresión original
+        source = text if len(folded) == len(text) else folded
+
+        used = set(self.find_action_verbs(text))
+        suggestions = []
+        seen_phrases = set()
+        for pattern, category, preferred in self._weak_patterns:
+            for match in pattern.finditer(folded):
+                phrase = source[match.start():match.end()].strip()
+                # Una forma de un verbo del catálogo ya es un verbo de acción
+                if phrase.lower() in seen_phrases or self.find_action_verbs(phrase):
+                    continue
+                # Primero los verbos elegidos para la expresión; después el resto de su categoría
+                candidates = [verb for verb in preferred if self.is_action_verb(verb, category)]
+                candidates += self.verbs(category)
+                verbs = [verb for verb in dict.fromkeys(candidates) if verb not in used][:limit]
+                if verbs:
+                    seen_phrases.add(phrase.lower())
+                    suggestions.append({"phrase": phrase, "verbs": verbs})
+        return suggestions
+
+    @staticmethod
+    def format_suggestions(suggestions: List[Dict]) -> str:
+        """Texto breve con las sugerencias para mostrar en el chat."""
+        if not suggestions:
+            return ""
+        lines = [f"• En lugar de \"{item['phrase']}\", prueba con: {', '.join(item['verbs'])}." for item in suggestions]
+        return "💡 **Verbos de acción más fuertes:**\n" + "\n".join(lines)
@@ -0,0 +1,139 @@
+from collections import Counter
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from app.models.conversation_state import ConversationState
+from app.services.metrics import DATASET_SECONDS
+from app.services.recommendations_catalog import RecommendationsCatalog
+from app.utils.text import role_terms
+
+# Columnas del dataset con las palabras clave que buscan los ATS y su peso en la cobertura
+KEYWORD_FIELDS = (("palabras_clave", 2.0), ("habilidades_clave", 1.0))
+# Los términos se comparan por su raíz truncada, así "optimicé" cubre "Optimización"
+TERM_PREFIX_LENGTH = 6
+MAX_SUGGESTED_KEYWORDS = 5
+
+
+def _term_keys(text: str) -> List[str]:
+    return [term[:TERM_PREFIX_LENGTH] for term in role_terms(text)]
+
+
+class ATSReport:
+    """Cobertura de las palabras clave del sector en el CV del usuario."""
+    __slots__ = ("profession", "score", "matched", "missing", "recommended_format")
+
+    def __init__(self, profession: Optional[str], score: float, matched: List[str], missing: List[str],
+                 recommended_format: Optional[str]):
+        self.profession = profession
+        self.score = score  # 0-100, ponderado por KEYWORD_FIELDS
+        self.matched = matched
+        self.missing = missing
+        self.recommended_format = recommended_format
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "profession": self.profession,
+            "score": self.score,
+            "matched": self.matched,
+            "missing": self.missing,
+            "recommended_format": self.recommended_format,
+        }
+
+    def format(self) -> str:
+        """Secciones de palabras clave y filtros ATS de las recomendaciones finales."""
+        lines = ["⭐ **Palabras clave sugeridas:**"]
+        if self.missing:
+            lines += [f"• {keyword}" for keyword in self.missing[:MAX_SUGGESTED_KEYWORDS]]
+        elif self.matched:
+            lines.append("• Ya incluyes las palabras clave más buscadas del sector, ¡bien hecho!")
+        else:
+            lines.append("• Incluye los términos técnicos que aparecen en las ofertas de tu área")
+
+        lines += ["", "🔍 **Para superar filtros ATS:**"]
+        total = len(self.matched) + len(self.missing)
+        if total:
+            lines.append(f"• Cobertura de palabras clave del sector: {self.score:.0f}% "
+                         f"({len(self.matched)} de {total})")
+        if self.missing:
+            lines.append("• Escribe las palabras clave tal como aparecen en las ofertas, en tu experiencia y habilidades")
+        if self.recommended_format:
+            target = f" para {self.profession}" if self.profession else ""
+            lines.append(f"• Formato recomendado{target}: {self.recommended_format}")
+        lines.append("• Usa títulos de sección estándar y evita tablas, columnas y gráficos")
+        return "\n".join(lines)
+
+
+class ATSAnalyzer:
+    """Analiza localmente el CV frente a las palabras clave de la profesión.
+
+    Resuelve la profesión del catálogo que corresponde al rol del usuario con
+    `RecommendationsCatalog.match_profession`, toma sus filas y mide qué
+    palabras clave y habilidades aparecen en la educación, experiencia y
+    habilidades del usuario. Si el rol no corresponde a ninguna profesión no
+    se compara contra otra parecida: el informe queda sin profesión, formato
+    ni palabras clave y solo da los consejos generales. El cruce
+    es vectorial: una matriz de incidencia palabra clave × término multiplicada
+    por el vector de términos del usuario. Es determinista y no usa el modelo,
+    así que responde al instante aunque el modelo no esté disponible.
+    """
+
+    def __init__(self, catalog: RecommendationsCatalog):
+        self.catalog = catalog
+
+    @staticmethod
+    def _profession_keywords(rows: Sequence[Dict]) -> Tuple[List[Tuple[str, float]], Optional[str]]:
+        """Palabras clave con su peso y formato más frecuente de las filas de una profesión."""
+        keywords: Dict[str, Tuple[str, float]] = {}
+        formats: Counter = Counter()
+        for row in rows:
+            for field, weight in KEYWORD_FIELDS:
+                for keyword in str(row.get(field, "")).split(","):
+                    keyword = keyword.strip()
+                    key = " ".join(_term_keys(keyword))
+                    # Si una palabra clave aparece en los dos campos cuenta con el peso mayor
+                    if key and (key not in keywords or keywords[key][1] < weight):
+                        keywords[key] = (keyword, weight)
+            recommended_format = str(row.get("formato_recomendado", "")).strip()
+            if recommended_format:
+                formats[recommended_format] += 1
+        recommended_format = formats.most_common(1)[0][0] if formats else None
+        return list(keywords.values()), recommended_format
+
+    @DATASET_SECONDS.time(operation="ats_analysis")
+    def analyze(self, profession: Optional[str], texts: Sequence[str]) -> ATSReport:
+        """Cobertura de las palabras clave de la profesión del catálogo en los textos del usuario."""
+        if not profession:
+            return ATSReport(None, 0.0, [], [], None)
+        rows = [row for row in self.catalog.records() if str(row.get("profesion", "")).strip() == profession]
+        keywords, recommended_format = self._profession_keywords(rows)
+        if not keywords:
+            return ATSReport(profession, 0.0, [], [], recommended_format)
+
+        import numpy as np  # diferido: numpy solo se carga al analizar el primer CV
+
+        keyword_terms = [set(_term_keys(keyword)) for keyword, _ in keywords]
+        vocabulary = {term: i for i, term in enumerate(sorted(set().union(*keyword_terms)))}
+        incidence = np.zeros((len(keywords), len(vocabulary)), dtype=np.float32)
+        for row, terms in enumerate(keyword_terms):
+            incidence[row, [vocabulary[term] for term in terms]] = 1.0
+
+        user_terms = np.zeros(len(vocabulary), dtype=np.float32)
+        present = [vocabulary[term] for term in set(_term_keys(" ".join(texts))) if term in vocabulary]
+        user_terms[present] = 1.0
+
+        # Fracción de los términos de cada palabra clave que aparecen en el CV
+        coverage = (incidence @ user_terms) / incidence.sum(axis=1)
+        weights = np.array([weight for _, weight in keywords], dtype=np.float32)
+        found = coverage >= 1.0
+        score = float(np.round(100 * (weights * coverage).sum() / weights.sum(), 1))
+
+        # Primero las de más peso, conservando el orden del dataset
+        order = np.argsort(-weights, kind="stable")
+        matched = [keywords[i][0] for i in order if found[i]]
+        missing = [keywords[i][0] for i in order if not found[i]]
+        return ATSReport(profession, score, matched, missing, recommended_format)
+
+    def analyze_state(self, state: ConversationState) -> ATSReport:
+        """Analiza la educación, experiencia y habilidades recogidas en la conversación."""
+        role = state.vacancy_info or state.profession
+        profession = self.catalog.match_profession(role) if role else None
+        return self.analyze(profession, [*state.education, *state.experience, *state.skills])
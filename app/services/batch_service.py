@@ -0,0 +1,89 @@
+import asyncio
+import time
+from typing import Any, AsyncIterator, Dict, List
+from loguru import logger
+from pydantic import ValidationError
+
+from app.models.schemas.batch import CandidateProfile
+from app.services.metrics import BATCH_ITEMS
+from app.utils.text import fold_text
+
+
+class BatchCVService:
+    """Genera los CV de muchos candidatos en una sola petición (cohortes, outplacement).
+
+    Cada perfil sigue el mismo camino que una conversación completa:
+    recomendaciones iniciales y finales, y después el HTML del CV. Un número
+    fijo de workers acota la concurrencia, y los resultados se emiten según
+    terminan, no en el orden de entrada. Un perfil inválido o que falla produce
+    un resultado de error sin interrumpir el lote. Las filas de referencia del
+    dataset se buscan una sola vez por rol dentro del lote.
+    """
+
+    def __init__(self, chat_service, max_concurrency: int = 8):
+        self.chat_service = chat_service
+        self.max_concurrency = max(1, max_concurrency)
+
+    async def run(self, items: List[Any]) -> AsyncIterator[Dict]:
+        """Procesa los perfiles y emite un resultado por candidato y un resumen final."""
+        started = time.perf_counter()
+        references: Dict[str, List[Dict]] = {}
+        results: asyncio.Queue = asyncio.Queue()
+        positions = iter(range(len(items)))
+
+        async def _worker():
+            # Los workers comparten el iterador: cada uno toma el siguiente perfil libre
+            for index in positions:
+                await results.put(await self._process(index, items[index], references))
+
+        workers = [asyncio.create_task(_worker()) for _ in range(min(self.max_concurrency, len(items)))]
+        counts = {"ok": 0, "error": 0}
+        try:
+            for _ in range(len(items)):
+                result = await results.get()
+                counts[result["status"]] += 1
+                yield result
+        finally:
+            # Si el cliente se desconecta no se siguen generando CV
+            for worker in workers:
+                worker.cancel()
+
+        yield {"summary": {
+            "total": len(items),
+            "ok": counts["ok"],
+            "errors": counts["error"],
+            "distinct_roles": len(references),
+            "seconds": round(time.perf_counter() - started, 3),
+        }}
+
+    async def _process(self, index: int, item: Any, references: Dict[str, List[Dict]]) -> Dict:
+        started = time.perf_counter()
+        result: Dict[str, Any] = {"index": index, "id": item.get("id") if isinstance(item, dict) else None}
+        try:
+            profile = CandidateProfile.model_validate(item)
+            role = profile.role()
+            key = fold_text(role)
+            if key not in references:
+                references[key] = self.chat_service.dataset_service.search_recommendations(
+                    role, self.chat_service.grounding_top_k
+                )
+            state = profile.to_state()
+            html = await self.chat_service.generate_cv(state, references[key])
+            result.update(
+                status="ok",
+                initial_recommendations=state.initial_recommendations,
+                final_recommendations=state.final_recommendations,
+                cv_html=html,
+            )
+        except ValidationError as e:
+            result.update(status="error", error="Perfil inválido", details=[
+                {"field": ".".join(str(part) for part in error["loc"]), "message": error["msg"]}
+                for error in e.errors()
+            ])
+        except Exception as e:
+            logger.error(f"Error generando el CV {index} del lote: {e}")
+            result.update(status="error", error="Error generando el CV")
+
+        result["seconds"] = round(time.perf_counter() - started, 3)
+        BATCH_ITEMS.inc(status=result["status"])
+        return result
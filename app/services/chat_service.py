@@ -1,356 +1,633 @@
-from langchain_openai import ChatOpenAI
-from langchain.schema import HumanMessage, SystemMessage
 from app.models.chat import ChatSession, Message
 from app.models.conversation_state import ConversationState, ConversationStage, ConversationType
+from app.services.ats_analyzer import ATSAnalyzer
 from app.services.dataset_service import DatasetService
-from app.models.schemas.resume import Resume
+from app.services.session_locks import SessionLocks
+from app.services.session_store import SessionEntry, create_session_store
+from app.services.cv_renderer import CVRenderer
+from app.services.recommendation_cache import RecommendationCache, build_role_key
+from app.services.precomputed_recommendations import PrecomputedRecommendations
+from app.services.llm_gateway import LLMGateway
+from app.services.metrics import Family, LLM_SECONDS, RENDER_SECONDS, STAGE_SECONDS, STAGE_TRANSITIONS
+from app.services.prompts import (
+    FINAL_RECOMMENDATIONS_FALLBACK,
+    FINAL_REFERENCE_FIELDS,
+    INITIAL_RECOMMENDATIONS_FALLBACK,
+    build_final_recommendation_messages,
+    build_final_refresh_messages,
+    build_initial_recommendation_messages,
+    format_reference_rows,
+)
+from app.utils.text import estimate_tokens, fold_text, role_terms
+from app.config import Settings, get_settings
 from loguru import logger
+import asyncio
 import json
 import re
+import time
 from datetime import datetime
 import os
 from dotenv import load_dotenv
-from typing import List, Tuple
+from typing import AsyncIterator, Callable, Dict, Iterator, List, Optional, Tuple
 
 load_dotenv()
 
-class ChatService:
-    def __init__(self):
-        """Inicializa el servicio de chat."""
-        self.chat_model = ChatOpenAI(
-            openai_api_key=os.getenv("OPENAI_API_KEY"),
-            model_name="gpt-3.5-turbo",
-            temperature=0.7
-        )
-        self.conversation_states = {}
-        self.dataset_service = DatasetService()
-
-    def process_message(self, session: ChatSession, message: str) -> str:
-        """Procesa un mensaje en una sesión existente."""
-        try:
-            # Obtener o crear estado
-            state = self.conversation_states.get(session.session_id)
-            if not state:
-                state = ConversationState()
-                self.conversation_states[session.session_id] = state
+# Ajustes del CV ya completo: "<sección>: <nuevo contenido>"
+CV_EDIT_PATTERN = re.compile(r"^([^\W\d_]+)\s*:\s*(.+)$", re.DOTALL)
+CV_EDIT_SECTIONS = {
+    "contacto": "header",
+    "objetivo": "objective",
+    "vacante": "objective",
+    "profesion": "objective",
+    "educacion": "education",
+    "formacion": "education",
+    "experiencia": "experience",
+    "habilidades": "skills",
+}
+# Nombre de cada sección en la confirmación del ajuste
+CV_EDIT_LABELS = {
+    "header": "tu contacto",
+    "objective": "tu objetivo profesional",
+    "education": "Educación",
+    "experience": "Experiencia",
+    "skills": "Habilidades",
+}
 
-            logger.info(f"Processing message in stage: {state.stage}")
-
-            response, state = self._process_message(message, state)
-
-            return response
-
-        except Exception as e:
-            logger.error(f"Error processing message: {e}")
-            return "Lo siento, ha ocurrido un error. ¿Podrías intentar nuevamente?"
+class ChatService:
+    def __init__(self, chat_model=None, settings: Optional[Settings] = None,
+                 dataset_service: Optional[DatasetService] = None):
+        """Inicializa el servicio de chat.
 
-    def _process_message(self, message: str, state: ConversationState) -> Tuple[str, ConversationState]:
+        Se puede inyectar `chat_model` (por ejemplo un modelo falso local) para
+        ejecutar el flujo sin llamar a OpenAI, y `dataset_service` para leer los
+        datos de otro directorio.
+        """
+        settings = settings or get_settings()
+        # Pool HTTP, límites, reintentos y circuito del modelo (MODEL_NAME de Settings)
+        self.llm = LLMGateway(settings, chat_model)
+        self.max_tokens = {"initial": settings.LLM_MAX_TOKENS_INITIAL, "final": settings.LLM_MAX_TOKENS_FINAL}
+        self.grounding_top_k = settings.GROUNDING_TOP_K
+        self.grounding_token_budget = settings.GROUNDING_TOKEN_BUDGET
+        # Tokens de prompt y respuesta por etapa (reales si el proveedor los informa, si no estimados)
+        self.token_usage: Dict[str, Dict[str, int]] = {
+            stage: {"calls": 0, "prompt_tokens": 0, "completion_tokens": 0} for stage in self.max_tokens
+        }
+        self.session_store = create_session_store(
+            settings.SESSION_BACKEND,
+            db_path=settings.SESSION_DB_PATH,
+            max_sessions=settings.SESSION_MAX_COUNT,
+            idle_ttl_seconds=settings.SESSION_IDLE_TTL_SECONDS,
+            sweep_interval_seconds=settings.SESSION_SWEEP_INTERVAL_SECONDS
+        )
+        # Un mensaje a la vez por sesión; sesiones distintas en paralelo
+        self.session_locks = SessionLocks(settings.SESSION_MAX_PENDING_MESSAGES)
+        self.dataset_service = dataset_service or DatasetService()
+        self.cv_renderer = CVRenderer()
+        self.ats_analyzer = ATSAnalyzer(self.dataset_service.recommendations_catalog)
+        self.recommendation_cache = RecommendationCache(
+            max_size=settings.RECOMMENDATION_CACHE_MAX_SIZE,
+            ttl_seconds=settings.RECOMMENDATION_CACHE_TTL_SECONDS,
+            db_path=settings.RECOMMENDATION_CACHE_DB_PATH,
+            purge_interval_seconds=settings.RECOMMENDATION_CACHE_PURGE_INTERVAL_SECONDS
+        )
+        self.match_cached_profession = settings.RECOMMENDATION_CACHE_MATCH_PROFESSION
+        self.precomputed_recommendations = PrecomputedRecommendations(
+            settings.PRECOMPUTED_RECOMMENDATIONS_PATH,
+            self.dataset_service.recommendations_catalog
+        )
+        # Prefetch especulativo de las recomendaciones finales (por sesión)
+        self.prefetch_final = settings.FINAL_RECOMMENDATIONS_PREFETCH
+        self.prefetch_ttl = settings.SESSION_IDLE_TTL_SECONDS
+        self._prefetches: Dict[str, Tuple[float, asyncio.Task]] = {}
+        self.prefetch_stats = {"started": 0, "used": 0, "refreshed": 0, "discarded": 0}
+        # Los borradores de sesiones abandonadas se descartan con la limpieza periódica de sesiones
+        self.session_store.sweep_listeners.append(self._prune_prefetches)
+
+    def preload_tasks(self) -> Dict[str, Callable[[], object]]:
+        """Cargas independientes que el arranque ejecuta en paralelo antes de declarar la app lista."""
+        dataset_service = self.dataset_service
+        return {
+            "recommendations_catalog": dataset_service.recommendations_catalog.preload,
+            "action_verbs": dataset_service.action_verbs.preload,
+            "resumes": dataset_service.preload_resumes,
+            "precomputed_recommendations": self.precomputed_recommendations.load,
+            "llm_client": self.llm.warm_up,
+            # Importa langchain construyendo un prompt de prueba
+            "prompts": lambda: len(build_initial_recommendation_messages("")),
+        }
+
+    async def process_message(self, session: ChatSession, message: str) -> str:
+        """Procesa un mensaje en una sesión existente.
+
+        Los mensajes de una misma sesión se procesan de uno en uno; lanza
+        `SessionBusyError` si el mismo mensaje ya está en curso.
+        """
+        async with self.session_locks.hold(session.session_id, message.lower().strip()):
+            try:
+                entry = await self._get_entry(session)
+                logger.info(f"Processing message in stage: {entry.state.stage}")
+
+                try:
+                    response, entry.state = await self._process_message(message, entry.state, session.session_id)
+                finally:
+                    await self.session_store.asave(entry)
+
+                return response
+
+            except Exception as e:
+                logger.error(f"Error processing message: {e}")
+                return "Lo siento, ha ocurrido un error. ¿Podrías intentar nuevamente?"
+
+    async def stream_message(self, session: ChatSession, message: str) -> AsyncIterator[str]:
+        """Procesa un mensaje emitiendo la respuesta por fragmentos a medida que se genera."""
+        sent = False
+        async with self.session_locks.hold(session.session_id, message.lower().strip()):
+            try:
+                entry = await self._get_entry(session)
+                logger.info(f"Streaming message in stage: {entry.state.stage}")
+
+                try:
+                    async for chunk in self._process_message_stream(message, entry.state, stream_llm=True,
+                                                                    session_id=session.session_id):
+                        sent = True
+                        yield chunk
+                finally:
+                    await self.session_store.asave(entry)
+
+            except Exception as e:
+                logger.error(f"Error streaming message: {e}")
+                if not sent:
+                    yield "Lo siento, ha ocurrido un error. ¿Podrías intentar nuevamente?"
+
+    async def _get_entry(self, session: ChatSession) -> SessionEntry:
+        """Obtiene o crea la entrada (sesión y estado de conversación) en el almacén."""
+        entry = await self.session_store.aget(session.session_id)
+        if entry is None:
+            entry = await self.session_store.acreate(session)
+        return entry
+
+    async def _process_message(self, message: str, state: ConversationState,
+                               session_id: Optional[str] = None) -> Tuple[str, ConversationState]:
         """Procesa el mensaje del usuario y actualiza el estado de la conversación."""
+        chunks = [chunk async for chunk in self._process_message_stream(message, state, session_id=session_id)]
+        return "".join(chunks), state
+
+    async def _process_message_stream(self, message: str, state: ConversationState,
+                                      stream_llm: bool = False,
+                                      session_id: Optional[str] = None) -> AsyncIterator[str]:
+        """Procesa el mensaje midiendo el tiempo de la etapa y la transición a la siguiente."""
+        stage = state.stage
+        chunks = self._handle_message(message, state, stream_llm, session_id)
+        try:
+            with STAGE_SECONDS.time(stage=stage.value):
+                async for chunk in chunks:
+                    yield chunk
+        finally:
+            await chunks.aclose()
+        if state.stage != stage:
+            STAGE_TRANSITIONS.inc(from_stage=stage.value, to_stage=state.stage.value)
+
+    async def _handle_message(self, message: str, state: ConversationState,
+                              stream_llm: bool = False,
+                              session_id: Optional[str] = None) -> AsyncIterator[str]:
+        """Procesa el mensaje y emite la respuesta por fragmentos.
+
+        Con `stream_llm` los tokens del modelo se reenvían según llegan; sin él
+        cada recomendación se obtiene con una sola llamada y se emite completa.
+        """
         message = message.lower().strip()
+
+        # Cualquier mensaje salvo la consulta del CV puede modificar el estado
+        if message != "quiero ver mi cv":
+            state.touch()
         
         # Comandos especiales
         if message == "quiero ver mi cv":
             if not state.is_complete():
-                return "Aún necesito más información para generar tu CV. Continuemos con el proceso. 😊", state
-            cv_content = self._generate_cv_html(state)
-            return cv_content, state
+                yield "Aún necesito más información para generar tu CV. Continuemos con el proceso. 😊"
+                return
+            for part in self._iter_cv_html(state):
+                yield part
+            return
             
         if message in ["no", "ninguna", "ninguno", "finalizar"]:
             if state.stage != ConversationStage.COMPLETE:
                 state.stage = ConversationStage.COMPLETE
-                cv_content = self._generate_cv_html(state)
-                return f"¡Listo! Aquí tienes tu CV optimizado:\n\n{cv_content}", state
+                yield "¡Listo! Aquí tienes tu CV optimizado:\n\n"
+                for part in self._iter_cv_html(state):
+                    yield part
             else:
-                return "¡Gracias por usar nuestro asistente! Que tengas mucho éxito en tu búsqueda laboral. 🚀", state
+                yield "¡Gracias por usar nuestro asistente! Que tengas mucho éxito en tu búsqueda laboral. 🚀"
+            return
 
         # Procesar según la etapa actual
         if state.stage == ConversationStage.START:
             if message == "hola":
-                return "¡Hola! 👋 Soy tu asistente para crear un CV optimizado para ATS. Para empezar, ¿podrías compartirme tu nombre completo y correo electrónico? 📧", state
+                yield "¡Hola! 👋 Soy tu asistente para crear un CV optimizado para ATS. Para empezar, ¿podrías compartirme tu nombre completo y correo electrónico? 📧"
+                return
             
             state.personal_info["contact"] = message
             state.stage = ConversationStage.CV_TYPE
-            return (f"¡Gracias {message.split()[0].capitalize()}! 😊 Me gustaría saber un poco más sobre tus objetivos profesionales. ¿Estás buscando:\n\n"
+            yield (f"¡Gracias {message.split()[0].capitalize()}! 😊 Me gustaría saber un poco más sobre tus objetivos profesionales. ¿Estás buscando:\n\n"
                    "💼 Una posición específica (cuéntame el puesto)\n"
-                   "🎯 O prefieres un CV general para tu área profesional?"), state
+                   "🎯 O prefieres un CV general para tu área profesional?")
 
         elif state.stage == ConversationStage.CV_TYPE:
             if "1" in message or "vacante" in message or "especific" in message or "posición" in message:
                 state.cv_type = ConversationType.SPECIFIC
                 state.stage = ConversationStage.VACANCY
-                return "¡Perfecto! 🎯 Cuéntame sobre el puesto al que te gustaría aplicar. ¿Cuál es el título y las principales responsabilidades?", state
+                yield "¡Perfecto! 🎯 Cuéntame sobre el puesto al que te gustaría aplicar. ¿Cuál es el título y las principales responsabilidades?"
             else:
                 state.cv_type = ConversationType.GENERAL
                 state.stage = ConversationStage.PROFESSION
-                return "¡Entiendo! 💼 ¿En qué campo profesional te desempeñas? Cuéntame sobre tu área de especialización.", state
+                yield "¡Entiendo! 💼 ¿En qué campo profesional te desempeñas? Cuéntame sobre tu área de especialización."
 
         elif state.stage == ConversationStage.VACANCY:
             state.vacancy_info = message
-            resumes = self.dataset_service.search_resumes(message)
-            state.initial_recommendations = self._generate_initial_recommendations(resumes, message)
+            references = self.dataset_service.search_recommendations(message, self.grounding_top_k)
+            yield "¡Gracias por compartir eso! Basado en lo que me cuentas, te comparto algunas recomendaciones para crear un CV que destaque:\n\n"
+            recommendations = []
+            async for chunk in self._stream_initial_recommendations(references, message, stream_llm):
+                recommendations.append(chunk)
+                yield chunk
+            state.initial_recommendations = "".join(recommendations).strip()
             state.stage = ConversationStage.EDUCATION
-            return (f"¡Gracias por compartir eso! Basado en lo que me cuentas, te comparto algunas recomendaciones para crear un CV que destaque:\n\n"
-                   f"{state.initial_recommendations}\n\n"
-                   f"Ahora, teniendo en cuenta estas recomendaciones, cuéntame sobre tu formación académica más relevante para este puesto. 🎓"), state
+            yield "\n\nAhora, teniendo en cuenta estas recomendaciones, cuéntame sobre tu formación académica más relevante para este puesto. 🎓"
 
         elif state.stage == ConversationStage.PROFESSION:
             state.profession = message
-            resumes = self.dataset_service.search_resumes(message)
-            state.initial_recommendations = self._generate_initial_recommendations(resumes, message)
+            references = self.dataset_service.search_recommendations(message, self.grounding_top_k)
+            yield "¡Excelente elección profesional! He preparado algunas recomendaciones para potenciar tu CV en esta área:\n\n"
+            recommendations = []
+            async for chunk in self._stream_initial_recommendations(references, message, stream_llm):
+                recommendations.append(chunk)
+                yield chunk
+            state.initial_recommendations = "".join(recommendations).strip()
             state.stage = ConversationStage.EDUCATION
-            return (f"¡Excelente elección profesional! He preparado algunas recomendaciones para potenciar tu CV en esta área:\n\n"
-                   f"{state.initial_recommendations}\n\n"
-                   f"Considerando estas sugerencias, háblame de tu formación académica más relevante. 🎓"), state
+            yield "\n\nConsiderando estas sugerencias, háblame de tu formación académica más relevante. 🎓"
 
         elif state.stage == ConversationStage.EDUCATION:
             state.education.append(message)
             state.stage = ConversationStage.EXPERIENCE
-            return ("¡Gran formación! Ahora cuéntame sobre tu experiencia laboral. Recuerda incluir logros medibles y responsabilidades clave. 💪\n"
-                   "Por ejemplo: 'Lideré un equipo de 5 personas y aumenté la productividad en un 25%'"), state
+            yield ("¡Gran formación! Ahora cuéntame sobre tu experiencia laboral. Recuerda incluir logros medibles y responsabilidades clave. 💪\n"
+                   "Por ejemplo: 'Lideré un equipo de 5 personas y aumenté la productividad en un 25%'")
 
         elif state.stage == ConversationStage.EXPERIENCE:
             state.experience.append(message)
             state.stage = ConversationStage.SKILLS
-            return ("¡Impresionante experiencia! Por último, ¿cuáles son tus principales habilidades técnicas y blandas? 🌟\n"
-                   "Piensa en las herramientas que dominas y tus fortalezas personales."), state
+            if self.prefetch_final and session_id:
+                # Educación y experiencia ya se conocen: adelanta las recomendaciones finales
+                self._start_final_prefetch(session_id, state)
+            # Sugerencias de verbos de acción más fuertes para las expresiones débiles
+            verb_tips = self._suggest_action_verbs(message)
+            if verb_tips:
+                yield f"¡Impresionante experiencia!\n\n{verb_tips}\n\n"
+            else:
+                yield "¡Impresionante experiencia! "
+            yield ("Por último, ¿cuáles son tus principales habilidades técnicas y blandas? 🌟\n"
+                   "Piensa en las herramientas que dominas y tus fortalezas personales.")
 
         elif state.stage == ConversationStage.SKILLS:
             state.skills.append(message)
             state.stage = ConversationStage.COMPLETE
             
-            context = self._get_user_context(state)
-            resumes = self.dataset_service.search_resumes(state.vacancy_info or state.profession)
-            state.final_recommendations = self._generate_final_recommendations(resumes, context)
-            
-            cv_content = self._generate_cv_html(state)
-            return (f"¡Excelente! Con toda esta información, he preparado tu CV optimizado. 🎉\n\n"
-                   f"📝 **Recomendaciones para destacar aún más:**\n\n"
-                   f"{state.final_recommendations}\n\n"
-                   f"Aquí está tu CV:\n\n{cv_content}\n\n"
-                   "¿Te gustaría hacer algún ajuste? (responde 'no' si estás conforme)"), state
-
-        return "Disculpa, no logré entender tu mensaje. ¿Podrías reformularlo de otra manera?", state
+            prefetched = await self._take_final_prefetch(session_id)
+            if prefetched is not None:
+                references, draft = prefetched
+            else:
+                references = self.dataset_service.search_recommendations(
+                    state.vacancy_info or state.profession, self.grounding_top_k
+                )
+            yield ("¡Excelente! Con toda esta información, he preparado tu CV optimizado. 🎉\n\n"
+                   "📝 **Recomendaciones para destacar aún más:**\n\n")
+            # El análisis ATS es local: se emite sin esperar al modelo, aunque este no responda
+            recommendations = []
+            ats_section = self._ats_section(state)
+            if ats_section:
+                recommendations.append(ats_section + "\n\n")
+                yield recommendations[-1]
+            if prefetched is not None:
+                async for chunk in self._stream_prefetched_recommendations(state, draft, stream_llm):
+                    recommendations.append(chunk)
+                    yield chunk
+            else:
+                context = self._get_user_context(state)
+                async for chunk in self._stream_final_recommendations(references, context, stream_llm):
+                    recommendations.append(chunk)
+                    yield chunk
+            state.final_recommendations = "".join(recommendations).strip()
+
+            yield "\n\nAquí está tu CV:\n\n"
+            for part in self._iter_cv_html(state):
+                yield part
+            yield ("\n\n¿Te gustaría hacer algún ajuste? Escribe la sección y lo que quieres añadir, por ejemplo "
+                   "'habilidades: docker' (responde 'no' si estás conforme)")
+
+        elif state.stage == ConversationStage.COMPLETE:
+            previous = self.cv_renderer.section_etags(state)
+            confirmation = self._apply_cv_edit(message, state)
+            if confirmation is None:
+                yield ("Para ajustar tu CV escribe la sección y el contenido, por ejemplo "
+                       "'experiencia: lideré un equipo de 5 personas'. En educación, experiencia y habilidades "
+                       "se añade a lo que ya tienes; contacto y objetivo se reemplazan "
+                       "(responde 'no' si estás conforme).")
+                return
+            # Solo se renderizan y envían las secciones que cambiaron
+            changed = [section for section in self.cv_renderer.sections(state)
+                       if section.etag != previous.get(section.name)]
+            if not changed:
+                yield "Esa sección ya tenía ese contenido, tu CV sigue igual. ¿Algún otro ajuste?"
+                return
+            yield f"✏️ {confirmation}. Así quedó:\n\n"
+            yield self._cv_fragment_html(changed)
+            yield ("\n\n¿Algún otro ajuste? Escribe 'quiero ver mi cv' para verlo completo "
+                   "(responde 'no' si estás conforme)")
+
+        else:
+            yield "Disculpa, no logré entender tu mensaje. ¿Podrías reformularlo de otra manera?"
+
+    async def generate_cv(self, state: ConversationState, references: List[Dict]) -> str:
+        """Completa las recomendaciones de un estado ya completo y devuelve el HTML del CV.
+
+        Es el mismo camino que sigue la conversación, sin sesión: las
+        recomendaciones iniciales y finales se piden en paralelo.
+        """
+        role = state.vacancy_info or state.profession
+        state.initial_recommendations, final_recommendations = await asyncio.gather(
+            self._generate_initial_recommendations(references, role),
+            self._generate_final_recommendations(references, self._get_user_context(state)),
+        )
+        state.final_recommendations = f"{self._ats_section(state)}\n\n{final_recommendations}".strip()
+        state.touch()
+        return self._generate_cv_html(state)
 
-    def _generate_initial_recommendations(self, resumes: List[Resume], context: str) -> str:
+    async def _generate_initial_recommendations(self, references: List[Dict], context: str) -> str:
         """Genera recomendaciones iniciales para guiar la recopilación de información."""
+        chunks = [chunk async for chunk in self._stream_initial_recommendations(references, context)]
+        return "".join(chunks).strip()
+
+    async def _stream_initial_recommendations(self, references: List[Dict], context: str,
+                                              stream_llm: bool = False) -> AsyncIterator[str]:
+        """Emite las recomendaciones iniciales desde el artefacto precalculado, la caché o el modelo."""
+        precomputed = self.precomputed_recommendations.lookup(context)
+        if precomputed:
+            yield precomputed
+            return
+
+        catalog = self.dataset_service.recommendations_catalog if self.match_cached_profession else None
+        cache_key = build_role_key(context, catalog)
+        cached = await self.recommendation_cache.aget(cache_key)
+        if cached:
+            yield cached
+            return
+
+        chunks = []
         try:
-            system_prompt = (
-                "Eres un experto en desarrollo profesional y optimización de CV. "
-                "Genera recomendaciones amigables y específicas para ayudar a la persona a destacar en su CV. "
-                "Las recomendaciones deben ser conversacionales pero mantener este formato:\n\n"
-                "💫 **Lo que más valoran los reclutadores:**\n"
-                "• [3-4 aspectos clave para el rol]\n\n"
-                "📚 **Formación que marca la diferencia:**\n"
-                "• [2-3 tipos de estudios o certificaciones relevantes]\n\n"
-                "💼 **Experiencia que destaca:**\n"
-                "• [2-3 tipos de experiencias o logros importantes]\n\n"
-                "🌟 **Habilidades clave:**\n"
-                "• [3-4 habilidades técnicas y blandas esenciales]\n\n"
-                "Usa emojis y viñetas para mejor legibilidad."
-            )
-
-            human_prompt = (
-                f"Necesito recomendaciones iniciales para un CV en: {context}\n"
-                "Las recomendaciones deben ser específicas y ayudar al usuario a proporcionar mejor información."
-            )
-
-            messages = [
-                SystemMessage(content=system_prompt),
-                HumanMessage(content=human_prompt)
-            ]
-            
-            response = self.chat_model.invoke(messages)
-            return response.content.strip()
+            reference = format_reference_rows(references, self.grounding_token_budget)
+            messages = build_initial_recommendation_messages(context, reference)
+            async for chunk in self._stream_llm(messages, stream_llm, stage="initial"):
+                chunks.append(chunk)
+                yield chunk
+            await self.recommendation_cache.aset(cache_key, "".join(chunks).strip())
 
         except Exception as e:
             logger.error(f"Error generando recomendaciones iniciales: {e}")
-            return (
-                "💫 **Lo que más valoran los reclutadores:**\n"
-                "• Experiencia relevante y demostrable\n"
-                "• Logros cuantificables\n"
-                "• Proyectos destacados\n\n"
-                "📚 **Formación que marca la diferencia:**\n"
-                "• Títulos relevantes para el área\n"
-                "• Certificaciones clave\n\n"
-                "💼 **Experiencia que destaca:**\n"
-                "• Roles con responsabilidades similares\n"
-                "• Proyectos exitosos\n\n"
-                "🌟 **Habilidades clave:**\n"
-                "• Competencias técnicas específicas\n"
-                "• Habilidades de comunicación\n"
-                "• Capacidad de resolución de problemas"
-            )
-
-    def _generate_final_recommendations(self, resumes: List[Resume], context: str) -> str:
+            if not chunks:
+                yield INITIAL_RECOMMENDATIONS_FALLBACK
+
+    async def _generate_final_recommendations(self, references: List[Dict], context: str) -> str:
         """Genera recomendaciones finales personalizadas."""
+        chunks = [chunk async for chunk in self._stream_final_recommendations(references, context)]
+        return "".join(chunks).strip()
+
+    async def _stream_final_recommendations(self, references: List[Dict], context: str,
+                                            stream_llm: bool = False) -> AsyncIterator[str]:
+        """Emite las recomendaciones finales personalizadas."""
+        chunks = []
         try:
-            system_prompt = (
-                "Eres un experto en desarrollo profesional. Basado en el CV del usuario, "
-                "genera recomendaciones finales siguiendo este formato:\n\n"
-                "🎯 **Para destacar tu perfil:**\n"
-                "• [2-3 sugerencias de mejora específicas]\n\n"
-                "💡 **Para optimizar el impacto:**\n"
-                "• [2-3 consejos de formato y presentación]\n\n"
-                "⭐ **Palabras clave sugeridas:**\n"
-                "• [3-4 términos relevantes para el sector]\n\n"
-                "🔍 **Para superar filtros ATS:**\n"
-                "• [2-3 consejos específicos]\n\n"
-                "Usa emojis y viñetas para mejor legibilidad."
-            )
-
-            human_prompt = (
-                f"Genera recomendaciones finales para este CV:\n{context}\n"
-                "Las recomendaciones deben ser específicas y accionables."
-            )
-
-            messages = [
-                SystemMessage(content=system_prompt),
-                HumanMessage(content=human_prompt)
-            ]
-            
-            response = self.chat_model.invoke(messages)
-            return response.content.strip()
+            reference = format_reference_rows(references, self.grounding_token_budget, FINAL_REFERENCE_FIELDS)
+            messages = build_final_recommendation_messages(context, reference)
+            async for chunk in self._stream_llm(messages, stream_llm, stage="final"):
+                chunks.append(chunk)
+                yield chunk
 
         except Exception as e:
             logger.error(f"Error generando recomendaciones finales: {e}")
-            return (
-                "🎯 **Para destacar tu perfil:**\n"
-                "• Añade métricas específicas a tus logros\n"
-                "• Personaliza el objetivo profesional\n\n"
-                "💡 **Para optimizar el impacto:**\n"
-                "• Usa viñetas para mejor legibilidad\n"
-                "• Mantén un formato consistente\n\n"
-                "⭐ **Palabras clave sugeridas:**\n"
-                "• Términos técnicos relevantes\n"
-                "• Habilidades específicas del sector\n\n"
-                "🔍 **Para superar filtros ATS:**\n"
-                "• Incluye palabras clave de la descripción\n"
-                "• Evita tablas y gráficos complejos"
-            )
+            if not chunks:
+                yield FINAL_RECOMMENDATIONS_FALLBACK
+
+    def _start_final_prefetch(self, session_id: str, state: ConversationState) -> None:
+        """Lanza en segundo plano la búsqueda y un borrador de las recomendaciones finales."""
+        if session_id in self._prefetches:
+            # Borrador reemplazado
+            self._discard_prefetch(session_id)
+
+        query = state.vacancy_info or state.profession
+        context = self._get_user_context(state)
+
+        async def _prefetch() -> Tuple[List[Dict], str]:
+            references = self.dataset_service.search_recommendations(query, self.grounding_top_k)
+            draft = await self._generate_final_recommendations(references, context)
+            return references, draft
+
+        self._prefetches[session_id] = (time.monotonic(), asyncio.ensure_future(_prefetch()))
+        self.prefetch_stats["started"] += 1
+
+    def _discard_prefetch(self, session_id: str) -> None:
+        _, task = self._prefetches.pop(session_id)
+        task.cancel()
+        self.prefetch_stats["discarded"] += 1
+
+    def _prune_prefetches(self) -> int:
+        """Descarta los borradores que nadie recogió dentro del TTL de sesión; devuelve cuántos."""
+        cutoff = time.monotonic() - self.prefetch_ttl
+        abandoned = [key for key, (started, _) in self._prefetches.items() if started < cutoff]
+        for session_id in abandoned:
+            self._discard_prefetch(session_id)
+        return len(abandoned)
+
+    async def _take_final_prefetch(self, session_id: Optional[str]) -> Optional[Tuple[List[Dict], str]]:
+        """Recoge el borrador adelantado de la sesión, esperándolo si aún está en curso."""
+        prefetch = self._prefetches.pop(session_id, None) if session_id else None
+        if prefetch is None:
+            return None
+        try:
+            references, draft = await prefetch[1]
+        except Exception as e:
+            logger.warning(f"Prefetch de recomendaciones finales descartado: {e!r}")
+            draft = None
+        if not draft or draft == FINAL_RECOMMENDATIONS_FALLBACK:
+            self.prefetch_stats["discarded"] += 1
+            return None
+        self.prefetch_stats["used"] += 1
+        return references, draft
+
+    async def _stream_prefetched_recommendations(self, state: ConversationState, draft: str,
+                                                 stream_llm: bool = False) -> AsyncIterator[str]:
+        """Emite el borrador adelantado, ajustado a las habilidades que llegaron después de generarlo.
+
+        Si el borrador no menciona ninguna de las habilidades se sirve tal cual;
+        si menciona alguna, el modelo lo reescribe para no pedir lo que el
+        usuario ya tiene. Si el ajuste falla se sirve el borrador.
+        """
+        if not set(role_terms(" ".join(state.skills))) & set(role_terms(draft)):
+            yield draft
+            return
+
+        self.prefetch_stats["refreshed"] += 1
+        chunks = []
+        try:
+            messages = build_final_refresh_messages(draft, ", ".join(state.skills))
+            async for chunk in self._stream_llm(messages, stream_llm, stage="final"):
+                chunks.append(chunk)
+                yield chunk
+
+        except Exception as e:
+            logger.error(f"Error ajustando las recomendaciones finales a las habilidades: {e}")
+            if not chunks:
+                yield draft
+
+    def _ats_section(self, state: ConversationState) -> str:
+        """Palabras clave y consejos ATS calculados localmente a partir del dataset."""
+        try:
+            return self.ats_analyzer.analyze_state(state).format()
+        except Exception as e:
+            logger.error(f"Error analizando palabras clave ATS: {e}")
+            return ""
+
+    async def _stream_llm(self, messages, stream_llm: bool = False,
+                          stage: Optional[str] = None) -> AsyncIterator[str]:
+        """Emite el texto del modelo: por tokens con `stream_llm`, o completo con una sola llamada.
+
+        `stage` fija el máximo de tokens de la respuesta y dónde se contabilizan.
+        """
+        options = {"max_tokens": self.max_tokens[stage]} if stage in self.max_tokens else {}
+        if not stream_llm:
+            with LLM_SECONDS.time(stage=stage or "", mode="invoke"):
+                response = await self.llm.ainvoke(messages, **options)
+            content = response.content.strip()
+            self._record_token_usage(stage, messages, content, getattr(response, "response_metadata", None))
+            yield content
+            return
+
+        parts = []
+        try:
+            with LLM_SECONDS.time(stage=stage or "", mode="stream"):
+                async for content in self.llm.astream(messages, **options):
+                    if not parts:
+                        content = content.lstrip()
+                        if not content:
+                            continue
+                    parts.append(content)
+                    yield content
+        finally:
+            self._record_token_usage(stage, messages, "".join(parts))
+
+    def _record_token_usage(self, stage: Optional[str], messages, completion: str,
+                            metadata: Optional[Dict] = None) -> None:
+        """Suma los tokens de una llamada; usa los del proveedor si vienen en la respuesta."""
+        usage = self.token_usage.get(stage)
+        if usage is None:
+            return
+        reported = (metadata or {}).get("token_usage") or {}
+        usage["calls"] += 1
+        usage["prompt_tokens"] += reported.get("prompt_tokens") or sum(
+            estimate_tokens(message.content) for message in messages
+        )
+        usage["completion_tokens"] += reported.get("completion_tokens") or estimate_tokens(completion)
+
+    def collect_metrics(self) -> List[Family]:
+        """Métricas de tokens, caché, modelo y bloqueos de sesión para el endpoint /metrics."""
+        cache = self.recommendation_cache.stats()
+        llm = self.llm.metrics()
+        return [
+            ("cv_llm_tokens_total", "counter", "Tokens de prompt y respuesta por etapa", [
+                ({"stage": stage, "kind": kind}, usage[f"{kind}_tokens"])
+                for stage, usage in self.token_usage.items() for kind in ("prompt", "completion")
+            ]),
+            ("cv_llm_stage_calls_total", "counter", "Llamadas al modelo por etapa", [
+                ({"stage": stage}, usage["calls"]) for stage, usage in self.token_usage.items()
+            ]),
+            ("cv_llm_gateway_events_total", "counter", "Eventos del gateway del modelo", [
+                ({"event": event}, llm[event])
+                for event in ("calls", "retries", "failures", "rejected_circuit_open", "rate_limited_waits", "coalesced")
+            ]),
+            ("cv_llm_circuit_open", "gauge", "1 si el circuito del modelo no está cerrado", [
+                ({}, 0 if llm["circuit_state"] == "closed" else 1)
+            ]),
+            ("cv_recommendation_cache_requests_total", "counter", "Consultas a la caché de recomendaciones", [
+                ({"result": "hit"}, cache["hits"]), ({"result": "miss"}, cache["misses"])
+            ]),
+            ("cv_recommendation_cache_hit_ratio", "gauge", "Proporción de aciertos de la caché de recomendaciones", [
+                ({}, cache["hit_rate"])
+            ]),
+            ("cv_final_prefetch_total", "counter", "Borradores adelantados de recomendaciones finales", [
+                ({"result": result}, count) for result, count in self.prefetch_stats.items()
+            ]),
+            ("cv_session_rejected_messages_total", "counter", "Mensajes rechazados por sesión ocupada", [
+                ({"reason": "duplicate"}, self.session_locks.rejected_duplicates),
+                ({"reason": "queue_full"}, self.session_locks.rejected_full),
+            ]),
+        ]
 
     def _generate_cv_html(self, state: ConversationState) -> str:
         """Genera el CV en formato HTML."""
+        return "".join(self._iter_cv_html(state))
+
+    def _iter_cv_html(self, state: ConversationState) -> Iterator[str]:
+        """Genera el CV en formato HTML sección por sección."""
         try:
-            html = """
-            <!DOCTYPE html>
-            <html>
-            <head>
-                <meta charset="UTF-8">
-                <style>
-                    body {
-                        font-family: 'Arial', sans-serif;
-                        line-height: 1.6;
-                        max-width: 800px;
-                        margin: 0 auto;
-                        padding: 20px;
-                        color: #333;
-                    }
-                    h1 {
-                        color: #2c3e50;
-                        font-size: 28px;
-                        margin-bottom: 5px;
-                        border-bottom: 2px solid #3498db;
-                        padding-bottom: 10px;
-                    }
-                    h2 {
-                        color: #2c3e50;
-                        font-size: 22px;
-                        margin-top: 25px;
-                        margin-bottom: 15px;
-                        border-bottom: 1px solid #bdc3c7;
-                        padding-bottom: 5px;
-                    }
-                    .section {
-                        margin-bottom: 30px;
-                    }
-                    .contact-info {
-                        font-size: 16px;
-                        color: #555;
-                        margin-bottom: 20px;
-                    }
-                    .item {
-                        margin-bottom: 15px;
-                        padding-left: 20px;
-                        position: relative;
-                    }
-                    .item::before {
-                        content: "•";
-                        position: absolute;
-                        left: 0;
-                        color: #3498db;
-                    }
-                    .highlight {
-                        color: #3498db;
-                        font-weight: bold;
-                    }
-                </style>
-            </head>
-            <body>
-            """
-
-            # Información Personal
-            contact_info = state.personal_info.get('contact', '').strip()
-            html += f"""
-            <div class="section">
-                <h1>Curriculum Vitae</h1>
-                <div class="contact-info">{contact_info}</div>
-            </div>
-            """
-
-            # Objetivo Profesional
-            if state.cv_type == ConversationType.SPECIFIC:
-                objective = state.vacancy_info
-            else:
-                objective = f"Profesional en {state.profession}"
-            
-            html += f"""
-            <div class="section">
-                <h2>Objetivo Profesional</h2>
-                <div class="item">{objective}</div>
-            </div>
-            """
-
-            # Educación
-            if state.education:
-                html += """
-                <div class="section">
-                    <h2>Educación</h2>
-                """
-                for edu in state.education:
-                    html += f'<div class="item">{edu}</div>'
-                html += "</div>"
-
-            # Experiencia
-            if state.experience:
-                html += """
-                <div class="section">
-                    <h2>Experiencia Profesional</h2>
-                """
-                for exp in state.experience:
-                    html += f'<div class="item">{exp}</div>'
-                html += "</div>"
-
-            # Habilidades
-            if state.skills:
-                html += """
-                <div class="section">
-                    <h2>Habilidades</h2>
-                """
-                for skill in state.skills:
-                    html += f'<div class="item">{skill}</div>'
-                html += "</div>"
-
-            html += """
-            </body>
-            </html>
-            """
-
-            return html
+            with RENDER_SECONDS.time(format="html"):
+                for part in self.cv_renderer.iter_render(state):
+                    yield part
 
         except Exception as e:
             logger.error(f"Error generando HTML del CV: {str(e)}")
+            yield "Error al generar el CV. Por favor, intenta nuevamente."
+
+    def _cv_fragment_html(self, sections: List) -> str:
+        """HTML de solo las secciones indicadas del CV."""
+        try:
+            with RENDER_SECONDS.time(format="fragment"):
+                return self.cv_renderer.render_fragment(sections)
+        except Exception as e:
+            logger.error(f"Error generando HTML de las secciones del CV: {str(e)}")
             return "Error al generar el CV. Por favor, intenta nuevamente."
 
+    def _apply_cv_edit(self, message: str, state: ConversationState) -> Optional[str]:
+        """Aplica un ajuste "<sección>: <contenido>" y describe el cambio; None si el mensaje no es un ajuste.
+
+        Contacto y objetivo tienen un solo valor y se reemplazan; en educación,
+        experiencia y habilidades el contenido se añade a lo ya recogido.
+        """
+        match = CV_EDIT_PATTERN.match(message)
+        section = CV_EDIT_SECTIONS.get(fold_text(match.group(1))) if match else None
+        if section is None:
+            return None
+        value = match.group(2).strip()
+        label = CV_EDIT_LABELS[section]
+        if section == "header":
+            state.personal_info["contact"] = value
+            return f"Reemplacé {label} por \"{value}\""
+        if section == "objective":
+            if state.cv_type == ConversationType.SPECIFIC:
+                state.vacancy_info = value
+            else:
+                state.profession = value
+            return f"Reemplacé {label} por \"{value}\""
+        items = getattr(state, section)
+        if value not in items:
+            items.append(value)
+        return f"Añadí \"{value}\" a {label}"
+
+    def _suggest_action_verbs(self, text: str) -> str:
+        try:
+            action_verbs = self.dataset_service.action_verbs
+            return action_verbs.format_suggestions(action_verbs.suggest(text))
+        except Exception as e:
+            logger.error(f"Error sugiriendo verbos de acción: {e}")
+            return ""
+
     def _get_user_context(self, state: ConversationState) -> str:
         """Obtiene el contexto del usuario para generar recomendaciones."""
         return f"""
@@ -0,0 +1,133 @@
+import hashlib
+import json
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+from jinja2 import Environment, FileSystemLoader, select_autoescape
+
+from app.models.conversation_state import ConversationState, ConversationType
+from app.services.metrics import CV_SECTION_RENDERS
+
+CV_TEMPLATE = "cv/cv.html"
+FRAGMENT_TEMPLATE = "cv/fragment.html"
+# Orden de las secciones en el documento
+SECTIONS = ("header", "objective", "education", "experience", "skills")
+
+
+class CVSection:
+    """Sección del CV ya renderizada, identificada por el hash de sus datos."""
+    __slots__ = ("name", "etag", "html")
+
+    def __init__(self, name: str, etag: str, html: str):
+        self.name = name
+        self.etag = etag
+        self.html = html
+
+    def to_dict(self, include_html: bool = True) -> Dict[str, Any]:
+        data = {"name": self.name, "etag": self.etag}
+        if include_html:
+            data["html"] = self.html
+        return data
+
+
+def _fingerprint(name: str, data: Dict[str, Any]) -> str:
+    payload = json.dumps([name, data], ensure_ascii=False, sort_keys=True).encode("utf-8")
+    return hashlib.blake2b(payload, digest_size=8).hexdigest()
+
+
+class CVRenderer:
+    """Renderiza el CV con plantillas Jinja2 compiladas una sola vez.
+
+    Cada sección (cabecera, objetivo, educación, experiencia, habilidades) se
+    renderiza con su propia plantilla y se memoriza en el estado junto al hash
+    de sus datos: un ajuste en una sección solo vuelve a renderizar esa
+    sección. El hash de cada sección es su etag y el del documento se deriva de
+    ellos, así que sirve para revalidar el CV sin renderizarlo.
+    """
+
+    def __init__(self, templates_dir: str = "app/templates", stylesheet_url: str = "/static/css/cv.css",
+                 static_dir: str = "app/static"):
+        self.stylesheet_url = stylesheet_url
+        self.stylesheet_path = Path(static_dir) / stylesheet_url.replace("/static/", "", 1)
+        self._inline_css: Optional[str] = None
+        self.env = Environment(
+            loader=FileSystemLoader(templates_dir),
+            autoescape=select_autoescape(["html"]),
+            trim_blocks=True,
+            lstrip_blocks=True,
+            auto_reload=False,
+        )
+        self.template = self.env.get_template(CV_TEMPLATE)
+        self.fragment_template = self.env.get_template(FRAGMENT_TEMPLATE)
+        self.section_templates = {name: self.env.get_template(f"cv/sections/{name}.html") for name in SECTIONS}
+
+    def build_context(self, state: ConversationState) -> Dict[str, Dict[str, Any]]:
+        """Datos de la plantilla de cada sección a partir del estado de la conversación."""
+        if state.cv_type == ConversationType.SPECIFIC:
+            objective = state.vacancy_info
+        else:
+            objective = f"Profesional en {state.profession}"
+
+        return {
+            "header": {"contact_info": state.personal_info.get("contact", "").strip()},
+            "objective": {"objective": objective},
+            "education": {"education": state.education},
+            "experience": {"experience": state.experience},
+            "skills": {"skills": state.skills},
+        }
+
+    def sections(self, state: ConversationState) -> List[CVSection]:
+        """Secciones con contenido, en orden; solo se renderizan las que cambiaron."""
+        result = []
+        for name, data in self.build_context(state).items():
+            etag = _fingerprint(name, data)
+            section = state.cv_sections.get(name)
+            if section is None or section.etag != etag:
+                html = self.section_templates[name].render(**data).strip()
+                section = state.cv_sections[name] = CVSection(name, etag, html)
+                CV_SECTION_RENDERS.inc(result="rendered")
+            else:
+                CV_SECTION_RENDERS.inc(result="reused")
+            if section.html:
+                result.append(section)
+        return result
+
+    def section_etags(self, state: ConversationState) -> Dict[str, str]:
+        """Etag de cada sección sin renderizar ninguna."""
+        return {name: _fingerprint(name, data) for name, data in self.build_context(state).items()}
+
+    def etag(self, state: ConversationState) -> str:
+        """Etag del documento completo: cambia si cambia cualquier sección o la hoja de estilos."""
+        etags = self.section_etags(state)
+        payload = "|".join([self.stylesheet_url] + [etags[name] for name in SECTIONS]).encode("utf-8")
+        return f'"{hashlib.blake2b(payload, digest_size=12).hexdigest()}"'
+
+    def render(self, state: ConversationState) -> str:
+        """Devuelve el HTML del CV, reutilizando el memorizado si el estado no cambió."""
+        return "".join(self.iter_render(state))
+
+    def iter_render(self, state: ConversationState) -> Iterator[str]:
+        """Emite el HTML del CV por fragmentos a medida que se renderiza."""
+        cached = state.cv_html_cache
+        if cached is not None and cached[0] == state.version:
+            yield cached[1]
+            return
+
+        parts = []
+        sections = [section.html for section in self.sections(state)]
+        for part in self.template.generate(stylesheet_url=self.stylesheet_url, sections=sections):
+            parts.append(part)
+            yield part
+        state.cv_html_cache = (state.version, "".join(parts))
+
+    def render_fragment(self, sections: Iterable[CVSection]) -> str:
+        """HTML de solo algunas secciones, con la hoja de estilos, para mostrarlas en el chat."""
+        return self.fragment_template.render(
+            stylesheet_url=self.stylesheet_url, sections=[section.html for section in sections]
+        )
+
+    def render_standalone(self, state: ConversationState) -> str:
+        """HTML autocontenido, con los estilos en línea, para exportar el CV fuera del navegador."""
+        if self._inline_css is None:
+            self._inline_css = self.stylesheet_path.read_text(encoding="utf-8")
+        sections = [section.html for section in self.sections(state)]
+        return self.template.render(inline_css=self._inline_css, sections=sections)
@@ -1,31 +1,59 @@
-import json
-import pandas as pd
+import threading
 from pathlib import Path
 from typing import List, Optional, Dict
 from app.models.schemas.resume import Resume
+from app.services.action_verbs import ActionVerbCatalog
+from app.services.metrics import DATASET_SECONDS
+from app.services.recommendations_catalog import RecommendationsCatalog
+from app.services.resume_repository import ResumeRepository
+from app.services.resume_store import ResumeStore
 from loguru import logger
 
 class DatasetService:
-    def __init__(self):
-        self.data_dir = Path("app/data")
+    def __init__(self, data_dir: Path = Path("app/data")):
+        self.data_dir = Path(data_dir)
         self.datasets_dir = self.data_dir / "datasets"
         self.resume_file = self.data_dir / "resumes.json"
+        self.resume_store_file = self.data_dir / "resumes.jsonl"
         self.recommendations_file = self.datasets_dir / "recomendaciones_hoja_vida.csv"
         self.action_verbs_file = self.datasets_dir / "verbos_en_accion.xlsx"
-        self._ensure_dirs()
+        self.action_verbs_cache_file = self.data_dir / "cache" / "verbos_en_accion.json"
+        # Nada toca el disco al construir el servicio: los datasets se cargan en el
+        # primer uso o en la precarga del arranque
+        self.resume_store = ResumeStore(self.resume_store_file)
+        self.resume_repository = ResumeRepository(self.resume_store)
+        self._resume_store_ready = False
+        self._resume_store_lock = threading.Lock()
+        self.recommendations_catalog = RecommendationsCatalog(self.recommendations_file)
+        self.action_verbs = ActionVerbCatalog(self.action_verbs_file, self.action_verbs_cache_file)
         
     def _ensure_dirs(self):
         """Asegura que los directorios necesarios existen"""
         self.data_dir.mkdir(parents=True, exist_ok=True)
         self.datasets_dir.mkdir(parents=True, exist_ok=True)
-        if not self.resume_file.exists():
-            self.resume_file.write_text("[]")
+
+    def _ensure_resume_store(self):
+        """Prepara el almacén de resumes la primera vez que se usa"""
+        if self._resume_store_ready:
+            return
+        with self._resume_store_lock:
+            if self._resume_store_ready:
+                return
+            self._ensure_dirs()
+            # Migración única del antiguo resumes.json al almacén append-only
+            self.resume_store.migrate_from_json(self.resume_file)
+            self._resume_store_ready = True
+
+    def preload_resumes(self) -> int:
+        """Prepara el almacén, valida los resumes guardados y devuelve cuántos hay"""
+        self._ensure_resume_store()
+        return len(self.resume_repository)
     
     def load_resumes(self) -> List[Resume]:
         """Carga todos los resumes del dataset"""
         try:
-            data = json.loads(self.resume_file.read_text())
-            return [Resume(**item) for item in data]
+            self._ensure_resume_store()
+            return self.resume_repository.all()
         except Exception as e:
             logger.error(f"Error loading resumes: {e}")
             return []
@@ -33,108 +61,80 @@ class DatasetService:
     def save_resume(self, resume: Resume) -> bool:
         """Guarda un nuevo resume en el dataset"""
         try:
-            resumes = self.load_resumes()
-            resumes.append(resume)
-            self.resume_file.write_text(
-                json.dumps([r.dict() for r in resumes], indent=2, default=str)
-            )
+            self._ensure_resume_store()
+            self.resume_repository.save(resume)
             return True
         except Exception as e:
             logger.error(f"Error saving resume: {e}")
             return False
     
-    def search_resumes(self, query: str) -> List[Resume]:
-        """Busca resumes y recomendaciones basado en un query simple"""
+    @DATASET_SECONDS.time(operation="search_resumes")
+    def search_resumes(self, query: str, top_k: int = 5) -> List[Dict]:
+        """Busca los resumes y recomendaciones más relevantes para un texto libre (ranking BM25).
+
+        Cada resultado indica su origen ("resume" o "recommendation"), su
+        puntuación BM25 y los datos: el resume guardado o la fila del CSV tal
+        cual, que no tiene los campos obligatorios de `Resume`. Las puntuaciones
+        solo son comparables entre resultados del mismo origen.
+        """
         results = []
-        query = query.lower()
+        self._ensure_resume_store()
         
-        # Buscar en resumes.json
-        resumes = self.load_resumes()
-        json_results = [
-            resume for resume in resumes
-            if query in resume.summary.lower() or
-            any(skill.name.lower() == query for skill in resume.skills) or
-            any(exp.position.lower() == query for exp in resume.experience)
-        ]
-        results.extend(json_results)
+        # Buscar en los resumes guardados (ya validados y en caché)
+        results.extend(
+            {"source": "resume", "score": float(score), "data": resume.model_dump(mode="json")}
+            for resume, score in self.resume_repository.rank(query, top_k)
+        )
         
         # Buscar en recomendaciones_hoja_vida.csv
         try:
-            if self.recommendations_file.exists():
-                df = pd.read_csv(self.recommendations_file)
-                # Buscar en la columna de profesión y palabras clave
-                mask = (
-                    df['profesion'].str.lower().str.contains(query, na=False) |
-                    df['palabras_clave'].str.lower().str.contains(query, na=False)
-                )
-                csv_results = df[mask].to_dict('records')
-                
-                # Convertir resultados CSV a objetos Resume
-                for result in csv_results:
-                    resume = Resume(
-                        name=result['profesion'],
-                        summary=result.get('consejos_adicionales', ''),
-                        skills=[{"name": skill.strip()} for skill in result.get('habilidades_clave', '').split(',')],
-                        experience=[{
-                            "position": result['profesion'],
-                            "description": result.get('experiencia_laboral', '')
-                        }]
-                    )
-                    results.append(resume)
+            # Filas más relevantes por profesión, palabras clave y habilidades
+            results.extend(
+                {"source": "recommendation", "score": float(score), "data": row}
+                for row, score in self.recommendations_catalog.rank(query, top_k)
+            )
         except Exception as e:
             logger.error(f"Error searching in recommendations file: {e}")
         
         return results
 
+    @DATASET_SECONDS.time(operation="search_recommendations")
+    def search_recommendations(self, query: str, top_k: int = 3) -> List[Dict]:
+        """Filas del dataset de recomendaciones más relevantes para un texto libre"""
+        try:
+            return [row for row, _ in self.recommendations_catalog.rank(query, top_k)]
+        except Exception as e:
+            logger.error(f"Error searching recommendations: {e}")
+            return []
+
+    @DATASET_SECONDS.time(operation="get_cv_recommendations")
     def get_cv_recommendations(self, role: str = None) -> List[Dict]:
         """Obtiene recomendaciones del dataset de hojas de vida"""
         try:
-            if not self.recommendations_file.exists():
-                logger.warning(f"Recommendations file not found: {self.recommendations_file}")
-                return []
-            
-            df = pd.read_csv(self.recommendations_file)
             if role:
-                # Si se especifica un rol, filtrar por ese rol
-                role_lower = role.lower()
-                df = df[df['role'].str.lower().str.contains(role_lower, na=False)]
-            
-            # Convertir a lista de diccionarios
-            recommendations = df.to_dict('records')
+                # Si se especifica un rol, filtrar por la profesión
+                recommendations = self.recommendations_catalog.search(role, fields=("profesion",))
+            else:
+                recommendations = self.recommendations_catalog.records()
             return recommendations[:5]  # Retornar las 5 primeras recomendaciones
             
         except Exception as e:
             logger.error(f"Error loading CV recommendations: {e}")
             return []
 
+    @DATASET_SECONDS.time(operation="get_action_verbs")
     def get_action_verbs(self, category: str = None) -> List[str]:
         """Obtiene verbos de acción del dataset de verbos"""
         try:
-            if not self.action_verbs_file.exists():
-                logger.warning(f"Action verbs file not found: {self.action_verbs_file}")
-                return []
-            
-            df = pd.read_excel(self.action_verbs_file)
-            if category:
-                # Si se especifica una categoría, filtrar por esa categoría
-                category_lower = category.lower()
-                df = df[df['category'].str.lower().str.contains(category_lower, na=False)]
-            
-            # Obtener lista única de verbos
-            verbs = df['verb'].unique().tolist()
-            return verbs
-            
+            # El Excel se parsea una sola vez y se sirve desde memoria
+            return self.action_verbs.verbs(category)
         except Exception as e:
             logger.error(f"Error loading action verbs: {e}")
             return []
 
+    @DATASET_SECONDS.time(operation="get_common_skills")
     def get_common_skills(self) -> List[str]:
         """Obtiene las habilidades más comunes del dataset"""
-        resumes = self.load_resumes()
-        skills = {}
-        
-        for resume in resumes:
-            for skill in resume.skills:
-                skills[skill.name] = skills.get(skill.name, 0) + 1
-        
-        return sorted(skills.keys(), key=lambda x: skills[x], reverse=True)
+        # Los conteos se mantienen de forma incremental al guardar cada resume
+        self._ensure_resume_store()
+        return list(self.resume_repository.common_skills())
@@ -0,0 +1,45 @@
+import asyncio
+import time
+from typing import AsyncIterator, List
+from langchain.schema import AIMessage, BaseMessage
+from langchain.schema.messages import AIMessageChunk
+
+
+class FakeChatModel:
+    """Modelo de chat local y determinista para pruebas y benchmarks.
+
+    Imita la interfaz `invoke`/`ainvoke`/`astream` de los modelos de LangChain y
+    espera `latency` segundos antes de responder, sin hacer llamadas de red.
+    """
+
+    def __init__(self, latency: float = 0.0, response: str = None):
+        self.latency = latency
+        self.response = response
+        self.calls = 0
+
+    def _build_response(self, messages: List[BaseMessage]) -> AIMessage:
+        self.calls += 1
+        if self.response is not None:
+            return AIMessage(content=self.response)
+        prompt = messages[-1].content if messages else ""
+        return AIMessage(content=f"• Recomendación simulada para: {prompt[:80]}")
+
+    def invoke(self, messages: List[BaseMessage], **kwargs) -> AIMessage:
+        if self.latency:
+            time.sleep(self.latency)
+        return self._build_response(messages)
+
+    async def ainvoke(self, messages: List[BaseMessage], **kwargs) -> AIMessage:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return self._build_response(messages)
+
+    async def astream(self, messages: List[BaseMessage], **kwargs) -> AsyncIterator[AIMessageChunk]:
+        # La latencia total se reparte entre los fragmentos, como un stream real
+        content = self._build_response(messages).content
+        words = content.split(" ")
+        delay = self.latency / len(words) if self.latency else 0
+        for position, word in enumerate(words):
+            if delay:
+                await asyncio.sleep(delay)
+            yield AIMessageChunk(content=word if position == 0 else " " + word)
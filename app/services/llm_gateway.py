@@ -0,0 +1,330 @@
+import asyncio
+import hashlib
+import json
+import random
+import threading
+import time
+from typing import AsyncIterator, Dict
+from loguru import logger
+
+from app.config import Settings
+from app.services.single_flight import SingleFlight
+
+
+class CircuitOpenError(Exception):
+    """El circuito está abierto: el modelo se considera caído y no se llama."""
+
+
+class QueueTimeoutError(Exception):
+    """No hubo cupo para llamar al modelo dentro del timeout (saturación local)."""
+
+
+class TokenBucket:
+    """Limitador de ritmo: `rate` llamadas por segundo con ráfagas de hasta `capacity`."""
+
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = max(1, capacity)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self.waits = 0
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        if self.rate <= 0:
+            return
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                self.waits += 1
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class CircuitBreaker:
+    """Circuito de tres estados (cerrado, abierto, semiabierto).
+
+    Tras `failure_threshold` fallos seguidos se abre y rechaza las llamadas
+    durante `reset_timeout` segundos; después deja pasar una llamada de prueba
+    y vuelve a cerrarse si tiene éxito. Si la prueba no termina (por ejemplo,
+    se cancela) se permite otra pasado el mismo intervalo.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.trips = 0
+        self.probe_started = 0.0
+
+    def allow(self) -> bool:
+        if self.state == self.CLOSED:
+            return True
+        now = time.monotonic()
+        if self.state == self.OPEN and now - self.opened_at >= self.reset_timeout:
+            self.state = self.HALF_OPEN
+            self.probe_started = 0.0
+        if self.state == self.HALF_OPEN and now - self.probe_started >= self.reset_timeout:
+            self.probe_started = now
+            return True
+        return False
+
+    def record_success(self) -> None:
+        self.state = self.CLOSED
+        self.failures = 0
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            if self.state != self.OPEN:
+                self.trips += 1
+                logger.warning(f"Circuito del modelo abierto tras {self.failures} fallos")
+            self.state = self.OPEN
+            self.opened_at = time.monotonic()
+
+
+def _is_retryable(error: Exception) -> bool:
+    """Reintenta errores de red, 429 y 5xx; no los de la petición (4xx) ni los timeouts."""
+    if isinstance(error, asyncio.TimeoutError):
+        # Reintentar un upstream lento solo multiplica la espera
+        return False
+    status = getattr(error, "status_code", None)
+    return status is None or status == 429 or status >= 500
+
+
+def prompt_key(messages, options: Dict) -> str:
+    """Clave de un prompt normalizado (roles, texto sin espacios sobrantes y opciones)."""
+    payload = json.dumps([
+        [[getattr(message, "type", ""), " ".join(str(message.content).split())] for message in messages],
+        sorted(options.items()),
+    ], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def create_chat_model(settings: Settings, http_client):
+    """Cliente ChatOpenAI sobre un pool de conexiones HTTP compartido y sin reintentos propios."""
+    import openai
+    from langchain_openai import ChatOpenAI
+
+    async_client = openai.AsyncOpenAI(
+        api_key=settings.OPENAI_API_KEY,
+        timeout=settings.LLM_TIMEOUT_SECONDS,
+        max_retries=0,
+        http_client=http_client,
+    ).chat.completions
+    return ChatOpenAI(
+        openai_api_key=settings.OPENAI_API_KEY,
+        model_name=settings.MODEL_NAME,
+        temperature=0.7,
+        max_retries=0,
+        async_client=async_client,
+    )
+
+
+class LLMGateway:
+    """Punto único de acceso al modelo de lenguaje.
+
+    Aplica, en este orden, el circuito, el limitador de ritmo, el límite de
+    concurrencia y el timeout, y reintenta los errores transitorios con backoff
+    exponencial y jitter. Con el circuito abierto falla de inmediato con
+    `CircuitOpenError` para que quien llama use su texto de respaldo.
+    Las llamadas concurrentes con el mismo prompt comparten una sola petición.
+    """
+
+    def __init__(self, settings: Settings, chat_model=None):
+        self.settings = settings
+        self._http_client = None
+        # Sin modelo inyectado, el cliente de OpenAI se crea en el primer uso (o en `warm_up`)
+        self._chat_model = chat_model
+        self._model_lock = threading.Lock()
+        self.timeout = settings.LLM_TIMEOUT_SECONDS
+        self.max_retries = settings.LLM_MAX_RETRIES
+        self.retry_base_delay = settings.LLM_RETRY_BASE_DELAY_SECONDS
+        self.retry_max_delay = settings.LLM_RETRY_MAX_DELAY_SECONDS
+        self._semaphore = asyncio.Semaphore(settings.LLM_MAX_CONCURRENCY)
+        self.rate_limiter = TokenBucket(settings.LLM_RATE_LIMIT_PER_SECOND, settings.LLM_RATE_LIMIT_BURST)
+        self.breaker = CircuitBreaker(settings.LLM_CIRCUIT_FAILURE_THRESHOLD, settings.LLM_CIRCUIT_RESET_SECONDS)
+        self.calls = 0
+        self.retries = 0
+        self.failures = 0
+        self.rejected = 0
+        self.coalesce = settings.LLM_COALESCE_IDENTICAL_PROMPTS
+        self.single_flight = SingleFlight()
+
+    @property
+    def chat_model(self):
+        if self._chat_model is None:
+            with self._model_lock:
+                if self._chat_model is None:
+                    import httpx
+
+                    self._http_client = httpx.AsyncClient(limits=httpx.Limits(
+                        max_connections=self.settings.LLM_HTTP_MAX_CONNECTIONS,
+                        max_keepalive_connections=self.settings.LLM_HTTP_MAX_KEEPALIVE,
+                    ))
+                    self._chat_model = create_chat_model(self.settings, self._http_client)
+        return self._chat_model
+
+    @chat_model.setter
+    def chat_model(self, chat_model) -> None:
+        self._chat_model = chat_model
+
+    def warm_up(self) -> str:
+        """Importa y construye el cliente del modelo; devuelve el nombre de su clase."""
+        return type(self.chat_model).__name__
+
+    def _check_circuit(self) -> None:
+        if not self.breaker.allow():
+            self.rejected += 1
+            raise CircuitOpenError("El modelo no está disponible temporalmente")
+
+    def _record_failure(self, error: Exception) -> None:
+        self.failures += 1
+        self.breaker.record_failure()
+        logger.warning(f"Fallo en la llamada al modelo: {error!r}")
+
+    async def _backoff(self, attempt: int) -> None:
+        self.retries += 1
+        # Full jitter: evita que los reintentos de muchas peticiones lleguen juntos
+        delay = random.uniform(0, min(self.retry_max_delay, self.retry_base_delay * 2 ** attempt))
+        await asyncio.sleep(delay)
+
+    async def _acquire_slot(self) -> None:
+        """Espera turno del limitador y cupo de concurrencia, dentro del timeout.
+
+        Un timeout aquí indica saturación local, no un fallo del modelo, así
+        que no cuenta para el circuito.
+        """
+        async def _acquire():
+            await self.rate_limiter.acquire()
+            await self._semaphore.acquire()
+
+        try:
+            await asyncio.wait_for(_acquire(), timeout=self.timeout)
+        except asyncio.TimeoutError:
+            raise QueueTimeoutError("No hubo cupo para llamar al modelo a tiempo") from None
+
+    async def _invoke_once(self, messages, **options):
+        await self._acquire_slot()
+        try:
+            return await asyncio.wait_for(self.chat_model.ainvoke(messages, **options), timeout=self.timeout)
+        finally:
+            self._semaphore.release()
+
+    async def ainvoke(self, messages, **options):
+        """Llama al modelo y devuelve el mensaje completo."""
+        if not self.coalesce:
+            return await self._ainvoke_with_retries(messages, **options)
+        return await self.single_flight.run(
+            prompt_key(messages, options), lambda: self._ainvoke_with_retries(messages, **options)
+        )
+
+    async def astream(self, messages, **options) -> AsyncIterator[str]:
+        """Emite el texto del modelo por fragmentos."""
+        if not self.coalesce:
+            source = self._astream_with_retries(messages, **options)
+        else:
+            source = self.single_flight.stream(
+                prompt_key(messages, options), lambda: self._astream_with_retries(messages, **options)
+            )
+        try:
+            async for content in source:
+                yield content
+        finally:
+            await source.aclose()
+
+    async def _ainvoke_with_retries(self, messages, **options):
+        attempt = 0
+        while True:
+            self._check_circuit()
+            self.calls += 1
+            try:
+                response = await self._invoke_once(messages, **options)
+            except (asyncio.CancelledError, QueueTimeoutError):
+                raise
+            except Exception as e:
+                self._record_failure(e)
+                if attempt >= self.max_retries or not _is_retryable(e):
+                    raise
+                await self._backoff(attempt)
+                attempt += 1
+                continue
+
+            self.breaker.record_success()
+            return response
+
+    async def _stream_once(self, messages, **options) -> AsyncIterator[str]:
+        await self._acquire_slot()
+        stream = self.chat_model.astream(messages, **options).__aiter__()
+        try:
+            while True:
+                try:
+                    chunk = await asyncio.wait_for(stream.__anext__(), timeout=self.timeout)
+                except StopAsyncIteration:
+                    return
+                if chunk.content:
+                    yield chunk.content
+        finally:
+            self._semaphore.release()
+            if hasattr(stream, "aclose"):
+                await stream.aclose()
+
+    async def _astream_with_retries(self, messages, **options) -> AsyncIterator[str]:
+        """Stream con reintentos.
+
+        El timeout se aplica a la espera del cupo y a cada fragmento. Solo se
+        reintenta si el error ocurre antes del primer fragmento emitido.
+        """
+        attempt = 0
+        while True:
+            self._check_circuit()
+            self.calls += 1
+            sent = False
+            stream = self._stream_once(messages, **options)
+            try:
+                async for content in stream:
+                    sent = True
+                    yield content
+            except QueueTimeoutError:
+                raise
+            except Exception as e:
+                self._record_failure(e)
+                if sent or attempt >= self.max_retries or not _is_retryable(e):
+                    raise
+            else:
+                self.breaker.record_success()
+                return
+            finally:
+                await stream.aclose()
+
+            await self._backoff(attempt)
+            attempt += 1
+
+    def metrics(self) -> Dict[str, object]:
+        """Métricas de las llamadas al modelo."""
+        return {
+            "calls": self.calls,
+            "retries": self.retries,
+            "failures": self.failures,
+            "rejected_circuit_open": self.rejected,
+            "rate_limited_waits": self.rate_limiter.waits,
+            "circuit_state": self.breaker.state,
+            "circuit_trips": self.breaker.trips,
+            "coalesced": self.single_flight.coalesced,
+            "in_flight": self.single_flight.in_flight(),
+        }
+
+    async def aclose(self) -> None:
+        """Cierra el pool de conexiones HTTP del cliente."""
+        if self._http_client is not None:
+            await self._http_client.aclose()
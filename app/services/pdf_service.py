@@ -0,0 +1,98 @@
+import asyncio
+import hashlib
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from typing import Callable, Dict, Optional
+from loguru import logger
+
+from app.services.single_flight import SingleFlight
+
+
+def render_pdf(html: str) -> bytes:
+    """Convierte HTML autocontenido a PDF con WeasyPrint (se ejecuta en un proceso del pool)."""
+    from weasyprint import HTML
+
+    return HTML(string=html).write_pdf()
+
+
+class PDFExportService:
+    """Exporta el CV a PDF en un pool de procesos, sin bloquear el event loop.
+
+    Las peticiones esperan turno en una cola acotada por `max_concurrency`; las
+    que llegan con el mismo HTML mientras otra se renderiza comparten ese
+    trabajo (con `SingleFlight`: si quien lo inició se desconecta, el render
+    sigue para los demás y se guarda en caché), y los PDF ya generados se
+    sirven desde una caché LRU indexada por el hash del contenido.
+    """
+
+    def __init__(self, max_workers: int = 2, max_concurrency: int = 2, cache_size: int = 128,
+                 render_func: Callable[[str], bytes] = render_pdf):
+        self.max_workers = max_workers
+        self.cache_size = cache_size
+        self.render_func = render_func
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._cache: "OrderedDict[str, bytes]" = OrderedDict()
+        self._jobs = SingleFlight()
+        self.hits = 0
+        self.renders = 0
+        self.failures = 0
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        # El pool se crea al primer uso para no lanzar procesos al importar la app
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+        return self._executor
+
+    @staticmethod
+    def content_hash(html: str) -> str:
+        return hashlib.sha256(html.encode("utf-8")).hexdigest()
+
+    async def render(self, html: str) -> bytes:
+        """Devuelve el PDF del HTML dado, desde la caché o renderizándolo en el pool."""
+        key = self.content_hash(html)
+        cached = self._cache.get(key)
+        if cached is not None:
+            self._cache.move_to_end(key)
+            self.hits += 1
+            return cached
+
+        return await self._jobs.run(key, partial(self._render_job, key, html))
+
+    async def _render_job(self, key: str, html: str) -> bytes:
+        try:
+            async with self._semaphore:
+                loop = asyncio.get_running_loop()
+                pdf = await loop.run_in_executor(self._get_executor(), self.render_func, html)
+        except Exception as e:
+            self.failures += 1
+            logger.error(f"Error generando PDF: {e!r}")
+            raise
+        self.renders += 1
+        self._store(key, pdf)
+        return pdf
+
+    def _store(self, key: str, pdf: bytes) -> None:
+        self._cache[key] = pdf
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    def shutdown(self) -> None:
+        """Cierra el pool de procesos."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def metrics(self) -> Dict[str, int]:
+        """Métricas de la exportación a PDF."""
+        return {
+            "cache_size": len(self._cache),
+            # Las peticiones que se suman a un render en curso cuentan como aciertos
+            "cache_hits": self.hits + self._jobs.coalesced,
+            "cache_misses": self._jobs.executed,
+            "renders": self.renders,
+            "failures": self.failures,
+            "jobs_in_flight": self._jobs.in_flight(),
+        }
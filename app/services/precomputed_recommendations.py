@@ -0,0 +1,190 @@
+"""Recomendaciones iniciales precalculadas para las profesiones del dataset.
+
+Construcción del artefacto (una vez, fuera de línea):
+
+    python -m app.services.precomputed_recommendations
+    python -m app.services.precomputed_recommendations --fake --output /tmp/prueba.json   # sin llamar a OpenAI
+
+`ChatService` sirve estas recomendaciones directamente cuando el texto del
+usuario corresponde a una profesión conocida y solo llama al LLM para roles
+desconocidos. Los artefactos generados con el modelo falso no se sirven nunca.
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import threading
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Optional
+from loguru import logger
+
+from app.services.prompts import (
+    DEFAULT_REFERENCE_TOKEN_BUDGET,
+    DEFAULT_REFERENCE_TOP_K,
+    INITIAL_RECOMMENDATIONS_SYSTEM_PROMPT,
+    build_initial_recommendation_messages,
+    format_reference_rows,
+)
+from app.services.recommendations_catalog import RecommendationsCatalog
+
+ARTIFACT_FORMAT_VERSION = 1
+# Nombre de modelo que marca los artefactos generados con FakeChatModel
+FAKE_MODEL_NAME = "fake"
+
+
+def prompt_fingerprint() -> str:
+    """Huella del prompt de recomendaciones iniciales; cambia si se edita el prompt."""
+    probe = build_initial_recommendation_messages("{profesion}", "{referencia}")
+    payload = INITIAL_RECOMMENDATIONS_SYSTEM_PROMPT + "\n" + probe[-1].content
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def file_fingerprint(path: Path) -> str:
+    """SHA-256 del contenido de un archivo."""
+    return hashlib.sha256(Path(path).read_bytes()).hexdigest()
+
+
+class PrecomputedRecommendations:
+    """Lee el artefacto versionado y resuelve recomendaciones por profesión.
+
+    El artefacto se carga en la primera consulta o con `load` durante el arranque.
+    """
+
+    def __init__(self, path: Path, catalog: RecommendationsCatalog):
+        self.path = Path(path)
+        self.catalog = catalog
+        self.entries: Dict[str, str] = {}
+        self.metadata: Dict = {}
+        self._loaded = False
+        self._lock = threading.Lock()
+
+    def load(self) -> int:
+        """Carga el artefacto si existe y es compatible; devuelve el número de entradas."""
+        with self._lock:
+            count = self._load()
+            self._loaded = True
+            return count
+
+    def _load(self) -> int:
+        self.entries, self.metadata = {}, {}
+        if not self.path.exists():
+            logger.info(f"Sin recomendaciones precalculadas en {self.path}")
+            return 0
+
+        try:
+            artifact = json.loads(self.path.read_text(encoding="utf-8"))
+        except Exception as e:
+            logger.error(f"Error leyendo recomendaciones precalculadas: {e}")
+            return 0
+
+        if artifact.get("format_version") != ARTIFACT_FORMAT_VERSION:
+            logger.warning(f"Versión de artefacto no soportada: {artifact.get('format_version')}")
+            return 0
+        if artifact.get("model") == FAKE_MODEL_NAME:
+            # Textos de relleno del modelo falso: nunca deben llegar a los usuarios
+            logger.warning(f"Artefacto generado con el modelo falso en {self.path}; se ignora")
+            return 0
+        if artifact.get("prompt_sha256") != prompt_fingerprint():
+            # El prompt cambió: servir el artefacto daría respuestas con otro formato
+            logger.warning("Recomendaciones precalculadas obsoletas (el prompt cambió); se ignoran")
+            return 0
+        if self.catalog.csv_path.exists() and artifact.get("dataset_sha256") != file_fingerprint(self.catalog.csv_path):
+            logger.warning("El dataset cambió desde que se generaron las recomendaciones precalculadas")
+
+        self.entries = artifact.get("entries", {})
+        self.metadata = {key: value for key, value in artifact.items() if key != "entries"}
+        logger.info(f"Recomendaciones precalculadas cargadas: {len(self.entries)} profesiones")
+        return len(self.entries)
+
+    def lookup(self, text: str) -> Optional[str]:
+        """Recomendaciones para la profesión conocida que corresponde al texto, si existe."""
+        if not self._loaded:
+            with self._lock:
+                if not self._loaded:
+                    self._load()
+                    self._loaded = True
+        if not self.entries:
+            return None
+        profession = self.catalog.match_profession(text)
+        if not profession:
+            return None
+        return self.entries.get(profession)
+
+
+async def build_artifact(catalog: RecommendationsCatalog, chat_model, output_path: Path,
+                         model_name: str, concurrency: int = 4, top_k: int = DEFAULT_REFERENCE_TOP_K,
+                         token_budget: int = DEFAULT_REFERENCE_TOKEN_BUDGET) -> Dict:
+    """Genera las recomendaciones de cada profesión del dataset y escribe el artefacto."""
+    professions: List[str] = list(dict.fromkeys(
+        str(record["profesion"]) for record in catalog.records() if record.get("profesion")
+    ))
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def _generate(profession: str) -> Optional[str]:
+        async with semaphore:
+            try:
+                # Mismas filas de referencia que usaría el chat para esta profesión
+                reference = format_reference_rows([row for row, _ in catalog.rank(profession, top_k)], token_budget)
+                response = await chat_model.ainvoke(build_initial_recommendation_messages(profession, reference))
+                return response.content.strip()
+            except Exception as e:
+                logger.error(f"Error generando recomendaciones para {profession}: {e}")
+                return None
+
+    results = await asyncio.gather(*[_generate(profession) for profession in professions])
+    entries = {profession: text for profession, text in zip(professions, results) if text}
+
+    artifact = {
+        "format_version": ARTIFACT_FORMAT_VERSION,
+        "generated_at": datetime.now(timezone.utc).isoformat(),
+        "model": model_name,
+        "prompt_sha256": prompt_fingerprint(),
+        "dataset_sha256": file_fingerprint(catalog.csv_path),
+        "entries": entries,
+    }
+
+    output_path = Path(output_path)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = output_path.with_suffix(output_path.suffix + ".tmp")
+    tmp_path.write_text(json.dumps(artifact, ensure_ascii=False, indent=2), encoding="utf-8")
+    os.replace(tmp_path, output_path)
+
+    logger.info(f"Artefacto generado en {output_path}: {len(entries)}/{len(professions)} profesiones")
+    return artifact
+
+
+def main() -> None:
+    from dotenv import load_dotenv
+    from app.config import get_settings
+    from app.services.dataset_service import DatasetService
+
+    load_dotenv()
+
+    parser = argparse.ArgumentParser(description="Precalcula las recomendaciones iniciales del dataset")
+    parser.add_argument("--output", type=Path, default=None,
+                        help="por defecto PRECOMPUTED_RECOMMENDATIONS_PATH; obligatorio con --fake")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--fake", action="store_true", help="Usa un modelo local falso (builds sin red)")
+    args = parser.parse_args()
+
+    settings = get_settings()
+    if args.fake:
+        if args.output is None:
+            parser.error("--fake requiere --output: el artefacto falso no puede reemplazar al de producción")
+        from app.services.fake_chat_model import FakeChatModel
+        chat_model, model_name = FakeChatModel(), FAKE_MODEL_NAME
+    else:
+        from app.services.llm_gateway import LLMGateway
+        chat_model, model_name = LLMGateway(settings), settings.MODEL_NAME
+
+    output = args.output or Path(settings.PRECOMPUTED_RECOMMENDATIONS_PATH)
+    catalog = DatasetService().recommendations_catalog
+    # Mismas filas de referencia y presupuesto que el chat en vivo
+    asyncio.run(build_artifact(catalog, chat_model, output, model_name, args.concurrency,
+                               top_k=settings.GROUNDING_TOP_K, token_budget=settings.GROUNDING_TOKEN_BUDGET))
+
+
+if __name__ == "__main__":
+    main()
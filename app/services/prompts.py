@@ -0,0 +1,148 @@
+from typing import TYPE_CHECKING, Dict, List, Tuple
+
+from app.utils.text import estimate_tokens
+
+if TYPE_CHECKING:
+    from langchain.schema import BaseMessage
+
+# Columnas del dataset que se incluyen como referencia en los prompts
+REFERENCE_FIELDS = (
+    ("habilidades_clave", "Habilidades"),
+    ("palabras_clave", "Palabras clave"),
+    ("formato_recomendado", "Formato"),
+)
+# Las palabras clave y el formato de las recomendaciones finales los cubre ATSAnalyzer
+FINAL_REFERENCE_FIELDS = (
+    ("habilidades_clave", "Habilidades"),
+)
+DEFAULT_REFERENCE_TOP_K = 3
+DEFAULT_REFERENCE_TOKEN_BUDGET = 300
+
+INITIAL_RECOMMENDATIONS_SYSTEM_PROMPT = (
+    "Eres un experto en desarrollo profesional y optimización de CV. "
+    "Genera recomendaciones amigables y específicas para ayudar a la persona a destacar en su CV. "
+    "Las recomendaciones deben ser conversacionales pero mantener este formato:\n\n"
+    "💫 **Lo que más valoran los reclutadores:**\n"
+    "• [3-4 aspectos clave para el rol]\n\n"
+    "📚 **Formación que marca la diferencia:**\n"
+    "• [2-3 tipos de estudios o certificaciones relevantes]\n\n"
+    "💼 **Experiencia que destaca:**\n"
+    "• [2-3 tipos de experiencias o logros importantes]\n\n"
+    "🌟 **Habilidades clave:**\n"
+    "• [3-4 habilidades técnicas y blandas esenciales]\n\n"
+    "Usa emojis y viñetas para mejor legibilidad."
+)
+
+FINAL_RECOMMENDATIONS_SYSTEM_PROMPT = (
+    "Eres un experto en desarrollo profesional. Basado en el CV del usuario, "
+    "genera recomendaciones finales siguiendo este formato:\n\n"
+    "🎯 **Para destacar tu perfil:**\n"
+    "• [2-3 sugerencias de mejora específicas]\n\n"
+    "💡 **Para optimizar el impacto:**\n"
+    "• [2-3 consejos de formato y presentación]\n\n"
+    "No incluyas palabras clave ni consejos sobre filtros ATS; se añaden aparte. "
+    "Usa emojis y viñetas para mejor legibilidad."
+)
+
+INITIAL_RECOMMENDATIONS_FALLBACK = (
+    "💫 **Lo que más valoran los reclutadores:**\n"
+    "• Experiencia relevante y demostrable\n"
+    "• Logros cuantificables\n"
+    "• Proyectos destacados\n\n"
+    "📚 **Formación que marca la diferencia:**\n"
+    "• Títulos relevantes para el área\n"
+    "• Certificaciones clave\n\n"
+    "💼 **Experiencia que destaca:**\n"
+    "• Roles con responsabilidades similares\n"
+    "• Proyectos exitosos\n\n"
+    "🌟 **Habilidades clave:**\n"
+    "• Competencias técnicas específicas\n"
+    "• Habilidades de comunicación\n"
+    "• Capacidad de resolución de problemas"
+)
+
+FINAL_RECOMMENDATIONS_FALLBACK = (
+    "🎯 **Para destacar tu perfil:**\n"
+    "• Añade métricas específicas a tus logros\n"
+    "• Personaliza el objetivo profesional\n\n"
+    "💡 **Para optimizar el impacto:**\n"
+    "• Usa viñetas para mejor legibilidad\n"
+    "• Mantén un formato consistente"
+)
+
+
+def format_reference_rows(rows: List[Dict], token_budget: int = DEFAULT_REFERENCE_TOKEN_BUDGET,
+                          fields: Tuple[Tuple[str, str], ...] = REFERENCE_FIELDS) -> str:
+    """Resume las filas del dataset para el prompt sin superar `token_budget` tokens estimados."""
+    lines: List[str] = []
+    used = 0
+    for row in rows:
+        parts = [
+            f"{label}: {str(row.get(field, '')).strip()}"
+            for field, label in fields if str(row.get(field, "")).strip()
+        ]
+        if not parts:
+            continue
+        heading = str(row.get("profesion", "")).strip()
+        if str(row.get("experiencia_laboral", "")).strip():
+            heading += f" ({str(row['experiencia_laboral']).strip()})"
+        line = f"- {heading}: " + "; ".join(parts)
+        cost = estimate_tokens(line)
+        if line in lines or used + cost > token_budget:
+            continue
+        lines.append(line)
+        used += cost
+    return "\n".join(lines)
+
+
+def _with_reference(prompt: str, reference: str) -> str:
+    if not reference:
+        return prompt
+    return (
+        f"{prompt}\n\nDatos de referencia del sector:\n{reference}\n"
+        "Apóyate en estos datos y sé breve: una línea por viñeta."
+    )
+
+
+def build_final_refresh_messages(draft: str, skills: str) -> List["BaseMessage"]:
+    """Mensajes para ajustar un borrador de recomendaciones finales a las habilidades recibidas después."""
+    from langchain.schema import HumanMessage, SystemMessage
+
+    human_prompt = (
+        f"Este borrador de recomendaciones finales se escribió antes de conocer las habilidades del usuario:\n"
+        f"{draft}\n\nHabilidades del usuario: {skills}\n"
+        "Devuélvelo con el mismo formato, cambiando las sugerencias que pidan añadir o desarrollar "
+        "habilidades que ya tiene por otras específicas y accionables."
+    )
+    return [
+        SystemMessage(content=FINAL_RECOMMENDATIONS_SYSTEM_PROMPT),
+        HumanMessage(content=human_prompt)
+    ]
+
+
+def build_initial_recommendation_messages(context: str, reference: str = "") -> List["BaseMessage"]:
+    """Mensajes para las recomendaciones iniciales de un rol o vacante."""
+    from langchain.schema import HumanMessage, SystemMessage
+
+    human_prompt = (
+        f"Necesito recomendaciones iniciales para un CV en: {context}\n"
+        "Las recomendaciones deben ser específicas y ayudar al usuario a proporcionar mejor información."
+    )
+    return [
+        SystemMessage(content=INITIAL_RECOMMENDATIONS_SYSTEM_PROMPT),
+        HumanMessage(content=_with_reference(human_prompt, reference))
+    ]
+
+
+def build_final_recommendation_messages(context: str, reference: str = "") -> List["BaseMessage"]:
+    """Mensajes para las recomendaciones finales sobre el CV completo."""
+    from langchain.schema import HumanMessage, SystemMessage
+
+    human_prompt = (
+        f"Genera recomendaciones finales para este CV:\n{context}\n"
+        "Las recomendaciones deben ser específicas y accionables."
+    )
+    return [
+        SystemMessage(content=FINAL_RECOMMENDATIONS_SYSTEM_PROMPT),
+        HumanMessage(content=_with_reference(human_prompt, reference))
+    ]
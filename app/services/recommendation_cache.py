@@ -0,0 +1,231 @@
+import asyncio
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+from loguru import logger
+
+from app.services.recommendations_catalog import RecommendationsCatalog
+from app.utils.text import fold_text, role_terms
+
+
+def build_role_key(text: str, catalog: Optional[RecommendationsCatalog] = None) -> Optional[str]:
+    """Construye la clave de caché para el rol o vacante escrito por el usuario.
+
+    Si el texto corresponde a una profesión del catálogo se usa esa profesión
+    como clave canónica; en otro caso, los términos normalizados ordenados.
+    """
+    if catalog is not None:
+        profession = catalog.match_profession(text)
+        if profession:
+            return f"profesion:{fold_text(profession)}"
+
+    terms = sorted(set(role_terms(text)))
+    if not terms:
+        return None
+    return "rol:" + " ".join(terms)
+
+
+class RecommendationCache:
+    """Caché LRU con TTL para las recomendaciones iniciales.
+
+    Opcionalmente se respalda en SQLite (modo WAL) para sobrevivir reinicios y
+    compartirse entre varios procesos de uvicorn. Desde el event loop se usan
+    `aget` y `aset`, que consultan la base de datos en un hilo propio de la
+    caché; la purga de expirados y el recorte al tamaño máximo corren en una
+    tarea periódica (`start_purger`), fuera del camino de las peticiones.
+    """
+
+    def __init__(self, max_size: int = 1024, ttl_seconds: float = 86400,
+                 db_path: Optional[str] = None, purge_interval_seconds: float = 300):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.purge_interval_seconds = purge_interval_seconds
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._purger: Optional[asyncio.Task] = None
+        if db_path:
+            self._db = self._open_db(Path(db_path))
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="recommendation-cache")
+
+    @staticmethod
+    def _open_db(path: Path) -> sqlite3.Connection:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        db = sqlite3.connect(str(path), check_same_thread=False, isolation_level=None)
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute("PRAGMA busy_timeout=5000")
+        db.execute(
+            "CREATE TABLE IF NOT EXISTS recommendation_cache ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+        )
+        db.execute(
+            "CREATE INDEX IF NOT EXISTS idx_recommendation_cache_expires "
+            "ON recommendation_cache (expires_at)"
+        )
+        return db
+
+    def get(self, key: Optional[str]) -> Optional[str]:
+        """Devuelve el valor vigente para la clave o None si no existe o expiró."""
+        if not key:
+            return None
+
+        now = time.time()
+        value = self._get_from_memory(key, now)
+        if value is not None:
+            return value
+        return self._promote(key, self._get_from_db(key, now))
+
+    async def aget(self, key: Optional[str]) -> Optional[str]:
+        """Como `get`, pero la consulta a la base de datos no bloquea el event loop."""
+        if not key:
+            return None
+
+        now = time.time()
+        value = self._get_from_memory(key, now)
+        if value is not None:
+            return value
+        return self._promote(key, await self._run(self._get_from_db, key, now))
+
+    def set(self, key: Optional[str], value: str) -> None:
+        """Guarda el valor con el TTL configurado, desalojando las entradas menos usadas."""
+        if not key or not value:
+            return
+
+        expires_at = time.time() + self.ttl_seconds
+        with self._lock:
+            self._store_in_memory(key, value, expires_at)
+        self._set_in_db(key, value, expires_at)
+
+    async def aset(self, key: Optional[str], value: str) -> None:
+        """Como `set`, pero la escritura en la base de datos no bloquea el event loop."""
+        if not key or not value:
+            return
+
+        expires_at = time.time() + self.ttl_seconds
+        with self._lock:
+            self._store_in_memory(key, value, expires_at)
+        await self._run(self._set_in_db, key, value, expires_at)
+
+    async def _run(self, func, *args):
+        if self._executor is None:
+            return func(*args)
+        return await asyncio.get_running_loop().run_in_executor(self._executor, partial(func, *args))
+
+    def _get_from_memory(self, key: str, now: float) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at > now:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return value
+            del self._entries[key]
+            return None
+
+    def _promote(self, key: str, stored: Optional[Tuple[float, str]]) -> Optional[str]:
+        with self._lock:
+            if stored is None:
+                self.misses += 1
+                return None
+            # Se promueve a memoria con el TTL restante del disco
+            self._store_in_memory(key, stored[1], stored[0])
+            self.hits += 1
+            return stored[1]
+
+    def _store_in_memory(self, key: str, value: str, expires_at: float) -> None:
+        self._entries[key] = (expires_at, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def _get_from_db(self, key: str, now: float) -> Optional[Tuple[float, str]]:
+        if self._db is None:
+            return None
+        try:
+            row = self._db.execute(
+                "SELECT expires_at, value FROM recommendation_cache WHERE key = ? AND expires_at > ?",
+                (key, now),
+            ).fetchone()
+            return (row[0], row[1]) if row else None
+        except sqlite3.Error as e:
+            logger.error(f"Error leyendo la caché de recomendaciones: {e}")
+            return None
+
+    def _set_in_db(self, key: str, value: str, expires_at: float) -> None:
+        if self._db is None:
+            return
+        try:
+            self._db.execute(
+                "INSERT OR REPLACE INTO recommendation_cache (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, value, expires_at),
+            )
+        except sqlite3.Error as e:
+            logger.error(f"Error guardando en la caché de recomendaciones: {e}")
+
+    def purge(self) -> int:
+        """Elimina del disco las entradas expiradas y el exceso sobre `max_size`; devuelve cuántas."""
+        if self._db is None:
+            return 0
+        expired = self._db.execute("DELETE FROM recommendation_cache WHERE expires_at <= ?", (time.time(),))
+        trimmed = self._db.execute(
+            "DELETE FROM recommendation_cache WHERE key IN ("
+            "SELECT key FROM recommendation_cache ORDER BY expires_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_size,),
+        )
+        return max(expired.rowcount, 0) + max(trimmed.rowcount, 0)
+
+    async def _run_purger(self) -> None:
+        while True:
+            await asyncio.sleep(self.purge_interval_seconds)
+            try:
+                removed = await self._run(self.purge)
+                if removed:
+                    logger.info(f"Recomendaciones eliminadas de la caché en disco: {removed}")
+            except Exception as e:
+                logger.error(f"Error purgando la caché de recomendaciones: {e}")
+
+    def start_purger(self) -> None:
+        """Inicia la purga periódica en el event loop actual (solo con caché en disco)."""
+        if self._db is not None and (self._purger is None or self._purger.done()):
+            self._purger = asyncio.create_task(self._run_purger())
+
+    async def stop_purger(self) -> None:
+        """Detiene la purga periódica."""
+        if self._purger is not None:
+            self._purger.cancel()
+            try:
+                await self._purger
+            except asyncio.CancelledError:
+                pass
+            self._purger = None
+
+    def clear(self) -> None:
+        """Vacía la caché en memoria y en disco."""
+        with self._lock:
+            self._entries.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM recommendation_cache")
+
+    def stats(self) -> Dict[str, float]:
+        """Contadores de uso de la caché."""
+        total = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
@@ -0,0 +1,167 @@
+import threading
+from pathlib import Path
+from typing import Dict, FrozenSet, List, Optional, Set, Tuple
+from loguru import logger
+
+from app.services.retrieval import BM25Index, document_terms
+from app.utils.text import fold_text, role_terms, tokenize
+
+SEARCH_FIELDS = ("profesion", "palabras_clave")
+# Campos que alimentan el ranking BM25 y cuántas veces pesa cada uno
+RANK_FIELDS = (("profesion", 3), ("palabras_clave", 2), ("habilidades_clave", 1))
+
+
+class _CatalogSnapshot:
+    """Vista inmutable del dataset cargado; se reemplaza completa al recargar."""
+
+    __slots__ = ("mtime", "records", "indexes", "professions", "ranker")
+
+    def __init__(self, mtime: Optional[int], records: List[Dict], indexes: Dict[str, Dict[str, Set[int]]],
+                 professions: List[Tuple[str, FrozenSet[str]]], ranker: Optional[BM25Index]):
+        self.mtime = mtime
+        self.records = records
+        self.indexes = indexes
+        self.professions = professions
+        self.ranker = ranker
+
+
+# Sin índice BM25: construirlo al importar cargaría NumPy antes de tiempo
+_EMPTY_SNAPSHOT = _CatalogSnapshot(None, [], {field: {} for field in SEARCH_FIELDS}, [], None)
+
+
+class RecommendationsCatalog:
+    """Catálogo en memoria de recomendaciones_hoja_vida.csv con índice invertido por token.
+
+    El CSV se lee una sola vez y se vuelve a cargar solo cuando cambia su mtime,
+    de modo que las búsquedas no repiten el parseo ni recorren todas las filas.
+    """
+
+    def __init__(self, csv_path: Path):
+        self.csv_path = Path(csv_path)
+        self._snapshot = _EMPTY_SNAPSHOT
+        self._lock = threading.Lock()
+
+    def _current_mtime(self) -> Optional[int]:
+        try:
+            return self.csv_path.stat().st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def _ensure_fresh(self) -> _CatalogSnapshot:
+        """Recarga el catálogo si el archivo cambió desde la última lectura."""
+        mtime = self._current_mtime()
+        snapshot = self._snapshot
+        if mtime == snapshot.mtime:
+            return snapshot
+
+        with self._lock:
+            snapshot = self._snapshot
+            if mtime == snapshot.mtime:
+                return snapshot
+            if mtime is None:
+                logger.warning(f"Recommendations file not found: {self.csv_path}")
+                self._snapshot = _EMPTY_SNAPSHOT
+            else:
+                try:
+                    self._snapshot = self._build_snapshot(mtime)
+                    logger.info(f"Catálogo de recomendaciones cargado: {len(self._snapshot.records)} filas")
+                except Exception as e:
+                    # Se mantiene la última versión válida, marcada con el mtime fallido
+                    # para no volver a parsear el archivo hasta que cambie otra vez
+                    logger.error(f"Error loading recommendations catalog: {e}")
+                    self._snapshot = _CatalogSnapshot(mtime, snapshot.records, snapshot.indexes,
+                                                      snapshot.professions, snapshot.ranker)
+            return self._snapshot
+
+    def _build_snapshot(self, mtime: int) -> _CatalogSnapshot:
+        # pandas se importa al cargar el CSV, no al importar la app
+        import pandas as pd
+
+        frame = pd.read_csv(self.csv_path).fillna("")
+        records = frame.to_dict("records")
+
+        indexes: Dict[str, Dict[str, Set[int]]] = {}
+        for field in SEARCH_FIELDS:
+            column = frame[field] if field in frame.columns else pd.Series([""] * len(frame))
+            folded = column.astype(str).map(fold_text)
+            index: Dict[str, Set[int]] = {}
+            for row_id, text in enumerate(folded):
+                for token in tokenize(text):
+                    index.setdefault(token, set()).add(row_id)
+            indexes[field] = index
+
+        professions = []
+        for profession in dict.fromkeys(str(record.get("profesion", "")) for record in records):
+            terms = frozenset(role_terms(profession))
+            if terms:
+                professions.append((profession, terms))
+
+        ranker = BM25Index([
+            document_terms((str(record.get(field, "")), weight) for field, weight in RANK_FIELDS)
+            for record in records
+        ])
+
+        return _CatalogSnapshot(mtime, records, indexes, professions, ranker)
+
+    @staticmethod
+    def _match_field(index: Dict[str, Set[int]], tokens: List[str]) -> Set[int]:
+        """Filas cuyo campo contiene todos los tokens de la consulta."""
+        postings = [index.get(token) for token in tokens]
+        if not postings or any(p is None for p in postings):
+            return set()
+        postings.sort(key=len)
+        matches = set(postings[0])
+        for posting in postings[1:]:
+            matches &= posting
+            if not matches:
+                break
+        return matches
+
+    def search(self, query: str, fields: Tuple[str, ...] = SEARCH_FIELDS) -> List[Dict]:
+        """Busca filas cuyo campo de profesión o palabras clave contenga la consulta."""
+        tokens = tokenize(query)
+        if not tokens:
+            return []
+
+        snapshot = self._ensure_fresh()
+        row_ids: Set[int] = set()
+        for field in fields:
+            row_ids |= self._match_field(snapshot.indexes.get(field, {}), tokens)
+        return [snapshot.records[row_id] for row_id in sorted(row_ids)]
+
+    def rank(self, query: str, k: int = 5) -> List[Tuple[Dict, float]]:
+        """Las `k` filas más relevantes para un texto libre, con su puntuación BM25.
+
+        A diferencia de `search`, no exige que aparezcan todos los términos, así
+        que respuestas como "soy desarrolladora backend con 3 años" encuentran
+        las filas de la profesión aunque traigan palabras de más.
+        """
+        snapshot = self._ensure_fresh()
+        if snapshot.ranker is None:
+            return []
+        return [(snapshot.records[row_id], score) for row_id, score in snapshot.ranker.search(query, k)]
+
+    def match_profession(self, text: str) -> Optional[str]:
+        """Devuelve la profesión del catálogo cuyos términos aparecen todos en el texto.
+
+        La comparación ignora acentos, palabras vacías y flexiones de género y
+        número; si varias coinciden se elige la más específica.
+        """
+        query_terms = set(role_terms(text))
+        if not query_terms:
+            return None
+
+        best: Optional[str] = None
+        best_size = 0
+        for profession, terms in self._ensure_fresh().professions:
+            if terms <= query_terms and len(terms) > best_size:
+                best, best_size = profession, len(terms)
+        return best
+
+    def records(self) -> List[Dict]:
+        """Devuelve todas las filas del catálogo."""
+        return self._ensure_fresh().records
+
+    def preload(self) -> int:
+        """Fuerza la carga inicial y devuelve el número de filas."""
+        return len(self._ensure_fresh().records)
@@ -0,0 +1,138 @@
+import threading
+from collections import Counter
+from typing import Dict, Iterator, List, Optional, Tuple
+from pydantic import ValidationError
+from loguru import logger
+
+from app.models.schemas.resume import Resume
+from app.services.resume_store import ResumeStore
+from app.services.retrieval import BM25Index, document_terms
+
+
+class ResumeRepository:
+    """Vista en caché y validada del almacén de resumes.
+
+    Cada registro se valida con pydantic una sola vez: en cada acceso solo se
+    leen las líneas agregadas desde la última sincronización, y si el archivo
+    se reemplaza (cambia el mtime sin crecer) se recarga completo. La frecuencia
+    de habilidades se mantiene de forma incremental al guardar.
+    """
+
+    def __init__(self, store: ResumeStore):
+        self.store = store
+        self._lock = threading.RLock()
+        self._resumes: Dict[str, Resume] = {}
+        self._skill_counts: Counter = Counter()
+        self._sorted_skills: Optional[List[str]] = None
+        self._offset = 0
+        self._file_state: Optional[Tuple[int, int]] = None
+        self.invalid_records = 0
+        # Se incrementa con cada cambio para invalidar el índice de búsqueda
+        self.generation = 0
+        self._ranker: Optional[Tuple[int, List[Resume], BM25Index]] = None
+
+    def _current_file_state(self) -> Optional[Tuple[int, int]]:
+        try:
+            stat = self.store.path.stat()
+            return stat.st_mtime_ns, stat.st_size
+        except FileNotFoundError:
+            return None
+
+    def _sync(self) -> None:
+        """Incorpora los cambios del archivo desde la última lectura."""
+        file_state = self._current_file_state()
+        if file_state == self._file_state:
+            return
+
+        with self._lock:
+            file_state = self._current_file_state()
+            if file_state == self._file_state:
+                return
+            if file_state is None or file_state[1] < self._offset or (
+                self._file_state is not None and file_state[1] == self._file_state[1]
+            ):
+                # El archivo desapareció o fue reescrito: recargar desde cero
+                self._reset()
+
+            records, self._offset = self.store.read_since(self._offset)
+            for record in records:
+                self._add(record)
+            self._file_state = file_state
+
+    def _reset(self) -> None:
+        self._resumes.clear()
+        self._skill_counts.clear()
+        self._sorted_skills = None
+        self._offset = 0
+        self.invalid_records = 0
+        self.generation += 1
+
+    def _add(self, record: Dict) -> None:
+        record_id = str(record.get("id", ""))
+        try:
+            resume = Resume(**record)
+        except ValidationError as e:
+            self.invalid_records += 1
+            logger.warning(f"Resume {record_id or '?'} inválido; se omite ({e.error_count()} errores)")
+            return
+
+        previous = self._resumes.pop(record_id, None)
+        if previous is not None:
+            self._skill_counts.subtract(skill.name for skill in previous.skills)
+        self._resumes[record_id] = resume
+        self._skill_counts.update(skill.name for skill in resume.skills)
+        self._sorted_skills = None
+        self.generation += 1
+
+    def iter_resumes(self) -> Iterator[Resume]:
+        """Recorre los resumes válidos ya parseados, sin volver a validarlos."""
+        self._sync()
+        with self._lock:
+            # Copia solo referencias para que una sincronización concurrente no rompa la iteración
+            snapshot = tuple(self._resumes.values())
+        yield from snapshot
+
+    def all(self) -> List[Resume]:
+        """Lista de todos los resumes válidos."""
+        self._sync()
+        return list(self._resumes.values())
+
+    def get(self, record_id: str) -> Optional[Resume]:
+        self._sync()
+        return self._resumes.get(record_id)
+
+    def save(self, resume: Resume) -> str:
+        """Guarda un resume en el almacén y actualiza la caché y los conteos."""
+        record_id = self.store.append(resume.dict())
+        self._sync()
+        return record_id
+
+    def rank(self, query: str, k: int = 5) -> List[Tuple[Resume, float]]:
+        """Los `k` resumes más relevantes para un texto libre, con su puntuación BM25."""
+        self._sync()
+        with self._lock:
+            if self._ranker is None or self._ranker[0] != self.generation:
+                resumes = list(self._resumes.values())
+                self._ranker = (self.generation, resumes, BM25Index([self._document(r) for r in resumes]))
+            _, resumes, ranker = self._ranker
+        return [(resumes[doc_id], score) for doc_id, score in ranker.search(query, k)]
+
+    @staticmethod
+    def _document(resume: Resume) -> List[str]:
+        fields = [(resume.summary, 1)]
+        fields.extend((experience.position, 3) for experience in resume.experience)
+        fields.extend((" ".join(experience.description), 1) for experience in resume.experience)
+        fields.extend((skill.name, 2) for skill in resume.skills)
+        return document_terms(fields)
+
+    def common_skills(self) -> List[str]:
+        """Habilidades ordenadas de la más a la menos frecuente."""
+        self._sync()
+        with self._lock:
+            if self._sorted_skills is None:
+                self._sorted_skills = [name for name, count in self._skill_counts.most_common() if count > 0]
+            return self._sorted_skills
+
+    def __len__(self) -> int:
+        self._sync()
+        return len(self._resumes)
@@ -0,0 +1,181 @@
+import json
+import os
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+from uuid import uuid4
+from loguru import logger
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+
+
+class ResumeStore:
+    """Almacenamiento append-only de resumes en JSON Lines.
+
+    Cada resume es una línea; guardar uno cuesta O(1) sin importar el tamaño del
+    dataset. Las escrituras se hacen con una sola llamada `write` en modo append
+    bajo un bloqueo de archivo, por lo que son seguras entre procesos, y un
+    índice en memoria (id -> offset) permite leer un resume sin recorrer el
+    archivo. Si un id se repite, prevalece la última línea.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.lock_path = self.path.with_name(self.path.name + ".lock")
+        self._index: Dict[str, int] = {}
+        self._indexed_size = 0
+        self._thread_lock = threading.RLock()
+
+    @contextmanager
+    def _file_lock(self):
+        """Bloqueo entre procesos (flock) y entre hilos del mismo proceso."""
+        with self._thread_lock:
+            self.lock_path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.lock_path, "a") as lock_file:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    if fcntl is not None:
+                        fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def append(self, record: Dict) -> str:
+        """Agrega un resume al final del archivo y devuelve su id."""
+        record = dict(record)
+        record_id = str(record.get("id") or uuid4().hex)
+        record["id"] = record_id
+        line = (json.dumps(record, ensure_ascii=False, default=str, separators=(",", ":")) + "\n").encode("utf-8")
+
+        with self._file_lock():
+            self._refresh_index()
+            fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            try:
+                offset = os.fstat(fd).st_size
+                os.write(fd, line)
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+            self._index[record_id] = offset
+            self._indexed_size = offset + len(line)
+        return record_id
+
+    def get(self, record_id: str) -> Optional[Dict]:
+        """Lee un resume por id usando el índice de offsets."""
+        self._refresh_index()
+        offset = self._index.get(record_id)
+        if offset is None:
+            return None
+        with open(self.path, "rb") as f:
+            f.seek(offset)
+            return json.loads(f.readline())
+
+    def iter_records(self) -> Iterator[Dict]:
+        """Recorre los resumes en orden de escritura sin cargar todo el archivo."""
+        if not self.path.exists():
+            return
+        with open(self.path, "rb") as f:
+            for line in f:
+                record = self._parse_line(line)
+                if record is not None:
+                    yield record
+
+    def read_since(self, offset: int) -> Tuple[List[Dict], int]:
+        """Lee los resumes completos agregados a partir de `offset`.
+
+        Devuelve los registros y el offset desde el que continuar la próxima vez.
+        """
+        records: List[Dict] = []
+        if not self.path.exists():
+            return records, offset
+        with open(self.path, "rb") as f:
+            f.seek(offset)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break
+                offset += len(line)
+                record = self._parse_line(line)
+                if record is not None:
+                    records.append(record)
+        return records, offset
+
+    def __len__(self) -> int:
+        self._refresh_index()
+        return len(self._index)
+
+    def size_bytes(self) -> int:
+        try:
+            return self.path.stat().st_size
+        except FileNotFoundError:
+            return 0
+
+    def _refresh_index(self) -> None:
+        """Indexa solo lo agregado desde la última lectura (también por otros procesos)."""
+        with self._thread_lock:
+            self._refresh_index_locked()
+
+    def _refresh_index_locked(self) -> None:
+        size = self.size_bytes()
+        if size < self._indexed_size:
+            # El archivo fue reemplazado: reconstruir el índice completo
+            self._index, self._indexed_size = {}, 0
+        if size == self._indexed_size:
+            return
+
+        with open(self.path, "rb") as f:
+            f.seek(self._indexed_size)
+            offset = self._indexed_size
+            for line in f:
+                if not line.endswith(b"\n"):
+                    # Línea incompleta de una escritura en curso: se indexará después
+                    break
+                record = self._parse_line(line)
+                if record is not None and record.get("id"):
+                    self._index[str(record["id"])] = offset
+                offset += len(line)
+        self._indexed_size = offset
+
+    @staticmethod
+    def _parse_line(line: bytes) -> Optional[Dict]:
+        line = line.strip()
+        if not line:
+            return None
+        try:
+            return json.loads(line)
+        except json.JSONDecodeError:
+            logger.warning("Línea inválida en el almacén de resumes; se omite")
+            return None
+
+    def migrate_from_json(self, json_path: Path) -> int:
+        """Migra una sola vez el antiguo resumes.json (lista JSON) a JSON Lines.
+
+        Escribe un archivo temporal y lo renombra de forma atómica; si el
+        almacén ya existe no hace nada. Devuelve cuántos resumes se migraron.
+        """
+        json_path = Path(json_path)
+        with self._file_lock():
+            if self.path.exists() or not json_path.exists():
+                return 0
+
+            try:
+                records = json.loads(json_path.read_text(encoding="utf-8") or "[]")
+            except json.JSONDecodeError as e:
+                logger.error(f"No se pudo migrar {json_path}: {e}")
+                return 0
+
+            tmp_path = self.path.with_name(self.path.name + ".tmp")
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                for record in records:
+                    record = dict(record)
+                    record.setdefault("id", uuid4().hex)
+                    f.write(json.dumps(record, ensure_ascii=False, default=str, separators=(",", ":")) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+
+        logger.info(f"Migrados {len(records)} resumes de {json_path} a {self.path}")
+        return len(records)
@@ -0,0 +1,85 @@
+from typing import TYPE_CHECKING, Dict, Iterable, List, Sequence, Tuple
+
+from app.utils.text import role_terms
+
+if TYPE_CHECKING:
+    import numpy as np
+
+
+def document_terms(fields: Iterable[Tuple[str, int]]) -> List[str]:
+    """Términos de un documento compuesto por campos con peso (texto, repeticiones)."""
+    terms: List[str] = []
+    for text, weight in fields:
+        terms.extend(role_terms(text) * weight)
+    return terms
+
+
+class BM25Index:
+    """Índice BM25 en memoria con puntuación vectorizada en NumPy.
+
+    Los postings se guardan en formato CSR (un arreglo de documentos y otro de
+    frecuencias por término), de modo que puntuar una consulta solo toca las
+    listas de sus términos y acumula los aportes con `np.bincount`.
+    Los términos se normalizan con `role_terms`: sin acentos, palabras vacías
+    ni flexiones simples de género y número. NumPy se importa al construir el
+    primer índice, no al importar el módulo, para no retrasar el arranque.
+    """
+
+    def __init__(self, documents: Sequence[List[str]], k1: float = 1.5, b: float = 0.75):
+        import numpy as np
+        self.k1 = k1
+        self.b = b
+        self.size = len(documents)
+        self.vocabulary: Dict[str, int] = {}
+
+        postings: Dict[int, Dict[int, int]] = {}
+        lengths = np.zeros(self.size, dtype=np.float32)
+        for doc_id, terms in enumerate(documents):
+            lengths[doc_id] = len(terms)
+            for term in terms:
+                term_id = self.vocabulary.setdefault(term, len(self.vocabulary))
+                counts = postings.setdefault(term_id, {})
+                counts[doc_id] = counts.get(doc_id, 0) + 1
+
+        self.indptr = np.zeros(len(self.vocabulary) + 1, dtype=np.int64)
+        for term_id in range(len(self.vocabulary)):
+            self.indptr[term_id + 1] = self.indptr[term_id] + len(postings[term_id])
+        self.doc_ids = np.empty(self.indptr[-1], dtype=np.int32)
+        term_freqs = np.empty(self.indptr[-1], dtype=np.float32)
+        for term_id, counts in postings.items():
+            start, end = self.indptr[term_id], self.indptr[term_id + 1]
+            self.doc_ids[start:end] = np.fromiter(counts.keys(), dtype=np.int32, count=len(counts))
+            term_freqs[start:end] = np.fromiter(counts.values(), dtype=np.float32, count=len(counts))
+
+        doc_freqs = np.diff(self.indptr).astype(np.float32)
+        self.idf = np.log1p((self.size - doc_freqs + 0.5) / (doc_freqs + 0.5))
+
+        # Parte de BM25 que no depende de la consulta: se calcula una sola vez
+        avg_length = float(lengths.mean()) if self.size else 0.0
+        norm = k1 * (1 - b + b * lengths / avg_length) if avg_length else np.full(self.size, k1, dtype=np.float32)
+        self.weights = term_freqs * (k1 + 1) / (term_freqs + norm[self.doc_ids])
+
+    def scores(self, query: str) -> "np.ndarray":
+        """Puntuación BM25 de cada documento para la consulta."""
+        import numpy as np
+        term_ids = [self.vocabulary[term] for term in dict.fromkeys(role_terms(query)) if term in self.vocabulary]
+        if not term_ids:
+            return np.zeros(self.size, dtype=np.float32)
+
+        slices = [slice(self.indptr[t], self.indptr[t + 1]) for t in term_ids]
+        doc_ids = np.concatenate([self.doc_ids[s] for s in slices])
+        contributions = np.concatenate([self.weights[s] * self.idf[t] for s, t in zip(slices, term_ids)])
+        return np.bincount(doc_ids, weights=contributions, minlength=self.size)
+
+    def search(self, query: str, k: int = 5) -> List[Tuple[int, float]]:
+        """Devuelve hasta `k` pares (documento, puntuación) ordenados de mayor a menor."""
+        if not self.size or k <= 0:
+            return []
+        import numpy as np
+
+        scores = self.scores(query)
+        candidates = np.flatnonzero(scores > 0)
+        if len(candidates) > k:
+            candidates = candidates[np.argpartition(-scores[candidates], k - 1)[:k]]
+        ranked = candidates[np.argsort(-scores[candidates], kind="stable")]
+        return [(int(doc_id), float(scores[doc_id])) for doc_id in ranked]
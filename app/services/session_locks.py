@@ -0,0 +1,81 @@
+import asyncio
+from collections import Counter
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, Optional
+
+
+class SessionBusyError(Exception):
+    """La sesión ya está procesando el mismo mensaje o tiene demasiados en espera."""
+
+
+class _SessionSlot:
+    __slots__ = ("lock", "holders", "messages")
+
+    def __init__(self):
+        self.lock = asyncio.Lock()
+        # Peticiones en curso o en espera y sus mensajes normalizados
+        self.holders = 0
+        self.messages: Counter = Counter()
+
+
+class SessionLocks:
+    """Locks por sesión para procesar sus mensajes de uno en uno.
+
+    Cada sesión tiene su propio `asyncio.Lock`, creado al llegar el primer
+    mensaje y descartado cuando ya no queda ninguno pendiente, así que sesiones
+    distintas siguen ejecutándose en paralelo y la memoria depende solo de las
+    sesiones con mensajes en curso. Un mensaje idéntico a otro pendiente de la
+    misma sesión (doble envío o reintento del cliente) se rechaza; los mensajes
+    distintos esperan turno hasta `max_pending`.
+
+    Los locks son locales al proceso: con varios workers y el backend SQLite
+    cada worker serializa solo los mensajes que atiende.
+    """
+
+    def __init__(self, max_pending: int = 4):
+        self.max_pending = max_pending
+        self._slots: Dict[str, _SessionSlot] = {}
+        self.rejected_duplicates = 0
+        self.rejected_full = 0
+
+    def is_pending(self, session_id: str, message: Optional[str] = None) -> bool:
+        """True si la sesión tiene un mensaje en curso (el mismo `message`, si se indica)."""
+        slot = self._slots.get(session_id)
+        if slot is None:
+            return False
+        return message is None or slot.messages[message] > 0
+
+    @asynccontextmanager
+    async def hold(self, session_id: str, message: Optional[str] = None) -> AsyncIterator[None]:
+        """Espera el turno de la sesión; lanza `SessionBusyError` sin esperar si no puede encolarse."""
+        slot = self._slots.get(session_id)
+        if slot is None:
+            slot = self._slots[session_id] = _SessionSlot()
+        if message is not None and slot.messages[message]:
+            self.rejected_duplicates += 1
+            raise SessionBusyError("Ya se está procesando este mensaje")
+        if slot.holders > self.max_pending:
+            self.rejected_full += 1
+            raise SessionBusyError("Hay demasiados mensajes pendientes en esta sesión")
+
+        slot.holders += 1
+        if message is not None:
+            slot.messages[message] += 1
+        try:
+            async with slot.lock:
+                yield
+        finally:
+            slot.holders -= 1
+            if message is not None:
+                slot.messages[message] -= 1
+                if not slot.messages[message]:
+                    del slot.messages[message]
+            if not slot.holders and self._slots.get(session_id) is slot:
+                del self._slots[session_id]
+
+    def metrics(self) -> Dict[str, int]:
+        return {
+            "busy_sessions": len(self._slots),
+            "rejected_duplicates": self.rejected_duplicates,
+            "rejected_full": self.rejected_full,
+        }
@@ -0,0 +1,367 @@
+import asyncio
+import sqlite3
+import sys
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from enum import Enum
+from functools import partial
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+from loguru import logger
+
+from app.models.chat import ChatSession
+from app.models.conversation_state import ConversationState
+
+
+class SessionEntry:
+    """Sesión de chat y estado de conversación que viven y expiran juntos."""
+
+    __slots__ = ("session", "state", "last_access", "size")
+
+    def __init__(self, session: ChatSession, state: ConversationState):
+        self.session = session
+        self.state = state
+        self.last_access = time.monotonic()
+        self.size = 0  # bytes estimados la última vez que se guardó
+
+
+def _deep_size(obj, seen=None) -> int:
+    """Estimación aproximada en bytes de un objeto y sus contenidos."""
+    seen = seen if seen is not None else set()
+    # Los miembros de Enum y las clases son compartidos entre sesiones
+    if id(obj) in seen or isinstance(obj, (Enum, type)):
+        return 0
+    seen.add(id(obj))
+
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(_deep_size(k, seen) + _deep_size(v, seen) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(_deep_size(item, seen) for item in obj)
+    elif hasattr(obj, "__dict__"):
+        size += _deep_size(vars(obj), seen)
+    elif hasattr(obj, "__slots__"):
+        size += sum(_deep_size(getattr(obj, slot), seen) for slot in obj.__slots__ if hasattr(obj, slot))
+    return size
+
+
+class SessionBackend(ABC):
+    """Interfaz de persistencia de sesiones.
+
+    Las entradas se obtienen con `get`, se modifican en el proceso que atiende
+    el mensaje y se persisten con `save`; así los backends compartidos permiten
+    que cualquier worker continúe una conversación. Desde el event loop se usan
+    las variantes `aget`, `asave`, etc., que los backends con E/S bloqueante
+    ejecutan fuera del loop.
+    """
+
+    def __init__(self, max_sessions: int = 10000, idle_ttl_seconds: float = 3600,
+                 sweep_interval_seconds: float = 60):
+        self.max_sessions = max_sessions
+        self.idle_ttl_seconds = idle_ttl_seconds
+        self.sweep_interval_seconds = sweep_interval_seconds
+        self.evictions = 0
+        self.expirations = 0
+        # Se llaman tras cada limpieza periódica, para liberar lo asociado a sesiones abandonadas
+        self.sweep_listeners: List[Callable[[], None]] = []
+        self._sweeper: Optional[asyncio.Task] = None
+
+    @abstractmethod
+    def create(self, session: ChatSession, state: Optional[ConversationState] = None) -> SessionEntry:
+        """Registra una sesión nueva."""
+
+    def open_session(self) -> SessionEntry:
+        """Crea una sesión nueva con un ID que no esté en uso."""
+        while True:
+            session = ChatSession()
+            if self.get(session.session_id) is None:
+                return self.create(session)
+
+    @abstractmethod
+    def get(self, session_id: str) -> Optional[SessionEntry]:
+        """Devuelve la sesión si existe y no ha expirado."""
+
+    @abstractmethod
+    def save(self, entry: SessionEntry) -> None:
+        """Persiste los cambios de una sesión."""
+
+    @abstractmethod
+    def delete(self, session_id: str) -> bool:
+        """Elimina una sesión; devuelve True si existía."""
+
+    @abstractmethod
+    def sweep(self) -> int:
+        """Elimina las sesiones inactivas más allá del TTL; devuelve cuántas se eliminaron."""
+
+    @abstractmethod
+    def live_count(self) -> int:
+        """Número de sesiones almacenadas."""
+
+    @abstractmethod
+    def metrics(self) -> Dict[str, int]:
+        """Métricas del almacén de sesiones."""
+
+    async def _run(self, func, *args):
+        """Ejecuta una operación del almacén; en memoria no hace falta salir del event loop."""
+        return func(*args)
+
+    async def acreate(self, session: ChatSession, state: Optional[ConversationState] = None) -> SessionEntry:
+        return await self._run(self.create, session, state)
+
+    async def aopen_session(self) -> SessionEntry:
+        return await self._run(self.open_session)
+
+    async def aget(self, session_id: str) -> Optional[SessionEntry]:
+        return await self._run(self.get, session_id)
+
+    async def asave(self, entry: SessionEntry) -> None:
+        await self._run(self.save, entry)
+
+    async def asweep(self) -> int:
+        return await self._run(self.sweep)
+
+    async def ametrics(self) -> Dict[str, int]:
+        return await self._run(self.metrics)
+
+    async def _run_sweeper(self) -> None:
+        while True:
+            await asyncio.sleep(self.sweep_interval_seconds)
+            try:
+                removed = await self.asweep()
+                if removed:
+                    logger.info(f"Sesiones expiradas eliminadas: {removed}")
+                for listener in self.sweep_listeners:
+                    listener()
+            except Exception as e:
+                logger.error(f"Error limpiando sesiones: {e}")
+
+    def start_sweeper(self) -> None:
+        """Inicia la tarea periódica de limpieza en el event loop actual."""
+        if self._sweeper is None or self._sweeper.done():
+            self._sweeper = asyncio.create_task(self._run_sweeper())
+
+    async def stop_sweeper(self) -> None:
+        """Detiene la tarea de limpieza."""
+        if self._sweeper is not None:
+            self._sweeper.cancel()
+            try:
+                await self._sweeper
+            except asyncio.CancelledError:
+                pass
+            self._sweeper = None
+
+
+class SessionStore(SessionBackend):
+    """Almacén en memoria acotado, con expiración por inactividad y desalojo LRU.
+
+    Reemplaza los diccionarios sin límite de `main.active_sessions` y
+    `ChatService.conversation_states`: cada entrada guarda la `ChatSession` y su
+    `ConversationState`, de modo que se desalojan juntas.
+
+    La memoria ocupada se lleva como un total acumulado: cada entrada se mide
+    al crearla y al guardarla, y se descuenta al eliminarla, así que exportar
+    las métricas no recorre todas las sesiones.
+    """
+
+    def __init__(self, max_sessions: int = 10000, idle_ttl_seconds: float = 3600,
+                 sweep_interval_seconds: float = 60):
+        super().__init__(max_sessions, idle_ttl_seconds, sweep_interval_seconds)
+        self._entries: "OrderedDict[str, SessionEntry]" = OrderedDict()
+        self._bytes = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def create(self, session: ChatSession, state: Optional[ConversationState] = None) -> SessionEntry:
+        """Registra una sesión nueva, desalojando las menos recientes si se supera el límite."""
+        entry = SessionEntry(session, state or ConversationState())
+        self._remove(session.session_id)
+        self._entries[session.session_id] = entry
+        self._measure(entry)
+        while len(self._entries) > self.max_sessions:
+            session_id, evicted = self._entries.popitem(last=False)
+            self._bytes -= evicted.size
+            self.evictions += 1
+            logger.info(f"Sesión desalojada por límite de capacidad: {session_id}")
+        return entry
+
+    def get(self, session_id: str) -> Optional[SessionEntry]:
+        """Devuelve la sesión si existe y no ha expirado, marcándola como usada."""
+        entry = self._entries.get(session_id)
+        if entry is None:
+            return None
+
+        now = time.monotonic()
+        if now - entry.last_access > self.idle_ttl_seconds:
+            self._remove(session_id)
+            self.expirations += 1
+            return None
+
+        entry.last_access = now
+        self._entries.move_to_end(session_id)
+        return entry
+
+    def save(self, entry: SessionEntry) -> None:
+        # Las entradas se modifican en memoria; basta con marcar el uso y volver a medirlas
+        entry.last_access = time.monotonic()
+        if self._entries.get(entry.session.session_id) is entry:
+            self._measure(entry)
+
+    def delete(self, session_id: str) -> bool:
+        """Elimina una sesión; devuelve True si existía."""
+        return self._remove(session_id)
+
+    def _measure(self, entry: SessionEntry) -> None:
+        size = _deep_size(entry.session) + _deep_size(entry.state)
+        self._bytes += size - entry.size
+        entry.size = size
+
+    def _remove(self, session_id: str) -> bool:
+        entry = self._entries.pop(session_id, None)
+        if entry is None:
+            return False
+        self._bytes -= entry.size
+        return True
+
+    def sweep(self) -> int:
+        """Elimina las sesiones inactivas más allá del TTL; devuelve cuántas se eliminaron."""
+        cutoff = time.monotonic() - self.idle_ttl_seconds
+        removed = 0
+        # El orden LRU garantiza que las inactivas están al principio
+        while self._entries:
+            session_id, entry = next(iter(self._entries.items()))
+            if entry.last_access > cutoff:
+                break
+            self._remove(session_id)
+            removed += 1
+        self.expirations += removed
+        return removed
+
+    def live_count(self) -> int:
+        return len(self._entries)
+
+    def estimate_bytes(self) -> int:
+        """Estimación de la memoria ocupada por todas las sesiones, según su última medición."""
+        return self._bytes
+
+    def metrics(self) -> Dict[str, int]:
+        """Métricas del almacén de sesiones."""
+        return {
+            "live_sessions": len(self._entries),
+            "max_sessions": self.max_sessions,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "bytes_estimate": self.estimate_bytes(),
+        }
+
+
+class SqliteSessionStore(SessionBackend):
+    """Almacén de sesiones en SQLite (modo WAL) compartido entre procesos.
+
+    Permite ejecutar uvicorn con `--workers N` sin enrutamiento fijo: cada
+    mensaje lee el estado de la base de datos y lo guarda al terminar. El estado
+    se guarda en el formato compacto de `ConversationState.to_bytes`.
+
+    Con varios workers una escritura puede esperar el bloqueo de la base de
+    datos hasta `busy_timeout`; las variantes asíncronas se ejecutan en un hilo
+    propio del almacén para que esa espera no detenga el event loop.
+    """
+
+    def __init__(self, db_path: str, max_sessions: int = 10000, idle_ttl_seconds: float = 3600,
+                 sweep_interval_seconds: float = 60):
+        super().__init__(max_sessions, idle_ttl_seconds, sweep_interval_seconds)
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="session-store")
+        self._db = sqlite3.connect(str(self.db_path), check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute("PRAGMA busy_timeout=5000")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS sessions ("
+            "session_id TEXT PRIMARY KEY, session TEXT NOT NULL, state BLOB NOT NULL, "
+            "last_access REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS idx_sessions_last_access ON sessions (last_access)")
+
+    async def _run(self, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, partial(func, *args))
+
+    def _write(self, entry: SessionEntry) -> None:
+        self._db.execute(
+            "INSERT OR REPLACE INTO sessions (session_id, session, state, last_access) VALUES (?, ?, ?, ?)",
+            (entry.session.session_id, entry.session.model_dump_json(), entry.state.to_bytes(), time.time()),
+        )
+
+    def create(self, session: ChatSession, state: Optional[ConversationState] = None) -> SessionEntry:
+        entry = SessionEntry(session, state or ConversationState())
+        with self._lock:
+            self._write(entry)
+            cursor = self._db.execute(
+                "DELETE FROM sessions WHERE session_id IN ("
+                "SELECT session_id FROM sessions ORDER BY last_access DESC LIMIT -1 OFFSET ?)",
+                (self.max_sessions,),
+            )
+            self.evictions += max(cursor.rowcount, 0)
+        return entry
+
+    def get(self, session_id: str) -> Optional[SessionEntry]:
+        cutoff = time.time() - self.idle_ttl_seconds
+        with self._lock:
+            row = self._db.execute(
+                "SELECT session, state FROM sessions WHERE session_id = ? AND last_access > ?",
+                (session_id, cutoff),
+            ).fetchone()
+        if row is None:
+            return None
+        return SessionEntry(ChatSession.model_validate_json(row[0]), ConversationState.from_bytes(row[1]))
+
+    def save(self, entry: SessionEntry) -> None:
+        with self._lock:
+            self._write(entry)
+
+    def delete(self, session_id: str) -> bool:
+        with self._lock:
+            cursor = self._db.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+        return cursor.rowcount > 0
+
+    def sweep(self) -> int:
+        cutoff = time.time() - self.idle_ttl_seconds
+        with self._lock:
+            cursor = self._db.execute("DELETE FROM sessions WHERE last_access <= ?", (cutoff,))
+        removed = max(cursor.rowcount, 0)
+        self.expirations += removed
+        return removed
+
+    def live_count(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+
+    def metrics(self) -> Dict[str, int]:
+        with self._lock:
+            live, size = self._db.execute(
+                "SELECT COUNT(*), COALESCE(SUM(LENGTH(session) + LENGTH(state)), 0) FROM sessions"
+            ).fetchone()
+        return {
+            "live_sessions": live,
+            "max_sessions": self.max_sessions,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "bytes_estimate": size,
+        }
+
+
+def create_session_store(backend: str = "memory", db_path: Optional[str] = None,
+                         **options) -> SessionBackend:
+    """Crea el almacén de sesiones configurado ("memory" o "sqlite")."""
+    if backend == "memory":
+        return SessionStore(**options)
+    if backend == "sqlite":
+        if not db_path:
+            raise ValueError("SESSION_DB_PATH es obligatorio con SESSION_BACKEND=sqlite")
+        return SqliteSessionStore(db_path, **options)
+    raise ValueError(f"Backend de sesiones no soportado: {backend}")
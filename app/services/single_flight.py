@@ -0,0 +1,101 @@
+import asyncio
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+class _SharedStream:
+    """Un stream que se consume una sola vez y se reparte a varios suscriptores.
+
+    Los fragmentos se guardan a medida que llegan, así que quien se suma tarde
+    recibe primero lo ya emitido y luego sigue en vivo.
+    """
+
+    def __init__(self, source: AsyncIterator[str]):
+        self.chunks: List[str] = []
+        self.error: Optional[BaseException] = None
+        self.done = False
+        self._changed = asyncio.Event()
+        self.task = asyncio.ensure_future(self._pump(source))
+
+    def _notify(self) -> None:
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    async def _pump(self, source: AsyncIterator[str]) -> None:
+        try:
+            async for chunk in source:
+                self.chunks.append(chunk)
+                self._notify()
+        except Exception as e:
+            self.error = e
+        finally:
+            self.done = True
+            self._notify()
+            if hasattr(source, "aclose"):
+                await source.aclose()
+
+    async def subscribe(self) -> AsyncIterator[str]:
+        position = 0
+        while True:
+            if position < len(self.chunks):
+                yield self.chunks[position]
+                position += 1
+            elif self.done:
+                if self.error is not None:
+                    raise self.error
+                return
+            else:
+                await self._changed.wait()
+
+
+class SingleFlight:
+    """Deduplica llamadas concurrentes con la misma clave (patrón single-flight).
+
+    La primera llamada con una clave la ejecuta; las que llegan mientras sigue
+    en curso esperan ese mismo resultado en vez de repetir el trabajo. La
+    ejecución corre en su propia tarea, por lo que si quien la inició se
+    cancela las demás siguen recibiendo el resultado.
+    """
+
+    def __init__(self):
+        self._calls: Dict[str, asyncio.Future] = {}
+        self._streams: Dict[str, _SharedStream] = {}
+        self.executed = 0
+        self.coalesced = 0
+
+    async def run(self, key: str, factory: Callable[[], Awaitable[T]]) -> T:
+        """Ejecuta `factory()` o se une a la ejecución en curso con la misma clave."""
+        task = self._calls.get(key)
+        if task is None:
+            self.executed += 1
+            task = asyncio.ensure_future(factory())
+            self._calls[key] = task
+            task.add_done_callback(lambda done: self._finish(self._calls, key, done))
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(task)
+
+    async def stream(self, key: str, factory: Callable[[], AsyncIterator[str]]) -> AsyncIterator[str]:
+        """Como `run`, pero comparte un stream de fragmentos."""
+        shared = self._streams.get(key)
+        if shared is None:
+            self.executed += 1
+            shared = _SharedStream(factory())
+            self._streams[key] = shared
+            shared.task.add_done_callback(lambda _: self._finish(self._streams, key, shared))
+        else:
+            self.coalesced += 1
+        async for chunk in shared.subscribe():
+            yield chunk
+
+    @staticmethod
+    def _finish(registry: Dict, key: str, value) -> None:
+        if registry.get(key) is value:
+            del registry[key]
+        if isinstance(value, asyncio.Future) and not value.cancelled():
+            # Marca la excepción como recuperada aunque todos los que esperaban se hayan cancelado
+            value.exception()
+
+    def in_flight(self) -> int:
+        return len(self._calls) + len(self._streams)
@@ -0,0 +1,53 @@
+import math
+import re
+import unicodedata
+from typing import List
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+_ESTIMATE_RE = re.compile(r"\w+|[^\w\s]")
+
+
+def fold_text(text: str) -> str:
+    """Convierte el texto a minúsculas y elimina acentos y diacríticos."""
+    if not text:
+        return ""
+    normalized = unicodedata.normalize("NFKD", str(text).lower())
+    return "".join(char for char in normalized if not unicodedata.combining(char))
+
+
+def tokenize(text: str) -> List[str]:
+    """Divide el texto normalizado en tokens alfanuméricos."""
+    return _TOKEN_RE.findall(fold_text(text))
+
+
+# Palabras vacías frecuentes en las respuestas de los usuarios sobre su rol
+STOPWORDS = frozenset({
+    "a", "al", "como", "con", "de", "del", "el", "en", "es", "la", "las", "lo", "los",
+    "me", "mi", "mis", "o", "para", "por", "que", "se", "soy", "su", "un", "una", "y",
+    "trabajo", "trabajar", "busco", "buscando", "quiero", "puesto", "cargo", "vacante",
+    "area", "campo", "profesional", "actualmente", "experiencia", "anos",
+})
+
+
+def content_tokens(text: str) -> List[str]:
+    """Tokeniza el texto descartando palabras vacías y números."""
+    return [token for token in tokenize(text) if token not in STOPWORDS and not token.isdigit()]
+
+
+def stem_token(token: str) -> str:
+    """Reduce variaciones simples de género y número ("enfermera", "enfermeros" -> "enfermer")."""
+    if len(token) > 4 and token.endswith(("as", "os", "es")):
+        token = token[:-2]
+    if len(token) > 4 and token.endswith(("a", "o")):
+        token = token[:-1]
+    return token
+
+
+def role_terms(text: str) -> List[str]:
+    """Términos normalizados que describen un rol: sin acentos, palabras vacías ni flexiones."""
+    return [stem_token(token) for token in content_tokens(text)]
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimación local de tokens del modelo: ~4 caracteres por token en cada palabra y uno por signo."""
+    return sum(max(1, math.ceil(len(piece) / 4)) for piece in _ESTIMATE_RE.findall(text or ""))
@@ -0,0 +1,209 @@
+"""Prueba de carga del flujo de chat completo con un modelo falso.
+
+Uso:
+    python -m benchmarks.chat_flow --conversations 200 --concurrency 50 --latency 0.2
+    python -m benchmarks.chat_flow --stream --distinct --rate-limit 0
+
+Recorre conversaciones completas (contacto, tipo de CV, vacante o profesión,
+educación, experiencia y habilidades) contra la app FastAPI en el mismo
+proceso, a través de httpx.ASGITransport y con FakeChatModel en lugar de
+OpenAI. Informa el rendimiento, la latencia p50/p95/p99 por etapa y la memoria
+por sesión. Una conversación cuenta como fallida si alguna respuesta trae un
+error o si el CV final no es el suyo (sesiones mezcladas).
+"""
+import argparse
+import asyncio
+import importlib
+import json
+import os
+import random
+import sys
+import time
+import tracemalloc
+from collections import defaultdict
+from typing import Dict, List, Tuple
+
+import httpx
+from loguru import logger
+
+from benchmarks.common import summarize
+
+PROFESSIONS = [
+    "desarrollador back-end", "analista de datos", "médico general", "contador/a",
+    "community manager", "gestor de proyectos", "fisioterapeuta", "ingeniero de software",
+    "diseñadora de interiores", "técnico de mantenimiento industrial",
+]
+
+
+def _tag(index: int) -> str:
+    """Palabra única por conversación; solo letras, porque `role_terms` descarta los números.
+
+    Empieza por "z" y termina en "x" para que no sea una palabra vacía ni la recorte `stem_token`.
+    """
+    letters = ""
+    while True:
+        index, digit = divmod(index, 26)
+        letters = chr(ord("a") + digit) + letters
+        if not index:
+            return f"z{letters}x"
+
+
+def _script(index: int, rng: random.Random, distinct: bool) -> List[Tuple[str, str]]:
+    """Mensajes de una conversación, cada uno con la etapa que lo procesa."""
+    role = rng.choice(PROFESSIONS) + (f" {_tag(index)}" if distinct else "")
+    steps = [("start", f"usuario{index} usuario{index}@correo.com")]
+    if index % 2:
+        steps += [("cv_type", "1"), ("vacancy", f"{role}, responsable de entregas y reportes")]
+    else:
+        steps += [("cv_type", "2"), ("profession", role)]
+    return steps + [
+        ("education", f"profesional en {role}, universidad nacional"),
+        ("experience", "estuve a cargo del equipo de soporte y mejoré los tiempos de respuesta un 30%"),
+        ("skills", "comunicación, trabajo en equipo, excel, python"),
+    ]
+
+
+async def _send(client: httpx.AsyncClient, session_id: str, message: str, stream: bool) -> Tuple[str, float]:
+    """Envía un mensaje y devuelve la respuesta y el tiempo hasta el primer fragmento."""
+    payload = {"session_id": session_id, "message": message}
+    started = time.perf_counter()
+    if not stream:
+        body = (await client.post("/chat/message", json=payload)).json()
+        if "error" in body:
+            raise RuntimeError(body["error"])
+        return body["response"], time.perf_counter() - started
+
+    parts = []
+    first_chunk = None
+    async with client.stream("POST", "/chat/message/stream", json=payload) as response:
+        event = None
+        async for line in response.aiter_lines():
+            if line.startswith("event: "):
+                event = line[len("event: "):]
+            elif line.startswith("data: "):
+                data = json.loads(line[len("data: "):])
+                if event == "error" or "error" in data:
+                    raise RuntimeError(data.get("error"))
+                if "delta" in data:
+                    first_chunk = first_chunk or time.perf_counter() - started
+                    parts.append(data["delta"])
+            elif not line:
+                event = None
+    return "".join(parts), first_chunk or time.perf_counter() - started
+
+
+async def _conversation(client: httpx.AsyncClient, index: int, args,
+                        latencies: Dict[str, List[float]], first_chunks: Dict[str, List[float]]) -> bool:
+    started = time.perf_counter()
+    session_id = (await client.post("/chat/start")).json()["session_id"]
+    latencies["session_start"].append(time.perf_counter() - started)
+
+    response = ""
+    for stage, message in _script(index, random.Random(args.seed + index), args.distinct):
+        started = time.perf_counter()
+        response, first_chunk = await _send(client, session_id, message, args.stream)
+        latencies[stage].append(time.perf_counter() - started)
+        first_chunks[stage].append(first_chunk)
+    # El CV final debe ser el de esta conversación
+    return "Aquí está tu CV" in response and f"usuario{index}@correo.com" in response
+
+
+async def _run(args) -> None:
+    main = importlib.import_module("app.main")
+    from app.services.fake_chat_model import FakeChatModel
+
+    chat_service = main.chat_service
+    fake_model = FakeChatModel(latency=args.latency)
+    chat_service.llm.chat_model = fake_model
+
+    latencies: Dict[str, List[float]] = defaultdict(list)
+    first_chunks: Dict[str, List[float]] = defaultdict(list)
+    semaphore = asyncio.Semaphore(args.concurrency)
+    outcomes = {"ok": 0, "mixed": 0, "errors": 0}
+
+    async def _bounded(client: httpx.AsyncClient, index: int) -> None:
+        async with semaphore:
+            try:
+                outcomes["ok" if await _conversation(client, index, args, latencies, first_chunks) else "mixed"] += 1
+            except Exception as e:
+                outcomes["errors"] += 1
+                logger.warning(f"Conversación {index} fallida: {e!r}")
+
+    async with main.app.router.lifespan_context(main.app):
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://benchmark", timeout=None) as client:
+            # Espera a la precarga del arranque para no medirla como latencia de la primera conversación
+            while (await client.get("/ready")).status_code != 200:
+                await asyncio.sleep(0.05)
+            if args.trace_memory:
+                tracemalloc.start()
+            started = time.perf_counter()
+            await asyncio.gather(*(_bounded(client, i) for i in range(args.conversations)))
+            elapsed = time.perf_counter() - started
+            traced = tracemalloc.get_traced_memory()[0] if args.trace_memory else 0
+            tracemalloc.stop()
+
+        store = chat_service.session_store
+        live_sessions = store.live_count()
+        session_bytes = store.estimate_bytes() / live_sessions if hasattr(store, "estimate_bytes") and live_sessions else 0
+        gateway = chat_service.llm.metrics()
+
+    messages = sum(len(values) for stage, values in latencies.items() if stage != "session_start")
+    print(f"Conversaciones: {args.conversations} (concurrencia {args.concurrency}, latencia del modelo "
+          f"{args.latency * 1000:.0f} ms, {'stream' if args.stream else 'sin stream'})")
+    print(f"Completas: {outcomes['ok']}  mezcladas: {outcomes['mixed']}  con error: {outcomes['errors']}")
+    print(f"Tiempo total: {elapsed:.2f} s  -> {args.conversations / elapsed:.1f} conversaciones/s, "
+          f"{messages / elapsed:.1f} mensajes/s")
+    print(f"Llamadas al modelo: {fake_model.calls}  agrupadas: {gateway['coalesced']}  "
+          f"esperas por límite de ritmo: {gateway['rate_limited_waits']}")
+    print(f"Sesiones vivas: {live_sessions}  memoria estimada: {session_bytes:.0f} B/sesión"
+          + (f"  tracemalloc (todo el proceso): {traced / args.conversations:.0f} B/conversación" if args.trace_memory else ""))
+
+    header = f"{'etapa':<15}{'n':>7}{'media':>10}{'p50':>10}{'p95':>10}{'p99':>10}"
+    if args.stream:
+        header += f"{'1er frag. p50':>15}"
+    print("\n" + header + "   (ms)")
+    for stage in ("session_start", "start", "cv_type", "vacancy", "profession", "education", "experience", "skills"):
+        values = latencies.get(stage)
+        if not values:
+            continue
+        stats = summarize(values)
+        line = f"{stage:<15}{len(values):>7}" + "".join(f"{stats[key] * 1000:>10.1f}" for key in ("mean", "p50", "p95", "p99"))
+        if args.stream and first_chunks.get(stage):
+            line += f"{summarize(first_chunks[stage])['p50'] * 1000:>15.1f}"
+        print(line)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--conversations", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--latency", type=float, default=0.2, help="segundos por respuesta del modelo falso")
+    parser.add_argument("--stream", action="store_true", help="usa /chat/message/stream (SSE)")
+    parser.add_argument("--distinct", action="store_true",
+                        help="rol único por conversación y sin recomendaciones precalculadas ni caché por "
+                             "profesión, para no acertar en cachés ni agrupar prompts")
+    parser.add_argument("--rate-limit", type=float, default=None,
+                        help="LLM_RATE_LIMIT_PER_SECOND para la prueba (0 lo desactiva)")
+    parser.add_argument("--trace-memory", action="store_true", help="mide también con tracemalloc (más lento)")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    # La configuración se lee al importar app.main
+    os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+    os.environ.setdefault("LOG_PAYLOAD_SAMPLE_RATE", "0")
+    if args.rate_limit is not None:
+        os.environ["LLM_RATE_LIMIT_PER_SECOND"] = str(args.rate_limit)
+    if args.distinct:
+        # Con la profesión del catálogo como clave, roles distintos de la misma profesión compartirían
+        # la caché y el artefacto precalculado; la clave pasa a ser el rol completo
+        os.environ["RECOMMENDATION_CACHE_MATCH_PROFESSION"] = "false"
+        os.environ["PRECOMPUTED_RECOMMENDATIONS_PATH"] = os.path.join(os.devnull, "sin-artefacto.json")
+    logger.remove()
+    logger.add(sys.stderr, level="WARNING")
+
+    asyncio.run(_run(args))
+
+
+if __name__ == "__main__":
+    main()
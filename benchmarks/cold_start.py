@@ -0,0 +1,107 @@
+"""Perfil del arranque en frío: importación de app.main y precarga hasta /ready.
+
+Uso:
+    python -m benchmarks.cold_start --runs 5 --top 15
+
+Cada medición corre en un proceso nuevo. La importación se perfila con
+`python -X importtime` (módulos más costosos y módulos pesados que se cargan
+antes de tiempo) y después se arranca la app con su lifespan y se espera a que
+/ready responda 200, mostrando la duración de cada paso de la precarga.
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+from typing import Dict, List, Tuple
+
+# Módulos que no deberían cargarse al importar app.main
+HEAVY_MODULES = ("pandas", "numpy", "openpyxl", "langchain", "langchain_core", "langchain_openai", "openai", "weasyprint")
+
+
+def _parse_importtime(stderr: str) -> List[Tuple[str, int, int]]:
+    """(módulo, µs propios, µs acumulados) de la salida de -X importtime."""
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        modules.append((name.strip(), int(self_us), int(cumulative_us)))
+    return modules
+
+
+def _profile_import(env: Dict[str, str]) -> List[Tuple[str, int, int]]:
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app.main"],
+        env=env, capture_output=True, text=True, check=True
+    )
+    return _parse_importtime(result.stderr)
+
+
+async def _wait_ready() -> Dict:
+    import httpx
+    from loguru import logger
+
+    logger.remove()
+    import app.main as main
+
+    async with main.app.router.lifespan_context(main.app):
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://cold-start") as client:
+            while True:
+                response = await client.get("/ready")
+                if response.status_code == 200:
+                    return response.json()
+                await asyncio.sleep(0.01)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--ready-child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.ready_child:
+        print(json.dumps(asyncio.run(_wait_ready())))
+        return
+
+    env = dict(os.environ)
+    env.setdefault("OPENAI_API_KEY", "benchmark")
+
+    runs = [_profile_import(env) for _ in range(args.runs)]
+    totals = [next(cumulative for name, _, cumulative in modules if name == "app.main") for modules in runs]
+    modules = runs[-1]
+    loaded = {name for name, _, _ in modules}
+
+    print(f"Importación de app.main: mediana {statistics.median(totals) / 1e6:.3f} s "
+          f"(mín. {min(totals) / 1e6:.3f} s, {args.runs} procesos)")
+    early = [name for name in HEAVY_MODULES if name in loaded]
+    print(f"Módulos pesados cargados al importar: {', '.join(early) if early else 'ninguno'}")
+
+    print(f"\n{'módulo':<48}{'acumulado':>12}{'propio':>12}   (ms)")
+    for name, self_us, cumulative_us in sorted(modules, key=lambda m: m[2], reverse=True)[:args.top]:
+        print(f"{name:<48}{cumulative_us / 1000:>12.1f}{self_us / 1000:>12.1f}")
+
+    ready_runs = []
+    for _ in range(args.runs):
+        result = subprocess.run(
+            [sys.executable, "-m", "benchmarks.cold_start", "--ready-child"],
+            env=env, capture_output=True, text=True, check=True
+        )
+        ready_runs.append(json.loads(result.stdout.strip().splitlines()[-1]))
+    report = ready_runs[-1]
+
+    preload = [run["preload_seconds"] for run in ready_runs]
+    print(f"\nPrecarga hasta /ready: mediana {statistics.median(preload):.3f} s "
+          f"(importación medida por la app: {report['import_seconds']:.3f} s)")
+    print(f"{'paso':<32}{'estado':>10}{'segundos':>12}")
+    for name, step in sorted(report["preload"].items(), key=lambda item: item[1]["seconds"] or 0, reverse=True):
+        seconds = f"{step['seconds']:.3f}" if step["seconds"] is not None else "-"
+        print(f"{name:<32}{step['status']:>10}{seconds:>12}")
+
+
+if __name__ == "__main__":
+    main()
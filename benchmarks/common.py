@@ -0,0 +1,34 @@
+"""Utilidades compartidas por los benchmarks."""
+import statistics
+from typing import Dict, List
+
+from app.models.conversation_state import ConversationStage, ConversationType
+
+
+def percentile(values: List[float], pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def summarize(values: List[float]) -> Dict[str, float]:
+    """Media y percentiles 50/95/99 de una lista de latencias."""
+    return {
+        "mean": statistics.fmean(values),
+        "p50": percentile(values, 50),
+        "p95": percentile(values, 95),
+        "p99": percentile(values, 99),
+    }
+
+
+def fill_state(state, index: int):
+    """Rellena el estado con datos típicos de una conversación completa."""
+    state.stage = ConversationStage.COMPLETE
+    state.cv_type = ConversationType.GENERAL
+    state.personal_info = {"contact": f"usuario {index} usuario{index}@correo.com"}
+    state.profession = f"desarrollador backend {index}"
+    state.education.append(f"ingeniería de sistemas, universidad nacional {index}")
+    state.experience.append(f"lideré un equipo de 5 personas en la empresa {index} y reduje costos un 20%")
+    state.skills.append(f"python, fastapi, docker, liderazgo, comunicación {index}")
+    state.initial_recommendations = f"• Recomendación inicial {index}: " + " ".join(str(index * j) for j in range(120))
+    state.final_recommendations = f"• Recomendación final {index}: " + " ".join(str(index + j) for j in range(120))
+    return state
@@ -0,0 +1,109 @@
+"""Micro-benchmarks de las rutas calientes del chat.
+
+Uso:
+    python -m benchmarks.hot_paths --iterations 2000
+
+Mide por llamada `DatasetService.search_resumes`, `get_action_verbs` (todas
+las categorías y una sola) y `ChatService._generate_cv_html` sobre un estado
+completo, con los datasets ya cargados, para detectar regresiones. El CV se
+mide renderizando las plantillas en cada llamada (el estado se invalida antes)
+y, aparte, cuando se sirve desde el HTML memorizado en el estado. Cada
+resultado se valida: si una llamada devuelve un resultado vacío o erróneo, o
+se registra algún error durante la medición, el script termina con error en
+lugar de medir la ruta de fallo.
+"""
+import argparse
+import os
+import sys
+import time
+from typing import Callable, List
+
+from loguru import logger
+
+from benchmarks.common import fill_state, summarize
+
+QUERIES = [
+    "desarrollador backend con python",
+    "enfermera jefe de urgencias",
+    "analista de datos junior",
+    "community manager",
+    "contador público con experiencia en auditoría",
+]
+
+
+def _time_calls(name: str, call: Callable[[int], object], check: Callable[[object], bool],
+                iterations: int) -> List[float]:
+    latencies = []
+    for i in range(iterations):
+        started = time.perf_counter()
+        result = call(i)
+        latencies.append(time.perf_counter() - started)
+        if not check(result):
+            raise SystemExit(f"{name}: resultado inválido en la iteración {i}: {result!r:.200}")
+    return latencies
+
+
+def _valid_cv(html: str) -> bool:
+    return 'class="cv"' in html and "Error al generar" not in html
+
+
+def _invalidate(state):
+    """Descarta el HTML y las secciones memorizadas para forzar el renderizado."""
+    state.touch()
+    state.cv_sections.clear()
+    return state
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=2000)
+    args = parser.parse_args()
+
+    os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+    logger.remove()
+    logger.add(sys.stderr, level="WARNING")
+    # Los servicios atrapan sus excepciones y las registran: un error es una regresión
+    errors: List[str] = []
+    logger.add(lambda message: errors.append(message.record["message"]), level="ERROR")
+
+    from app.models.conversation_state import ConversationState
+    from app.services.chat_service import ChatService
+    from app.services.fake_chat_model import FakeChatModel
+
+    chat_service = ChatService(chat_model=FakeChatModel())
+    dataset_service = chat_service.dataset_service
+    states = [fill_state(ConversationState(), i) for i in range(64)]
+
+    # Primera llamada aparte: incluye la carga de los datasets
+    cold = {}
+    for name, call in (
+        ("search_resumes", lambda: dataset_service.search_resumes(QUERIES[0])),
+        ("get_action_verbs", lambda: dataset_service.get_action_verbs()),
+        ("_generate_cv_html", lambda: chat_service._generate_cv_html(states[0])),
+    ):
+        started = time.perf_counter()
+        call()
+        cold[name] = time.perf_counter() - started
+
+    cases = [
+        ("search_resumes", cold["search_resumes"],
+         lambda i: dataset_service.search_resumes(QUERIES[i % len(QUERIES)]), bool),
+        ("get_action_verbs", cold["get_action_verbs"], lambda i: dataset_service.get_action_verbs(), bool),
+        ("get_action_verbs(cat.)", None, lambda i: dataset_service.get_action_verbs("liderazgo"), bool),
+        ("_generate_cv_html", cold["_generate_cv_html"],
+         lambda i: chat_service._generate_cv_html(_invalidate(states[i % len(states)])), _valid_cv),
+        ("_generate_cv_html(memo)", None,
+         lambda i: chat_service._generate_cv_html(states[i % len(states)]), _valid_cv),
+    ]
+
+    print(f"{'operación':<24}{'primera':>11}{'media':>11}{'p50':>11}{'p95':>11}{'p99':>11}   (µs)")
+    for name, first, call, check in cases:
+        stats = summarize(_time_calls(name, call, check, args.iterations))
+        if errors:
+            raise SystemExit(f"{name}: {len(errors)} errores registrados durante la medición, el primero: {errors[0]}")
+        first_text = f"{first * 1e6:>11.0f}" if first is not None else f"{'-':>11}"
+        print(f"{name:<24}{first_text}" + "".join(f"{stats[key] * 1e6:>11.1f}" for key in ("mean", "p50", "p95", "p99")))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""Latencia de búsqueda del ranking BM25 a medida que crece el dataset.
+
+Uso:
+    python -m benchmarks.retrieval --sizes 1000,10000,100000 --queries 200
+
+Replica las filas de recomendaciones_hoja_vida.csv (con palabras clave
+variadas para que el vocabulario también crezca) y compara el índice BM25 con
+el recorrido lineal anterior basado en `str.contains`.
+"""
+import argparse
+import random
+import statistics
+import time
+from typing import Dict, List
+
+import pandas as pd
+
+from app.services.recommendations_catalog import RANK_FIELDS
+from app.services.retrieval import BM25Index, document_terms
+from benchmarks.common import percentile
+
+CSV_PATH = "app/data/datasets/recomendaciones_hoja_vida.csv"
+
+QUERIES = [
+    "soy desarrolladora backend con 3 años",
+    "enfermero en urgencias",
+    "busco puesto de analista de datos",
+    "diseñador gráfico con experiencia en branding",
+    "contador público",
+    "profesor de matemáticas en secundaria",
+    "gerente de proyectos con certificación pmp",
+    "ingeniero civil",
+]
+
+
+def _synthetic_rows(base: List[Dict], size: int, rng: random.Random) -> List[Dict]:
+    """Filas del CSV replicadas hasta `size`, con palabras clave únicas por variante."""
+    rows = []
+    for i in range(size):
+        row = dict(base[i % len(base)])
+        row["palabras_clave"] = f"{row.get('palabras_clave', '')}, variante{i // len(base)}, etiqueta{rng.randrange(size)}"
+        rows.append(row)
+    return rows
+
+
+def _time_queries(search, queries: List[str]) -> List[float]:
+    latencies = []
+    for query in queries:
+        started = time.perf_counter()
+        search(query)
+        latencies.append((time.perf_counter() - started) * 1000)
+    return latencies
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="1000,10000,100000")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=5)
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    base = pd.read_csv(CSV_PATH).fillna("").to_dict("records")
+    queries = [rng.choice(QUERIES) for _ in range(args.queries)]
+
+    print(f"{'filas':>8}{'índice (s)':>12}{'BM25 p50':>12}{'BM25 p95':>12}{'lineal p50':>12}{'lineal p95':>12}")
+    for size in (int(s) for s in args.sizes.split(",")):
+        rows = _synthetic_rows(base, size, rng)
+
+        started = time.perf_counter()
+        index = BM25Index([
+            document_terms((str(row.get(field, "")), weight) for field, weight in RANK_FIELDS)
+            for row in rows
+        ])
+        build_seconds = time.perf_counter() - started
+
+        bm25 = _time_queries(lambda q: index.search(q, args.top_k), queries)
+
+        # Búsqueda anterior: la frase completa como patrón sobre cada fila
+        frame = pd.DataFrame(rows)
+        linear = _time_queries(
+            lambda q: frame[frame["profesion"].str.lower().str.contains(q, na=False, regex=False)
+                            | frame["palabras_clave"].str.lower().str.contains(q, na=False, regex=False)],
+            queries[: max(1, len(queries) // 10)],
+        )
+
+        print(f"{size:>8}{build_seconds:>12.2f}"
+              f"{statistics.median(bm25):>10.3f}ms{percentile(bm25, 95):>10.3f}ms"
+              f"{statistics.median(linear):>10.3f}ms{percentile(linear, 95):>10.3f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""Prueba de estrés de aislamiento entre sesiones concurrentes.
+
+Uso:
+    python -m benchmarks.session_isolation --sessions 2000 --latency 0.05
+
+Abre todas las sesiones a la vez contra la app en el mismo proceso (con
+FakeChatModel) y recorre en cada una el flujo completo. En la etapa de
+profesión envía el mismo mensaje dos veces en paralelo, como un doble clic.
+Comprueba que:
+
+- los IDs de sesión son únicos
+- cada CV final es el de su sesión
+- el duplicado se rechaza con 409 y el mensaje se procesa una sola vez
+- ninguna sesión tiene datos de otra
+"""
+import argparse
+import asyncio
+import importlib
+import os
+import sys
+import time
+from typing import Dict, List
+
+import httpx
+from loguru import logger
+
+
+async def _post(client: httpx.AsyncClient, session_id: str, message: str) -> httpx.Response:
+    return await client.post("/chat/message", json={"session_id": session_id, "message": message})
+
+
+async def _session(client: httpx.AsyncClient, index: int, results: Dict[str, List]) -> None:
+    session_id = (await client.post("/chat/start")).json()["session_id"]
+    results["session_ids"].append(session_id)
+    email = f"usuario{index}@correo.com"
+
+    await _post(client, session_id, f"usuario{index} {email}")
+    await _post(client, session_id, "2")
+    # Doble envío del mismo mensaje mientras el primero espera al modelo
+    first, second = await asyncio.gather(
+        _post(client, session_id, f"analista {index}"), _post(client, session_id, f"analista {index}")
+    )
+    results["duplicate_status"].append(sorted((first.status_code, second.status_code)))
+    await _post(client, session_id, f"economía, universidad {index}")
+    await _post(client, session_id, f"analista en la empresa {index}")
+    final = (await _post(client, session_id, f"excel, sql, habilidad{index}")).json().get("response", "")
+    if email not in final or "Aquí está tu CV" not in final:
+        results["foreign_cv"].append(index)
+
+
+def _check_state(entry, index: int) -> bool:
+    """El estado guardado contiene solo los datos de su sesión, una vez cada uno."""
+    state = entry.state
+    return (
+        state.is_complete()
+        and state.personal_info.get("contact") == f"usuario{index} usuario{index}@correo.com"
+        and state.profession == f"analista {index}"
+        and state.education == [f"economía, universidad {index}"]
+        and state.experience == [f"analista en la empresa {index}"]
+        and state.skills == [f"excel, sql, habilidad{index}"]
+    )
+
+
+async def _run(args) -> bool:
+    main = importlib.import_module("app.main")
+    from app.services.fake_chat_model import FakeChatModel
+
+    chat_service = main.chat_service
+    chat_service.llm.chat_model = FakeChatModel(latency=args.latency)
+    results: Dict[str, List] = {"session_ids": [], "duplicate_status": [], "foreign_cv": [], "errors": []}
+
+    async def _guarded(client: httpx.AsyncClient, index: int) -> None:
+        try:
+            await _session(client, index, results)
+        except Exception as e:
+            results["errors"].append(index)
+            logger.warning(f"Sesión {index} fallida: {e!r}")
+
+    async with main.app.router.lifespan_context(main.app):
+        transport = httpx.ASGITransport(app=main.app)
+        limits = httpx.Limits(max_connections=None, max_keepalive_connections=None)
+        async with httpx.AsyncClient(transport=transport, base_url="http://stress", timeout=None, limits=limits) as client:
+            while (await client.get("/ready")).status_code != 200:
+                await asyncio.sleep(0.05)
+            started = time.perf_counter()
+            await asyncio.gather(*(_guarded(client, i) for i in range(args.sessions)))
+            elapsed = time.perf_counter() - started
+
+        # Cada estado guardado se localiza por su contacto y se compara con lo que envió su sesión
+        by_contact = {}
+        for session_id in results["session_ids"]:
+            entry = chat_service.session_store.get(session_id)
+            if entry is not None:
+                by_contact[entry.state.personal_info.get("contact", "")] = entry
+        mixed_states = [
+            i for i in range(args.sessions)
+            if (entry := by_contact.get(f"usuario{i} usuario{i}@correo.com")) is None or not _check_state(entry, i)
+        ]
+        lock_metrics = chat_service.session_locks.metrics()
+
+    unique_ids = len(set(results["session_ids"]))
+    duplicates_ok = sum(1 for status in results["duplicate_status"] if status == [200, 409])
+    print(f"Sesiones simultáneas: {args.sessions} en {elapsed:.2f} s "
+          f"({args.sessions * 7 / elapsed:.0f} peticiones/s, latencia del modelo {args.latency * 1000:.0f} ms)")
+    print(f"IDs únicos: {unique_ids}/{len(results['session_ids'])}")
+    print(f"Dobles envíos rechazados con 409: {duplicates_ok}/{len(results['duplicate_status'])}")
+    print(f"CV final ajeno o incompleto: {len(results['foreign_cv'])}")
+    print(f"Estados con datos mezclados o repetidos: {len(mixed_states)}")
+    print(f"Sesiones con error: {len(results['errors'])}")
+    print(f"Locks activos al terminar: {lock_metrics['busy_sessions']}")
+
+    return (unique_ids == args.sessions and duplicates_ok == args.sessions and not results["foreign_cv"]
+            and not mixed_states and not results["errors"] and lock_metrics["busy_sessions"] == 0)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=2000)
+    parser.add_argument("--latency", type=float, default=0.05, help="segundos por respuesta del modelo falso")
+    args = parser.parse_args()
+
+    os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+    os.environ.setdefault("LOG_PAYLOAD_SAMPLE_RATE", "0")
+    # El limitador de ritmo no es lo que se prueba aquí
+    os.environ.setdefault("LLM_RATE_LIMIT_PER_SECOND", "0")
+    os.environ.setdefault("SESSION_MAX_COUNT", str(max(10000, args.sessions)))
+    logger.remove()
+    logger.add(sys.stderr, level="WARNING")
+
+    isolated = asyncio.run(_run(args))
+    print("Aislamiento correcto" if isolated else "FALLO de aislamiento")
+    sys.exit(0 if isolated else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""Huella de memoria por sesión y tamaño serializado de ConversationState.
+
+Uso:
+    python -m benchmarks.session_memory --sessions 20000
+
+Mide con tracemalloc cuántos bytes ocupa cada sesión en memoria (estado solo
+y estado + ChatSession) y compara con la misma clase basada en __dict__, para
+dimensionar los workers de forma predecible. __slots__ solo ahorra el
+contenedor (~50 B por sesión); la mayor parte son los textos de la conversación.
+"""
+import argparse
+import gc
+import time
+import tracemalloc
+from typing import Callable, List
+
+from app.models.chat import ChatSession
+from app.models.conversation_state import ConversationState
+from benchmarks.common import fill_state
+
+
+class _DictConversationState:
+    """ConversationState con __dict__ por instancia en lugar de __slots__.
+
+    Los atributos se copian de un ConversationState nuevo, así que la réplica
+    tiene siempre los mismos campos y valores iniciales que la clase actual.
+    """
+
+    def __init__(self):
+        fresh = ConversationState()
+        for name in ConversationState.__slots__:
+            setattr(self, name, getattr(fresh, name))
+
+
+def _measure(factory: Callable[[int], object], count: int) -> float:
+    """Bytes asignados por objeto al crear `count` instancias."""
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    objects: List[object] = [factory(i) for i in range(count)]
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    allocated = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+    del objects
+    return allocated / count
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=20000)
+    args = parser.parse_args()
+    count = args.sessions
+
+    slotted = _measure(lambda i: fill_state(ConversationState(), i), count)
+    legacy = _measure(lambda i: fill_state(_DictConversationState(), i), count)
+    # Solo el contenedor: sin los textos de la conversación, que son iguales en ambas versiones
+    slotted_empty = _measure(lambda i: ConversationState(), count)
+    legacy_empty = _measure(lambda i: _DictConversationState(), count)
+    entry = _measure(lambda i: (ChatSession(session_id=str(i)), fill_state(ConversationState(), i)), count)
+
+    sample = fill_state(ConversationState(), 1)
+    binary = sample.to_bytes()
+
+    started = time.perf_counter()
+    for _ in range(count):
+        ConversationState.from_bytes(sample.to_bytes())
+    roundtrip_us = (time.perf_counter() - started) / count * 1e6
+
+    rows = [
+        ("Sesiones medidas", f"{count}"),
+        ("ConversationState (__slots__)", f"{slotted:.0f} B/sesión"),
+        ("ConversationState anterior (__dict__)", f"{legacy:.0f} B/sesión"),
+        ("Vacío con __slots__", f"{slotted_empty:.0f} B/sesión"),
+        ("Vacío con __dict__", f"{legacy_empty:.0f} B/sesión"),
+        ("Estado + ChatSession", f"{entry:.0f} B/sesión"),
+        ("Serializado to_bytes", f"{len(binary)} B"),
+        ("Ida y vuelta to_bytes/from_bytes", f"{roundtrip_us:.1f} µs"),
+        ("Sesiones por GiB (estado + sesión)", f"{int(2**30 / entry)}"),
+    ]
+    for label, value in rows:
+        print(f"{label + ':':<40}{value:>16}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+import os
+import shutil
+import sys
+from pathlib import Path
+
+import pytest
+
+# Los servicios usan rutas relativas a la raíz del repositorio ("app/data", "app/templates")
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+os.chdir(ROOT)
+os.environ.setdefault("OPENAI_API_KEY", "test")
+
+from app.config import Settings  # noqa: E402
+from app.services.chat_service import ChatService  # noqa: E402
+from app.services.dataset_service import DatasetService  # noqa: E402
+from app.services.fake_chat_model import FakeChatModel  # noqa: E402
+
+
+@pytest.fixture(scope="session")
+def data_dir(tmp_path_factory) -> Path:
+    """Copia de los datos versionados: la migración de resumes y la caché de verbos escriben ahí, no en el repo."""
+    target = tmp_path_factory.mktemp("data")
+    shutil.copytree(ROOT / "app" / "data" / "datasets", target / "datasets")
+    shutil.copy(ROOT / "app" / "data" / "resumes.json", target / "resumes.json")
+    return target
+
+
+@pytest.fixture
+def settings(tmp_path) -> Settings:
+    """Configuración aislada: sin artefacto precalculado, sin limitador de ritmo ni cachés en disco."""
+    return Settings(
+        OPENAI_API_KEY="test",
+        LLM_RATE_LIMIT_PER_SECOND=0,
+        LOG_PAYLOAD_SAMPLE_RATE=0,
+        SESSION_MAX_COUNT=100000,
+        PRECOMPUTED_RECOMMENDATIONS_PATH=str(tmp_path / "precomputed.json"),
+    )
+
+
+@pytest.fixture
+def make_chat_service(settings, data_dir):
+    """Crea un ChatService con FakeChatModel y los datasets ya cargados."""
+    def _make(latency: float = 0.0) -> ChatService:
+        chat_service = ChatService(chat_model=FakeChatModel(latency=latency), settings=settings,
+                                   dataset_service=DatasetService(data_dir))
+        chat_service.dataset_service.recommendations_catalog.preload()
+        chat_service.dataset_service.action_verbs.preload()
+        return chat_service
+    return _make
@@ -0,0 +1,21 @@
+import pytest
+
+from app.services.dataset_service import DatasetService
+
+
+@pytest.fixture(scope="module")
+def action_verbs(data_dir):
+    return DatasetService(data_dir).action_verbs
+
+
+def test_catalog_verbs_are_not_flagged_as_weak(action_verbs):
+    assert action_verbs.suggest("Mejoré los procesos, cambié el flujo y apoyé al equipo") == []
+
+
+def test_suggestions_fit_the_replaced_phrase(action_verbs):
+    suggestions = {item["phrase"].lower(): item["verbs"] for item in action_verbs.suggest(
+        "Arreglé las máquinas, estuve a cargo del turno y miré los datos"
+    )}
+    assert "Reparar" in suggestions["arreglé"]
+    assert "Dirigir" in suggestions["estuve a cargo del"]
+    assert "Analizar" in suggestions["miré los"]
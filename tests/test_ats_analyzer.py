@@ -0,0 +1,33 @@
+import pytest
+
+from app.models.conversation_state import ConversationState
+from app.services.ats_analyzer import ATSAnalyzer
+from app.services.recommendations_catalog import RecommendationsCatalog
+
+
+@pytest.fixture(scope="module")
+def analyzer():
+    return ATSAnalyzer(RecommendationsCatalog("app/data/datasets/recomendaciones_hoja_vida.csv"))
+
+
+def _state(role: str) -> ConversationState:
+    state = ConversationState()
+    state.profession = role
+    state.experience.append("desarrollé APIs REST y trabajé en equipo")
+    state.skills.append("python, docker, creatividad")
+    return state
+
+
+def test_known_profession_is_scored_against_its_keywords(analyzer):
+    report = analyzer.analyze_state(_state("desarrollador back-end senior"))
+    assert report.profession == "Desarrollador Back-End"
+    assert report.matched and report.recommended_format
+    assert "Formato recomendado para Desarrollador Back-End" in report.format()
+
+
+def test_unknown_role_is_not_scored_against_a_similar_profession(analyzer):
+    # "backend" no es "Back-End": el ranking lo acercaría a otro desarrollador, el análisis no
+    report = analyzer.analyze_state(_state("desarrollador backend"))
+    assert report.profession is None
+    assert report.matched == [] and report.missing == [] and report.recommended_format is None
+    assert "Formato recomendado" not in report.format()
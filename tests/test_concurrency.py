@@ -0,0 +1,32 @@
+import asyncio
+import time
+
+LATENCY = 0.3
+CONVERSATIONS = 20
+
+
+async def _conversation(chat_service, index: int) -> str:
+    session = chat_service.session_store.open_session().session
+    response = ""
+    for message in (f"usuario{index} usuario{index}@correo.com", "2", f"analista {index}",
+                    "economía, universidad nacional", "analista de reportes", "excel, sql"):
+        response = await chat_service.process_message(session, message)
+    return response
+
+
+def test_slow_conversations_run_concurrently(make_chat_service):
+    """N conversaciones con un modelo lento tardan lo que una, no N veces más."""
+    chat_service = make_chat_service(latency=LATENCY)
+
+    async def _run():
+        started = time.perf_counter()
+        responses = await asyncio.gather(*(_conversation(chat_service, i) for i in range(CONVERSATIONS)))
+        return responses, time.perf_counter() - started
+
+    responses, elapsed = asyncio.run(_run())
+
+    assert all("Aquí está tu CV" in response for response in responses)
+    # Cada conversación espera al modelo dos veces (recomendaciones iniciales y finales)
+    assert chat_service.llm.chat_model.calls == 2 * CONVERSATIONS
+    # En serie serían 2 * CONVERSATIONS * LATENCY = 12 s
+    assert elapsed < 2 * LATENCY * 2.5
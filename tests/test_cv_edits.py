@@ -0,0 +1,50 @@
+import asyncio
+
+
+def _complete_conversation(chat_service):
+    async def _run():
+        session = (await chat_service.session_store.aopen_session()).session
+        for message in ("ana pérez ana@correo.com", "2", "analista de datos", "estadística",
+                        "automaticé reportes", "sql, python"):
+            await chat_service.process_message(session, message)
+        return session
+    return asyncio.run(_run())
+
+
+def _send(chat_service, session, message: str) -> str:
+    return asyncio.run(chat_service.process_message(session, message))
+
+
+def test_list_section_edit_appends_and_returns_only_that_section(make_chat_service):
+    chat_service = make_chat_service()
+    session = _complete_conversation(chat_service)
+
+    response = _send(chat_service, session, "Habilidades: Docker")
+
+    state = chat_service.session_store.get(session.session_id).state
+    assert state.skills == ["sql, python", "docker"]
+    assert 'Añadí "docker" a Habilidades' in response
+    assert 'data-section="skills"' in response
+    assert 'data-section="experience"' not in response
+
+
+def test_single_value_edit_is_confirmed_as_replacement(make_chat_service):
+    chat_service = make_chat_service()
+    session = _complete_conversation(chat_service)
+
+    response = _send(chat_service, session, "contacto: ana pérez ana.perez@empresa.com")
+
+    state = chat_service.session_store.get(session.session_id).state
+    assert state.personal_info["contact"] == "ana pérez ana.perez@empresa.com"
+    assert 'Reemplacé tu contacto por "ana pérez ana.perez@empresa.com"' in response
+
+
+def test_free_text_is_not_applied_as_an_edit(make_chat_service):
+    chat_service = make_chat_service()
+    session = _complete_conversation(chat_service)
+
+    response = _send(chat_service, session, "nota para después: revisar el formato")
+
+    state = chat_service.session_store.get(session.session_id).state
+    assert state.skills == ["sql, python"]
+    assert "Para ajustar tu CV" in response
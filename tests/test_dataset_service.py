@@ -0,0 +1,11 @@
+from app.services.dataset_service import DatasetService
+
+
+def test_search_resumes_returns_ranked_recommendation_rows(data_dir):
+    results = DatasetService(data_dir).search_resumes("analista de datos", top_k=3)
+
+    rows = [result for result in results if result["source"] == "recommendation"]
+    assert rows, "search_resumes no devolvió filas del CSV"
+    assert all(result["score"] > 0 for result in rows)
+    assert [result["score"] for result in rows] == sorted((result["score"] for result in rows), reverse=True)
+    assert rows[0]["data"]["profesion"] == "Analista de Datos"
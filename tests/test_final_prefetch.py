@@ -0,0 +1,56 @@
+import asyncio
+
+from app.services.fake_chat_model import FakeChatModel
+
+MESSAGES = ("ana pérez ana@correo.com", "2", "analista de datos", "estadística", "automaticé reportes")
+
+
+def _prefetching_service(make_chat_service, response: str):
+    chat_service = make_chat_service()
+    chat_service.prefetch_final = True
+    chat_service.llm.chat_model = model = FakeChatModel(response=response)
+    return chat_service, model
+
+
+def _converse(chat_service, messages):
+    async def _run():
+        session = (await chat_service.session_store.aopen_session()).session
+        for message in messages:
+            response = await chat_service.process_message(session, message)
+        return response
+    return asyncio.run(_run())
+
+
+def test_draft_mentioning_the_new_skills_is_refreshed(make_chat_service):
+    chat_service, model = _prefetching_service(make_chat_service, "• Aprende Python para automatizar")
+
+    _converse(chat_service, (*MESSAGES, "sql, python"))
+
+    # Recomendaciones iniciales, borrador y ajuste a las habilidades
+    assert model.calls == 3
+    assert chat_service.prefetch_stats["used"] == 1
+    assert chat_service.prefetch_stats["refreshed"] == 1
+
+
+def test_draft_unrelated_to_the_skills_is_served_as_is(make_chat_service):
+    chat_service, model = _prefetching_service(make_chat_service, "• Cuantifica tus logros")
+
+    response = _converse(chat_service, (*MESSAGES, "liderazgo, negociación"))
+
+    assert model.calls == 2
+    assert chat_service.prefetch_stats["refreshed"] == 0
+    assert "• Cuantifica tus logros" in response
+
+
+def test_session_sweep_discards_abandoned_prefetches(make_chat_service):
+    chat_service, _ = _prefetching_service(make_chat_service, "• Cuantifica tus logros")
+    # La conversación se abandona justo después de la experiencia
+    _converse(chat_service, MESSAGES)
+    assert len(chat_service._prefetches) == 1
+
+    chat_service.prefetch_ttl = 0
+    for listener in chat_service.session_store.sweep_listeners:
+        listener()
+
+    assert chat_service._prefetches == {}
+    assert chat_service.prefetch_stats["discarded"] == 1
@@ -0,0 +1,30 @@
+import asyncio
+import time
+
+from app.services.pdf_service import PDFExportService
+
+
+def _slow_render(html: str) -> bytes:
+    # Se ejecuta en el pool de procesos: debe ser una función de módulo
+    time.sleep(0.3)
+    return html.encode("utf-8")
+
+
+def test_disconnected_requester_does_not_cancel_shared_render():
+    service = PDFExportService(max_workers=1, render_func=_slow_render)
+
+    async def _run():
+        first = asyncio.ensure_future(service.render("<p>cv</p>"))
+        await asyncio.sleep(0.05)
+        waiters = [asyncio.ensure_future(service.render("<p>cv</p>")) for _ in range(3)]
+        await asyncio.sleep(0.01)
+        # Quien inició el render se desconecta; los demás reciben el PDF
+        first.cancel()
+        return await asyncio.gather(*waiters)
+
+    try:
+        assert asyncio.run(_run()) == [b"<p>cv</p>"] * 3
+        metrics = service.metrics()
+        assert metrics["renders"] == 1 and metrics["cache_size"] == 1 and metrics["jobs_in_flight"] == 0
+    finally:
+        service.shutdown()
@@ -0,0 +1,51 @@
+import asyncio
+
+from app.services.session_locks import SessionBusyError
+
+SESSIONS = 300
+LATENCY = 0.02
+
+
+async def _conversation(chat_service, index: int, outcomes: dict) -> str:
+    entry = await chat_service.session_store.aopen_session()
+    session = entry.session
+    await chat_service.process_message(session, f"usuario{index} usuario{index}@correo.com")
+    await chat_service.process_message(session, "2")
+
+    # Doble envío del mismo mensaje mientras el primero espera al modelo
+    duplicate = await asyncio.gather(
+        chat_service.process_message(session, f"analista {index}"),
+        chat_service.process_message(session, f"analista {index}"),
+        return_exceptions=True,
+    )
+    outcomes["busy"] += sum(isinstance(result, SessionBusyError) for result in duplicate)
+
+    # Mensajes distintos enviados a la vez: esperan turno y se procesan todos, en orden
+    await asyncio.gather(
+        chat_service.process_message(session, f"economía, universidad {index}"),
+        chat_service.process_message(session, f"analista en la empresa {index}"),
+        chat_service.process_message(session, f"excel, sql, habilidad{index}"),
+    )
+    return session.session_id
+
+
+def test_concurrent_sessions_stay_isolated(make_chat_service):
+    chat_service = make_chat_service(latency=LATENCY)
+    outcomes = {"busy": 0}
+
+    async def _run():
+        return await asyncio.gather(*(_conversation(chat_service, i, outcomes) for i in range(SESSIONS)))
+
+    session_ids = asyncio.run(_run())
+
+    assert len(set(session_ids)) == SESSIONS
+    assert outcomes["busy"] == SESSIONS
+    for index, session_id in enumerate(session_ids):
+        state = chat_service.session_store.get(session_id).state
+        assert state.is_complete(), f"sesión {index} incompleta"
+        assert state.personal_info["contact"] == f"usuario{index} usuario{index}@correo.com"
+        assert state.profession == f"analista {index}"
+        assert state.education == [f"economía, universidad {index}"]
+        assert state.experience == [f"analista en la empresa {index}"]
+        assert state.skills == [f"excel, sql, habilidad{index}"]
+    assert chat_service.session_locks.metrics()["busy_sessions"] == 0
@@ -0,0 +1,87 @@
+import asyncio
+
+import pytest
+from langchain.schema import HumanMessage
+
+from app.services.fake_chat_model import FakeChatModel
+from app.services.llm_gateway import LLMGateway
+from app.services.single_flight import SingleFlight
+
+
+def test_identical_concurrent_prompts_make_one_model_call(settings):
+    model = FakeChatModel(latency=0.05, response="respuesta")
+    gateway = LLMGateway(settings, model)
+    messages = [HumanMessage(content="recomendaciones para analista de datos")]
+
+    async def _run():
+        return await asyncio.gather(*(gateway.ainvoke(messages) for _ in range(10)))
+
+    responses = asyncio.run(_run())
+    assert model.calls == 1
+    assert [response.content for response in responses] == ["respuesta"] * 10
+    assert gateway.single_flight.coalesced == 9
+    assert gateway.single_flight.in_flight() == 0
+
+
+def test_cancelled_waiter_does_not_cancel_shared_call():
+    flight = SingleFlight()
+    calls = []
+
+    async def _work():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return "listo"
+
+    async def _run():
+        first = asyncio.ensure_future(flight.run("clave", _work))
+        second = asyncio.ensure_future(flight.run("clave", _work))
+        await asyncio.sleep(0.01)
+        # Se cancela quien inició la llamada; el otro sigue esperando el mismo resultado
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return await second
+
+    assert asyncio.run(_run()) == "listo"
+    assert calls == [1]
+    assert flight.in_flight() == 0
+
+
+def test_error_reaches_every_waiter():
+    flight = SingleFlight()
+
+    async def _fail():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("modelo caído")
+
+    async def _run():
+        return await asyncio.gather(*(flight.run("clave", _fail) for _ in range(3)), return_exceptions=True)
+
+    results = asyncio.run(_run())
+    assert [type(result) for result in results] == [RuntimeError] * 3
+    assert flight.executed == 1 and flight.coalesced == 2
+    assert flight.in_flight() == 0
+
+
+def test_streamed_chunks_reach_every_subscriber():
+    flight = SingleFlight()
+    produced = []
+
+    async def _source():
+        for chunk in ("uno", " dos", " tres"):
+            produced.append(chunk)
+            await asyncio.sleep(0.01)
+            yield chunk
+
+    async def _collect(delay: float):
+        # Un suscriptor tardío recibe también los fragmentos ya emitidos
+        await asyncio.sleep(delay)
+        return [chunk async for chunk in flight.stream("clave", _source)]
+
+    async def _run():
+        return await asyncio.gather(_collect(0), _collect(0), _collect(0.015))
+
+    results = asyncio.run(_run())
+    assert results == [["uno", " dos", " tres"]] * 3
+    assert produced == ["uno", " dos", " tres"]
+    assert flight.executed == 1 and flight.coalesced == 2